@@ -0,0 +1,30 @@
+# scripts/analytics.py
+"""
+Petits outils analytiques partagés (résumés, classements) — coût linéaire en nombre de lignes.
+
+- top_k : équivalent de df.sort_values(by, ascending).head(k) par sélection partielle
+  (np.argpartition sur la 1re clé, puis tri des seuls candidats, égalités au seuil incluses)
+"""
+
+from __future__ import annotations
+import numpy as np
+import pandas as pd
+
+def top_k(df: pd.DataFrame, by: str | list[str], k: int, ascending: bool | list[bool] = False) -> pd.DataFrame:
+    """
+    Les k premières lignes selon `by` (NaN en dernier, égalités dans l'ordre d'origine).
+    Même résultat que df.sort_values(by, ascending=ascending, kind="mergesort").head(k).
+    """
+    keys = [by] if isinstance(by, str) else list(by)
+    asc = [ascending] * len(keys) if isinstance(ascending, bool) else list(ascending)
+    n = len(df)
+    first = df[keys[0]] if n else None
+    if n <= k or not pd.api.types.is_numeric_dtype(first):
+        return df.sort_values(keys, ascending=asc, kind="mergesort").head(k)
+
+    v = first.to_numpy(dtype=float, na_value=np.nan)
+    v = v if asc[0] else -v
+    v = np.where(np.isnan(v), np.inf, v)            # NaN relégués en fin (départagés au tri final)
+    kth = np.argpartition(v, k - 1)[k - 1]
+    cand = np.flatnonzero(v <= v[kth])               # inclut toutes les égalités au seuil
+    return df.iloc[cand].sort_values(keys, ascending=asc, kind="mergesort").head(k)
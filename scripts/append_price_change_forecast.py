@@ -6,12 +6,15 @@ Append du fichier price_change_forecast.csv vers un historique global.
 - Ajoute à data/price_change_forecast_history.csv
 - Ajoute snapshot_time (ISO) et source_file
 - Évite les doublons (id + snapshot_time)
+- Met à jour les sketches de quantiles par tranche d'ownership (quantile_sketch) avec les nouvelles lignes
 """
 
 import pandas as pd
 from pathlib import Path
 from datetime import datetime, timezone
 
+from quantile_sketch import update_calibration, CALIBRATION_SKETCH
+
 DATA_DIR = Path(__file__).resolve().parents[1] / "data"
 SRC_FILE = DATA_DIR / "price_change_forecast.csv"
 HIST_FILE = DATA_DIR / "price_change_forecast_history.csv"
@@ -44,5 +47,9 @@ def main():
     combined.to_csv(HIST_FILE, index=False)
     print(f"[PASS] Historique mis à jour : {len(combined)} lignes.")
 
+    # Sketches de calibration : seules les lignes de ce run sont ajoutées
+    sk = update_calibration(df, HIST_FILE)
+    print(f"[PASS] {CALIBRATION_SKETCH.name} : {sk['rows']} lignes agrégées.")
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,157 @@
+# scripts/backfill_season.py
+"""
+Backfill de la saison : toutes les GW jouées -> gw{N}.csv + gw{N}_permatch.csv (moteur gw_build).
+
+- bootstrap + fixtures récupérés UNE fois (contexte partagé)
+- payloads event/{gw}/live/ récupérés en parallèle (threads) sous budget de requêtes
+  (--rps requêtes/seconde, --fetch-jobs connexions simultanées, reprises avec backoff)
+- construction + écriture de chaque GW dans un pool de processus (--jobs), dès que son payload arrive
+- GW figées (finished + data_checked, gw{N}.csv et gw{N}_permatch.csv déjà présents) : sautées
+  sans requête (--force pour tout reconstruire)
+- tableau des timings par GW (fetch, build, lignes)
+- --permatch-only : n'écrit que gw{N}_permatch.csv et saute toute GW dont ce fichier existe déjà
+  (contrat de build_all_gw_permatch_csvs.py ; gw{N}.csv et ses snapshots ne sont pas touchés)
+
+Usage :
+  python scripts/backfill_season.py [--jobs 4] [--fetch-jobs 4] [--rps 4] [--gws 1 2 3] [--force] [--permatch-only]
+"""
+
+from __future__ import annotations
+import argparse
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from time import perf_counter
+import requests
+import pandas as pd
+
+from gw_build import (SEASON_DIR, load_context, fetch_event_live, build_gw, write_totals, write_permatch)
+
+RETRIES = 3
+
+def rate_limiter(rps: float):
+    """Renvoie wait() : espace les appels d'au moins 1/rps seconde (partagé entre threads)."""
+    lock = threading.Lock()
+    next_slot = [0.0]
+    def wait():
+        with lock:
+            now = time.monotonic()
+            slot = max(now, next_slot[0])
+            next_slot[0] = slot + 1.0 / rps
+        time.sleep(max(0.0, slot - now))
+    return wait
+
+def played_gws(events: list) -> list[int]:
+    """GW dont la deadline est passée (terminées, précédente ou courante)."""
+    return sorted(e["id"] for e in events
+                  if e.get("finished") or e.get("is_previous") or e.get("is_current"))
+
+def is_frozen(event: dict, permatch_only: bool = False) -> bool:
+    gw = event["id"]
+    if permatch_only:
+        return (SEASON_DIR / f"gw{gw}_permatch.csv").exists()
+    done = bool(event.get("finished")) and bool(event.get("data_checked"))
+    return done and (SEASON_DIR / f"gw{gw}.csv").exists() and (SEASON_DIR / f"gw{gw}_permatch.csv").exists()
+
+def fetch_live(gw: int, session: requests.Session, wait) -> tuple[dict, float]:
+    t0 = perf_counter()
+    for attempt in range(RETRIES):
+        wait()
+        try:
+            return fetch_event_live(gw, session), perf_counter() - t0
+        except requests.RequestException:
+            if attempt == RETRIES - 1:
+                raise
+            time.sleep(2 ** attempt)
+
+def build_and_write(gw: int, live: dict, ctx: dict, permatch_only: bool = False) -> dict:
+    """Construit et écrit les sorties d'une GW (exécuté dans un worker) ; permatch_only : gw{N}.csv non écrit."""
+    t0 = perf_counter()
+    totals, permatch = build_gw(gw, live, ctx)
+    t1 = perf_counter()
+    if totals is None:
+        return {"status": "empty", "build_s": t1 - t0, "rows": 0, "rows_permatch": 0}
+    if not permatch_only:
+        write_totals(totals, gw)
+    if not permatch.empty:
+        write_permatch(permatch, gw)
+    return {"status": "built", "build_s": t1 - t0, "write_s": perf_counter() - t1,
+            "rows": len(totals), "rows_permatch": len(permatch)}
+
+def backfill(gws: list[int] | None = None, jobs: int = 1, fetch_jobs: int = 4, rps: float = 4.0,
+             force: bool = False, permatch_only: bool = False) -> pd.DataFrame:
+    """Backfill des GW demandées (défaut : toutes les GW jouées) ; renvoie le tableau des timings."""
+    report: dict[int, dict] = {}
+    wait = rate_limiter(rps)
+    with requests.Session() as session:
+        ctx = load_context(session)
+        events = {e["id"]: e for e in ctx["events"]}
+        todo = []
+        for gw in (gws or played_gws(ctx["events"])):
+            if not force and gw in events and is_frozen(events[gw], permatch_only):
+                report[gw] = {"status": "frozen"}
+            else:
+                todo.append(gw)
+
+        build_ex = ProcessPoolExecutor(max_workers=jobs) if jobs > 1 and len(todo) > 1 else None
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, fetch_jobs)) as fetch_ex:
+                fetches = {fetch_ex.submit(fetch_live, gw, session, wait): gw for gw in todo}
+                builds = {}
+                for f in as_completed(fetches):
+                    gw = fetches[f]
+                    try:
+                        live, fetch_s = f.result()
+                    except Exception as e:
+                        report[gw] = {"status": f"error: {e}"}
+                        continue
+                    report[gw] = {"fetch_s": fetch_s}
+                    if build_ex is None:
+                        try:
+                            report[gw].update(build_and_write(gw, live, ctx, permatch_only))
+                        except Exception as e:
+                            report[gw]["status"] = f"error: {e}"
+                    else:
+                        builds[build_ex.submit(build_and_write, gw, live, ctx, permatch_only)] = gw
+                # une GW en échec de construction n'interrompt pas les autres (même traitement que le fetch)
+                for f in as_completed(builds):
+                    gw = builds[f]
+                    try:
+                        report[gw].update(f.result())
+                    except Exception as e:
+                        report[gw]["status"] = f"error: {e}"
+        finally:
+            if build_ex is not None:
+                build_ex.shutdown()
+
+    cols = ["status", "fetch_s", "build_s", "write_s", "rows", "rows_permatch"]
+    out = pd.DataFrame.from_dict(report, orient="index").reindex(columns=cols).rename_axis("gw").sort_index()
+    return out.astype({"rows": "Int64", "rows_permatch": "Int64"})
+
+def main():
+    ap = argparse.ArgumentParser(description="Backfill all played GWs (gwN.csv + gwN_permatch.csv).")
+    ap.add_argument("--gws", type=int, nargs="+", help="GW à construire (défaut : toutes les GW jouées).")
+    ap.add_argument("--jobs", type=int, default=min(4, os.cpu_count() or 1), help="Processus de construction.")
+    ap.add_argument("--fetch-jobs", type=int, default=4, help="Téléchargements simultanés.")
+    ap.add_argument("--rps", type=float, default=4.0, help="Budget de requêtes par seconde.")
+    ap.add_argument("--force", action="store_true", help="Reconstruit aussi les GW figées.")
+    ap.add_argument("--permatch-only", action="store_true",
+                    help="N'écrit que gw{N}_permatch.csv, GW dont le fichier existe sautées.")
+    args = ap.parse_args()
+
+    t0 = perf_counter()
+    report = backfill(args.gws, jobs=args.jobs, fetch_jobs=args.fetch_jobs, rps=args.rps, force=args.force,
+                      permatch_only=args.permatch_only)
+    print(report.to_string(float_format=lambda v: f"{v:.2f}"))
+    n_built = int((report["status"] == "built").sum())
+    n_err = int(report["status"].astype(str).str.startswith("error").sum())
+    print(f"[INFO] {n_built} GW construites, {int((report['status'] == 'frozen').sum())} figées, "
+          f"{n_err} erreurs ; {perf_counter() - t0:.1f}s")
+    if n_err:
+        print("[WARN] certaines GW n'ont pas pu être récupérées ou construites")
+    else:
+        print("[PASS] backfill terminé")
+
+if __name__ == "__main__":
+    main()
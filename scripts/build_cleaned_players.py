@@ -1,13 +1,42 @@
 # scripts/build_cleaned_players.py
+# Agrégats saison par joueur (cleaned_players.csv), mis à jour incrémentalement :
+# - contributions par GW (une ligne par joueur : identité, apps, sommes des stats) en partitions
+#   gw_partitions (dataset "player_gw_totals", sources data/season/gw{N}.csv) ; seules les GW
+#   nouvelles ou modifiées sont relues
+# - état persistant des totaux par joueur (data/partitions/player_gw_totals/_totals.csv) :
+#   ancienne contribution retirée, nouvelle ajoutée ; per90 et merge players_raw dérivés de l'état
+# - état absent ou désynchronisé du manifest -> reconstruit depuis les partitions
+# - --recompute : ancien calcul complet depuis merged_gw.csv ; --validate : compare les deux
+import argparse
+import hashlib
+import json
 import os
+import sys
 from datetime import datetime, timezone
+from pathlib import Path
 import numpy as np
 import pandas as pd
 
+sys.path.append(os.path.dirname(__file__))
+from gw_partitions import SEASON, dataset_dir, load_manifest, register_dataset, update_partitions
+
 MERGED_GW_PATH = "../data/merged_gw.csv"
 PLAYERS_RAW_PATH = "../data/players_raw.csv"
 OUT_PATH = "../data/cleaned_players.csv"
 
+STAT_COLS = [
+    "minutes","total_points","goals_scored","assists","clean_sheets","goals_conceded",
+    "own_goals","saves","penalties_saved","penalties_missed",
+    "yellow_cards","red_cards","bonus","bps",
+    "influence","creativity","threat","ict_index",
+    "expected_goals","expected_assists","expected_goal_involvements","expected_goals_conceded"
+]
+ID_COLS = ["web_name","first_name","second_name","team_name","position"]
+ID_CANDIDATES = ["player_id", "element", "id", "player", "playerid"]
+CONTRIB = "player_gw_totals"
+TOTALS_FILE = dataset_dir(CONTRIB) / "_totals.csv"
+TOTALS_META = dataset_dir(CONTRIB) / "_totals.json"
+
 def to_numeric_safe(df: pd.DataFrame, cols):
     """Convertit en float toutes les colonnes présentes dans df parmi 'cols' (coerce en NaN)."""
     for c in cols:
@@ -22,49 +51,26 @@ def per90(series_num: pd.Series, series_minutes: pd.Series) -> pd.Series:
     mins = mins.replace(0, np.nan)  # éviter division par 0
     return (num * 90.0) / mins      # renvoie float avec NaN si mins manquant
 
-def main(merged_path=MERGED_GW_PATH, players_raw_path=PLAYERS_RAW_PATH, out_path=OUT_PATH):
-    base_dir = os.path.dirname(__file__)
-    merged_file = os.path.abspath(os.path.join(base_dir, merged_path))
-    raw_file = os.path.abspath(os.path.join(base_dir, players_raw_path))
-    out_file = os.path.abspath(os.path.join(base_dir, out_path))
-
-    if not os.path.exists(merged_file):
-        raise SystemExit(f"Fichier introuvable: {merged_file} - lance d'abord build_merged_gw_csv.py")
-    if not os.path.exists(raw_file):
-        raise SystemExit(f"Fichier introuvable: {raw_file} - lance d'abord build_players_raw.py")
-
-    # --- 1) lire les sources
-    mgw = pd.read_csv(merged_file)
-    pr = pd.read_csv(raw_file)
-    if mgw.empty:
-        raise SystemExit("merged_gw.csv est vide.")
-
-    # --- 2) forcer les colonnes stats en numérique
-    stat_cols = [
-        "minutes","total_points","goals_scored","assists","clean_sheets","goals_conceded",
-        "own_goals","saves","penalties_saved","penalties_missed",
-        "yellow_cards","red_cards","bonus","bps",
-        "influence","creativity","threat","ict_index",
-        "expected_goals","expected_assists","expected_goal_involvements","expected_goals_conceded"
-    ]
-    mgw = to_numeric_safe(mgw, stat_cols)
+def aggregate_rows(mgw: pd.DataFrame) -> pd.DataFrame:
+    """Lignes joueur × GW -> une ligne par player_id (identité "first", apps et stats sommées)."""
+    # --- forcer les colonnes stats en numérique
+    mgw = to_numeric_safe(mgw, STAT_COLS)
 
-    # --- 3) colonnes d'identité
-    id_cols = [c for c in ["web_name","first_name","second_name","team_name","position"] if c in mgw.columns]
+    # --- colonnes d'identité
+    id_cols = [c for c in ID_COLS if c in mgw.columns]
 
     # apparitions (minutes > 0)
     if "minutes" in mgw.columns:
         mgw["apps"] = (mgw["minutes"].fillna(0) > 0).astype(int)
 
     # colonnes à sommer
-    sum_cols = [c for c in ["apps"] + stat_cols if c in mgw.columns]
+    sum_cols = [c for c in ["apps"] + STAT_COLS if c in mgw.columns]
 
     # agrégation
     agg_dict = {c: "first" for c in id_cols}
     agg_dict.update({c: "sum" for c in sum_cols})
 
     # --- sécurité: trouver la colonne identifiant joueur ---
-    ID_CANDIDATES = ["player_id", "element", "id", "player", "playerid"]
     id_col = next((c for c in ID_CANDIDATES if c in mgw.columns), None)
     if id_col is None:
         raise ValueError(
@@ -74,9 +80,11 @@ def main(merged_path=MERGED_GW_PATH, players_raw_path=PLAYERS_RAW_PATH, out_path
     if id_col != "player_id":
         mgw = mgw.rename(columns={id_col: "player_id"})
 
-    gp = mgw.groupby("player_id", as_index=False).agg(agg_dict)
+    return mgw.groupby("player_id", as_index=False).agg(agg_dict)
 
-    # --- 4) dérivées per90 (sans cast agressif)
+def finalize(gp: pd.DataFrame, pr: pd.DataFrame) -> pd.DataFrame:
+    """Totaux par joueur -> cleaned_players (per90, alias x*, colonnes players_raw, ordre, horodatage)."""
+    # --- dérivées per90 (sans cast agressif)
     if "minutes" in gp.columns and "total_points" in gp.columns:
         gp["points_per90"] = per90(gp["total_points"], gp["minutes"]).round(2)
 
@@ -92,17 +100,17 @@ def main(merged_path=MERGED_GW_PATH, players_raw_path=PLAYERS_RAW_PATH, out_path
     if "expected_goals_conceded" in gp.columns: rename_map["expected_goals_conceded"] = "xgc"
     gp = gp.rename(columns=rename_map)
 
-    # --- 5) players_raw : conversions utiles
+    # --- players_raw : conversions utiles
     pr_num_cols = ["price_m","selected_by_percent","chance_of_playing_next_round","chance_of_playing_this_round"]
     pr = to_numeric_safe(pr, pr_num_cols)
     pr_min = pr[[c for c in ["id","price_m","selected_by_percent","status",
                              "chance_of_playing_next_round","chance_of_playing_this_round"]
                  if c in pr.columns]].rename(columns={"id":"player_id"})
 
-    # --- 6) merge
+    # --- merge
     cleaned = gp.merge(pr_min, on="player_id", how="left")
 
-    # --- 7) ordre de colonnes
+    # --- ordre de colonnes
     preferred = [
         "player_id","web_name","first_name","second_name","team_name","position",
         "minutes","apps","total_points","points_per90",
@@ -116,9 +124,159 @@ def main(merged_path=MERGED_GW_PATH, players_raw_path=PLAYERS_RAW_PATH, out_path
     ]
     ordered = [c for c in preferred if c in cleaned.columns] + [c for c in cleaned.columns if c not in preferred]
     cleaned = cleaned[ordered]
-
-    # --- 8) timestamp et écriture
     cleaned["last_updated_utc"] = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    return cleaned
+
+# --- Contributions par GW (partitions) ---
+def _contribution(df: pd.DataFrame, gw: int, name: str, ctx=None) -> pd.DataFrame:
+    gp = aggregate_rows(df)
+    gp.insert(1, "n_rows", df.groupby(df[next(c for c in ID_CANDIDATES if c in df.columns)]).size().to_numpy())
+    return gp
+
+register_dataset(CONTRIB, r"^gw(\d+)\.csv$", _contribution)
+
+def manifest_digest(manifest: dict) -> str:
+    parts = manifest["partitions"]
+    return hashlib.sha1(json.dumps({g: parts[g]["sha1"] for g in sorted(parts, key=int)}).encode()).hexdigest()
+
+# --- État des totaux par joueur ---
+def _sum_cols(df: pd.DataFrame) -> list[str]:
+    return [c for c in ["n_rows", "apps"] + STAT_COLS if c in df.columns]
+
+def totals_from_partitions(manifest: dict) -> pd.DataFrame:
+    """Totaux recalculés depuis toutes les contributions (chemin de reconstruction de l'état)."""
+    ddir = dataset_dir(CONTRIB)
+    frames = [pd.read_csv(ddir / f"gw{g}.csv").assign(id_gw=int(g)) for g in sorted(manifest["partitions"], key=int)]
+    if not frames:
+        return pd.DataFrame(columns=["player_id", "id_gw"]).set_index("player_id")
+    allc = pd.concat(frames, ignore_index=True)
+    g = allc.groupby("player_id")
+    ids = [c for c in ID_COLS if c in allc.columns]
+    return pd.concat([g[ids].first(), g["id_gw"].min(), g[_sum_cols(allc)].sum()], axis=1)
+
+def apply_contribution(state: pd.DataFrame, contrib: pd.DataFrame, gw: int, sign: int) -> pd.DataFrame:
+    """state ± contribution d'une GW (alignement sur player_id) ; identité prise de la GW la plus ancienne."""
+    c = contrib.set_index("player_id")
+    idx = state.index.union(c.index)
+    sums = [col for col in _sum_cols(c) if col not in state.columns] + _sum_cols(state)
+    out = state.drop(columns=_sum_cols(state)).reindex(idx)
+    for col in sums:
+        # reindex avec 0 : les colonnes entières restent entières
+        cur = state[col].reindex(idx, fill_value=0) if col in state.columns else pd.Series(0, index=idx)
+        add = c[col].reindex(idx, fill_value=0) if col in c.columns else 0
+        out[col] = cur + sign * add
+    state = out
+    if sign > 0:
+        ids = [col for col in ID_COLS if col in c.columns]
+        newer = state["id_gw"].isna() | (state["id_gw"] >= gw) if "id_gw" in state.columns else pd.Series(True, index=idx)
+        new_ids = c[ids].reindex(idx)
+        for col in ids:
+            old = state[col] if col in state.columns else pd.Series(pd.NA, index=idx, dtype=object)
+            state[col] = new_ids[col].combine_first(old).where(newer, old.combine_first(new_ids[col]))
+        hit = newer & idx.isin(c.index)
+        state["id_gw"] = state["id_gw"].where(~hit, gw) if "id_gw" in state.columns else pd.Series(gw, index=idx).where(hit)
+    return state
+
+def load_totals(manifest: dict) -> pd.DataFrame | None:
+    """État persistant s'il correspond au manifest courant, sinon None."""
+    if not (TOTALS_FILE.exists() and TOTALS_META.exists()):
+        return None
+    with open(TOTALS_META, "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    if meta.get("manifest") != manifest_digest(manifest):
+        return None
+    return pd.read_csv(TOTALS_FILE).set_index("player_id")
+
+def save_totals(state: pd.DataFrame, manifest: dict) -> None:
+    state.reset_index().to_csv(TOTALS_FILE, index=False, encoding="utf-8")
+    with open(TOTALS_META, "w", encoding="utf-8") as f:
+        json.dump({"manifest": manifest_digest(manifest), "players": int(len(state)),
+                   "gws": sorted(int(g) for g in manifest["partitions"])}, f, ensure_ascii=False)
+
+def update_totals(season_dir: Path = SEASON, rebuild: bool = False) -> tuple[pd.DataFrame, dict]:
+    """Met à jour les contributions des GW modifiées puis l'état des totaux ; renvoie (état, résultat partitions)."""
+    state = None if rebuild else load_totals(load_manifest(CONTRIB))
+    removed_contribs = []
+    res = update_partitions(CONTRIB, season_dir, rebuild=rebuild,
+                            on_replace=lambda gw, old: removed_contribs.append((gw, old)))
+    manifest = res["manifest"]
+    if state is None:
+        state = totals_from_partitions(manifest)
+    else:
+        ddir = dataset_dir(CONTRIB)
+        for gw, old in removed_contribs:
+            state = apply_contribution(state, old, gw, -1)
+        for gw in res["rebuilt"]:
+            state = apply_contribution(state, pd.read_csv(ddir / f"gw{gw}.csv"), gw, +1)
+        # joueurs sans plus aucune ligne (GW retirée)
+        state = state[state["n_rows"] > 0]
+    save_totals(state, manifest)
+    return state, res
+
+def totals_to_gp(state: pd.DataFrame) -> pd.DataFrame:
+    """État -> même forme que aggregate_rows (player_id, identité, sommes) ; flottants arrondis (dérive +/-)."""
+    gp = state.drop(columns=["id_gw", "n_rows"], errors="ignore").reset_index()
+    ids = [c for c in ID_COLS if c in gp.columns]
+    sums = [c for c in ["apps"] + STAT_COLS if c in gp.columns]
+    gp = gp[["player_id"] + ids + sums].sort_values("player_id", kind="mergesort").reset_index(drop=True)
+    floats = [c for c in sums if gp[c].dtype == float]
+    gp[floats] = gp[floats].round(6)
+    return gp
+
+def recompute(merged_file: str) -> pd.DataFrame:
+    """Chemin complet (validation) : toute la saison depuis merged_gw.csv."""
+    mgw = pd.read_csv(merged_file)
+    if mgw.empty:
+        raise SystemExit("merged_gw.csv est vide.")
+    return aggregate_rows(mgw)
+
+def compare(gp_inc: pd.DataFrame, gp_full: pd.DataFrame) -> list[str]:
+    """Écarts entre totaux incrémentaux et recalcul complet (une ligne de message par problème)."""
+    a, b = gp_inc.set_index("player_id"), gp_full.set_index("player_id")
+    issues = []
+    if not a.index.equals(b.index.sort_values()):
+        issues.append(f"joueurs différents : {len(a.index.symmetric_difference(b.index))}")
+    b = b.reindex(a.index)
+    for c in [c for c in ["apps"] + STAT_COLS if c in a.columns and c in b.columns]:
+        if not np.allclose(a[c].astype(float), b[c].astype(float), atol=1e-6, equal_nan=True):
+            issues.append(f"{c}: max écart {float((a[c] - b[c]).abs().max()):.6f}")
+    return issues
+
+def main(merged_path=MERGED_GW_PATH, players_raw_path=PLAYERS_RAW_PATH, out_path=OUT_PATH):
+    ap = argparse.ArgumentParser(description="Build cleaned_players.csv from incremental per-player totals.")
+    ap.add_argument("--recompute", action="store_true", help="Calcul complet depuis merged_gw.csv (ancien chemin).")
+    ap.add_argument("--validate", action="store_true", help="Compare l'état incrémental au recalcul complet.")
+    ap.add_argument("--rebuild", action="store_true", help="Reconstruit contributions et état depuis data/season.")
+    args = ap.parse_args()
+
+    base_dir = os.path.dirname(__file__)
+    merged_file = os.path.abspath(os.path.join(base_dir, merged_path))
+    raw_file = os.path.abspath(os.path.join(base_dir, players_raw_path))
+    out_file = os.path.abspath(os.path.join(base_dir, out_path))
+
+    if not os.path.exists(raw_file):
+        raise SystemExit(f"Fichier introuvable: {raw_file} - lance d'abord build_players_raw.py")
+    pr = pd.read_csv(raw_file)
+
+    if args.recompute:
+        if not os.path.exists(merged_file):
+            raise SystemExit(f"Fichier introuvable: {merged_file} - lance d'abord build_merged_gw_csv.py")
+        gp = recompute(merged_file)
+    else:
+        state, res = update_totals(rebuild=args.rebuild)
+        if state.empty:
+            raise SystemExit(f"Aucun gwN.csv dans {SEASON}.")
+        print(f"[INFO] {CONTRIB}: GW recalculées {res['rebuilt']}, retirées {res['removed']}, "
+              f"{res['kept']} inchangée(s) ; {len(state)} joueurs")
+        gp = totals_to_gp(state)
+        if args.validate:
+            issues = compare(gp, recompute(merged_file))
+            for msg in issues:
+                print(f"[WARN] validate: {msg}")
+            if not issues:
+                print("[PASS] validate: totaux incrémentaux = recalcul complet")
+
+    cleaned = finalize(gp, pr)
     os.makedirs(os.path.dirname(out_file), exist_ok=True)
     cleaned.to_csv(out_file, index=False, encoding="utf-8")
     print(f"OK cleaned_players.csv -> {out_file}  ({len(cleaned)} joueurs)")
@@ -0,0 +1,225 @@
+# scripts/build_fixture_matrix.py
+"""
+Matrice des fixtures équipe × GW (tableaux denses NumPy) à partir de data/fixtures.csv + data/teams.csv.
+
+Tableaux (T équipes × G GWs × K créneaux ; K = max de matchs d'une équipe dans une GW) :
+- opponent, fixture_id (-1 = vide), is_home (1/0, -1 = vide)
+- difficulty (FDR officiel côté équipe), opp_strength / opp_attack / opp_defence
+  (strength_* de l'adversaire, variante home/away selon le lieu)
+- kickoff (datetime64[s], NaT = vide), rest_days (jours depuis le match précédent de l'équipe)
+- finished (1/0, -1 = vide)
+Par (équipe, GW) : n_fixtures, blank (0 match), double (>= 2 matchs), min_rest_days (congestion).
+
+Le fichier data/fixture_matrix.npz garde le hash de fixtures.csv / teams.csv : il n'est reconstruit
+que si l'un des deux change. Outlook sur N GWs, classement de difficulté et blanks/doubles
+deviennent des tranches de tableaux (outlook, difficulty_ranking, blanks_doubles).
+
+Usage :
+  python scripts/build_fixture_matrix.py [--force] [--horizon 5]
+"""
+
+from __future__ import annotations
+import argparse
+import hashlib
+import json
+from datetime import datetime, timezone
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+DATA_DIR = ROOT / "data"
+FIXTURES_CSV = DATA_DIR / "fixtures.csv"
+TEAMS_CSV = DATA_DIR / "teams.csv"
+MATRIX_FILE = DATA_DIR / "fixture_matrix.npz"
+
+FIXTURE_COLS = ["id", "event", "kickoff_time", "finished", "team_h", "team_a", "team_h_difficulty", "team_a_difficulty"]
+HORIZON = 5
+
+def _sha1(path: Path) -> str:
+    if not path.exists():
+        return "missing"
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        while chunk := f.read(1 << 20):
+            h.update(chunk)
+    return h.hexdigest()
+
+def _team_strength(teams: pd.DataFrame, ids: np.ndarray, kind: str, venue: str) -> np.ndarray:
+    """strength_<kind>_<venue> par id d'équipe (NaN si absent)."""
+    col = f"strength_{kind}_{venue}"
+    if teams.empty or col not in teams.columns:
+        return np.full(len(ids), np.nan)
+    s = pd.to_numeric(teams.set_index("id")[col], errors="coerce")
+    return s.reindex(ids).to_numpy(dtype=float)
+
+def build_matrix(fixtures: pd.DataFrame, teams: pd.DataFrame | None = None) -> dict[str, np.ndarray]:
+    """Fixtures (une ligne par match) -> dict de tableaux équipe × GW (× créneau)."""
+    teams = pd.DataFrame() if teams is None else teams
+    fx = fixtures.copy()
+    for c in FIXTURE_COLS:
+        if c not in fx.columns:
+            fx[c] = pd.NA
+    for c in ["id", "event", "team_h", "team_a", "team_h_difficulty", "team_a_difficulty"]:
+        fx[c] = pd.to_numeric(fx[c], errors="coerce")
+    unscheduled = int(fx["event"].isna().sum())
+    fx = fx[fx["event"].notna() & fx["team_h"].notna() & fx["team_a"].notna()]
+
+    # une ligne par (équipe, match) : côté domicile puis côté extérieur
+    home = pd.DataFrame({"team": fx["team_h"], "opp": fx["team_a"], "is_home": 1, "difficulty": fx["team_h_difficulty"]})
+    away = pd.DataFrame({"team": fx["team_a"], "opp": fx["team_h"], "is_home": 0, "difficulty": fx["team_a_difficulty"]})
+    common = {"fixture_id": fx["id"], "event": fx["event"],
+              "kickoff": pd.to_datetime(fx["kickoff_time"], utc=True, errors="coerce").dt.tz_localize(None),
+              "finished": fx["finished"].astype(str).str.lower().eq("true").astype(int)}
+    long = pd.concat([home.assign(**common), away.assign(**common)], ignore_index=True)
+    long = long.sort_values(["team", "kickoff", "event", "fixture_id"], kind="mergesort").reset_index(drop=True)
+
+    team_ids = np.union1d(long["team"].dropna().astype(int).unique(),
+                          pd.to_numeric(teams.get("id", pd.Series(dtype=float)), errors="coerce").dropna().astype(int))
+    n_gw = int(long["event"].max()) if not long.empty else 0
+    ti = np.searchsorted(team_ids, long["team"].astype(int).to_numpy())
+    gi = long["event"].astype(int).to_numpy() - 1
+    ki = long.groupby(["team", "event"]).cumcount().to_numpy()
+    K = int(ki.max()) + 1 if len(ki) else 1
+    shape = (len(team_ids), n_gw, K)
+
+    # repos depuis le match précédent de la même équipe (ordre chronologique)
+    prev_ko = long.groupby("team")["kickoff"].shift(1)
+    rest = ((long["kickoff"] - prev_ko).dt.total_seconds() / 86400.0).to_numpy(dtype=float)
+
+    opp = long["opp"].astype(int).to_numpy()
+    venue_opp = np.where(long["is_home"].to_numpy() == 1, "away", "home")  # l'adversaire joue l'autre côté
+
+    def strength(kind: str) -> np.ndarray:
+        h = _team_strength(teams, opp, kind, "home")
+        a = _team_strength(teams, opp, kind, "away")
+        return np.where(venue_opp == "home", h, a)
+
+    def grid(values, fill, dtype):
+        g = np.full(shape, fill, dtype=dtype)
+        g[ti, gi, ki] = values
+        return g
+
+    m = {
+        "team_ids": team_ids.astype(np.int64),
+        "gws": np.arange(1, n_gw + 1, dtype=np.int64),
+        "opponent": grid(opp, -1, np.int64),
+        "fixture_id": grid(long["fixture_id"].fillna(-1).astype(int).to_numpy(), -1, np.int64),
+        "is_home": grid(long["is_home"].to_numpy(), -1, np.int8),
+        "finished": grid(long["finished"].to_numpy(), -1, np.int8),
+        "difficulty": grid(long["difficulty"].to_numpy(dtype=float), np.nan, float),
+        "opp_strength": grid(strength("overall"), np.nan, float),
+        "opp_attack": grid(strength("attack"), np.nan, float),
+        "opp_defence": grid(strength("defence"), np.nan, float),
+        "kickoff": grid(long["kickoff"].to_numpy().astype("datetime64[s]"), np.datetime64("NaT"), "datetime64[s]"),
+        "rest_days": grid(rest, np.nan, float),
+    }
+    n = (m["opponent"] >= 0).sum(axis=2).astype(np.int8)
+    m["n_fixtures"] = n
+    m["blank"] = n == 0
+    m["double"] = n >= 2
+    rest_or_inf = np.where(np.isnan(m["rest_days"]), np.inf, m["rest_days"])
+    min_rest = rest_or_inf.min(axis=2)
+    m["min_rest_days"] = np.where(np.isinf(min_rest), np.nan, min_rest)
+    unfinished = (m["finished"] == 0).any(axis=(0, 2))
+    next_gw = int(m["gws"][unfinished].min()) if unfinished.any() else (n_gw or None)
+    m["meta"] = np.array(json.dumps({"next_gw": next_gw, "unscheduled": unscheduled}))
+    return m
+
+# --- Persistance (reconstruit seulement si fixtures/teams changent) ---
+def _read_meta(m: dict) -> dict:
+    return json.loads(str(m["meta"])) if "meta" in m else {}
+
+def load_matrix(path: Path = MATRIX_FILE) -> dict[str, np.ndarray] | None:
+    if not Path(path).exists():
+        return None
+    with np.load(path, allow_pickle=False) as z:
+        return {k: z[k] for k in z.files}
+
+def ensure_matrix(force: bool = False) -> tuple[dict[str, np.ndarray], bool]:
+    """Matrice à jour ; renvoie (matrice, reconstruite?)."""
+    hashes = {"fixtures_sha1": _sha1(FIXTURES_CSV), "teams_sha1": _sha1(TEAMS_CSV)}
+    m = None if force else load_matrix()
+    if m is not None and all(_read_meta(m).get(k) == v for k, v in hashes.items()):
+        return m, False
+    if not FIXTURES_CSV.exists():
+        raise SystemExit("[ERROR] data/fixtures.csv introuvable.")
+    fixtures = pd.read_csv(FIXTURES_CSV, usecols=lambda c: c in FIXTURE_COLS)
+    teams = pd.read_csv(TEAMS_CSV) if TEAMS_CSV.exists() else pd.DataFrame()
+    m = build_matrix(fixtures, teams)
+    meta = {**_read_meta(m), **hashes, "built_at_utc": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")}
+    m["meta"] = np.array(json.dumps(meta))
+    MATRIX_FILE.parent.mkdir(parents=True, exist_ok=True)
+    np.savez_compressed(MATRIX_FILE, **m)
+    return m, True
+
+# --- Requêtes (tranches) ---
+def gw_slice(m: dict, start_gw: int | None, n: int) -> slice:
+    start = _read_meta(m).get("next_gw") if start_gw is None else start_gw
+    start = int(start or 1)
+    return slice(start - 1, min(start - 1 + n, len(m["gws"])))
+
+def outlook(m: dict, start_gw: int | None = None, n_fixtures: int = 3) -> list[dict]:
+    """Les n prochains matchs de chaque équipe à partir de start_gw (défaut: prochaine GW)."""
+    sl = gw_slice(m, start_gw, len(m["gws"]))
+    T, _, K = m["opponent"].shape
+    opp = m["opponent"][:, sl].reshape(T, -1)
+    gws = np.repeat(m["gws"][sl], K)
+    home = m["is_home"][:, sl].reshape(T, -1)
+    diff = m["difficulty"][:, sl].reshape(T, -1)
+    out = []
+    for t in range(T):
+        cols = np.flatnonzero(opp[t] >= 0)[:n_fixtures]
+        out.append({
+            "team_id": int(m["team_ids"][t]),
+            "gw_sequence": gws[cols].tolist(),
+            "opponents": opp[t, cols].tolist(),
+            "is_home": home[t, cols].astype(int).tolist(),
+            "difficulty": [None if np.isnan(x) else float(x) for x in diff[t, cols]],
+        })
+    return out
+
+def difficulty_ranking(m: dict, start_gw: int | None = None, horizon: int = HORIZON) -> pd.DataFrame:
+    """Difficulté moyenne par match sur l'horizon (blanks exclus, doubles comptés), du plus facile au plus dur."""
+    sl = gw_slice(m, start_gw, horizon)
+    d = m["difficulty"][:, sl]
+    n = m["n_fixtures"][:, sl].sum(axis=1)
+    s = m["opp_strength"][:, sl]
+    with np.errstate(invalid="ignore"):
+        avg = np.nansum(d, axis=(1, 2)) / np.where(n > 0, n, np.nan)
+        avg_s = np.nansum(s, axis=(1, 2)) / np.where(n > 0, n, np.nan)
+    df = pd.DataFrame({
+        "team_id": m["team_ids"],
+        "n_fixtures": n.astype(int),
+        "avg_difficulty": np.round(avg, 3),
+        "avg_opp_strength": np.round(avg_s, 1),
+        "blanks": m["blank"][:, sl].sum(axis=1),
+        "doubles": m["double"][:, sl].sum(axis=1),
+    })
+    return df.sort_values(["avg_difficulty", "n_fixtures"], ascending=[True, False], kind="mergesort").reset_index(drop=True)
+
+def blanks_doubles(m: dict, start_gw: int | None = None, horizon: int = HORIZON) -> dict[str, list[dict]]:
+    sl = gw_slice(m, start_gw, horizon)
+    gws = m["gws"][sl]
+    res = {}
+    for key in ("blank", "double"):
+        t, g = np.nonzero(m[key][:, sl])
+        res[key] = [{"team_id": int(m["team_ids"][a]), "gw": int(gws[b])} for a, b in zip(t, g)]
+    return res
+
+def main():
+    ap = argparse.ArgumentParser(description="Build the team x GW fixture matrix (rebuilt only when fixtures change).")
+    ap.add_argument("--force", action="store_true", help="Reconstruit même si fixtures/teams n'ont pas changé.")
+    ap.add_argument("--horizon", type=int, default=HORIZON, help="Horizon (GWs) du classement affiché.")
+    args = ap.parse_args()
+
+    m, rebuilt = ensure_matrix(force=args.force)
+    meta = _read_meta(m)
+    T, G, K = m["opponent"].shape
+    print(f"[INFO] {T} équipes × {G} GWs × {K} créneau(x), prochaine GW {meta.get('next_gw')}, "
+          f"{int(m['blank'].sum())} blanks, {int(m['double'].sum())} doubles")
+    print(difficulty_ranking(m, horizon=args.horizon).head(5).to_string(index=False))
+    print(f"[PASS] {MATRIX_FILE.name} {'rebuilt' if rebuilt else 'up to date'}")
+
+if __name__ == "__main__":
+    main()
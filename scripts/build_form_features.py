@@ -0,0 +1,279 @@
+# scripts/build_form_features.py
+"""
+Feature store de forme : fenêtres glissantes par joueur sur les données par match.
+
+Base : une ligne par joueur × match (partitions gw_permatch de merged_gw_permatch, triées par
+player_id, gw, kickoff_time, fixture). Métriques : points, minutes, xg, xa, xgi, bps, ict.
+Les colonnes absentes des lignes par match (explain ne porte ni points, ni xG, ni BPS, ni ICT) sont
+reprises des totaux gwN.csv quand le joueur n'a qu'un match dans la GW ; NaN sur les doubles GW.
+
+Features (fin de match, match courant inclus) :
+- <m>_roll3 / _roll5 / _roll8 : moyenne des 3/5/8 derniers matchs (valeurs renseignées)
+- <m>_ewm3 / _ewm5 / _ewm8   : moyenne exponentielle (span 3/5/8, adjust=True, NaN ignorés
+  comme pandas ewm(ignore_na=False))
+Calcul vectorisé sur le tableau trié : sommes cumulées par groupe (fenêtres) et récurrence EWM
+appliquée rang par rang à tous les joueurs à la fois — pas de boucle par joueur.
+
+Stockage typé et indexé : data/features/form_features.npz
+- colonnes (clés int64 / datetime64[s], métriques float64, features float32), lignes triées par joueur ; players + player_offsets
+  (index CSR : lignes d'un joueur = [offsets[i], offsets[i+1]))
+- état EWM par joueur (numérateur / dénominateur) et hash des partitions sources par GW (meta)
+Mise à jour incrémentale : nouvelles GW après la dernière stockée -> seules leurs lignes sont
+calculées (contexte = 7 derniers matchs de chaque joueur + état EWM) ; GW modifiée ou retirée
+-> reconstruction complète. Chargement modèle : load_features() (une lecture).
+
+Usage :
+  python scripts/build_form_features.py [--rebuild]
+"""
+
+from __future__ import annotations
+import argparse
+import json
+from datetime import datetime, timezone
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+from gw_partitions import SEASON, dataset_dir, update_partitions
+
+ROOT = Path(__file__).resolve().parents[1]
+FEATURES_DIR = ROOT / "data" / "features"
+FEATURES_FILE = FEATURES_DIR / "form_features.npz"
+STORE_VERSION = 2  # 2 : EWM par récurrence (les stores v1 portent des EWM faussés) -> reconstruction
+
+METRICS = {
+    "points": "total_points", "minutes": "minutes", "xg": "expected_goals", "xa": "expected_assists",
+    "xgi": "expected_goal_involvements", "bps": "bps", "ict": "ict_index",
+}
+WINDOWS = [3, 5, 8]
+KEY_COLS = ["player_id", "gw", "fixture", "kickoff"]
+
+def feature_columns() -> list[str]:
+    return [f"{m}_{kind}{k}" for m in METRICS for kind in ("roll", "ewm") for k in WINDOWS]
+
+# --- Base par match ---
+def match_rows(pm: pd.DataFrame, totals: pd.DataFrame | None) -> pd.DataFrame:
+    """Lignes joueur × match d'une GW : clés + métriques (complétées par les totaux si match unique)."""
+    pid = "player_id" if "player_id" in pm.columns else "element"
+    out = pd.DataFrame({
+        "player_id": pd.to_numeric(pm[pid], errors="coerce"),
+        "gw": pd.to_numeric(pm["gw"], errors="coerce"),
+        "fixture": pd.to_numeric(pm.get("fixture"), errors="coerce"),
+        "kickoff": pd.to_datetime(pm.get("kickoff_time"), utc=True, errors="coerce").dt.tz_localize(None),
+    })
+    out = out[out["player_id"].notna() & out["gw"].notna()].astype({"player_id": "int64", "gw": "int64"})
+    n_matches = out.groupby(["player_id", "gw"])["player_id"].transform("size")
+    tot = None
+    if totals is not None and not totals.empty:
+        tid = "element" if "element" in totals.columns else "player_id"
+        tot = totals.assign(player_id=pd.to_numeric(totals[tid], errors="coerce")).drop_duplicates("player_id")
+        tot = tot.set_index("player_id")
+    for m, col in METRICS.items():
+        vals = pd.to_numeric(pm.loc[out.index, col], errors="coerce") if col in pm.columns else None
+        if (vals is None or vals.isna().all()) and tot is not None and col in tot.columns:
+            from_tot = pd.to_numeric(out["player_id"].map(tot[col]), errors="coerce")
+            vals = from_tot.where(n_matches == 1)
+        out[m] = vals if vals is not None else np.nan
+    return out
+
+def sort_rows(df: pd.DataFrame) -> pd.DataFrame:
+    return df.sort_values(["player_id", "gw", "kickoff", "fixture"], kind="mergesort", na_position="last").reset_index(drop=True)
+
+# --- Calcul vectorisé (tableau trié par joueur) ---
+def _group_layout(pids: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """(début de groupe de chaque ligne, rang dans le groupe)."""
+    n = len(pids)
+    new = np.r_[True, pids[1:] != pids[:-1]] if n else np.zeros(0, dtype=bool)
+    starts = np.flatnonzero(new)
+    start_of = starts[np.cumsum(new) - 1] if n else np.zeros(0, dtype=np.int64)
+    return start_of, np.arange(n) - start_of
+
+def rolling_means(x: np.ndarray, start_of: np.ndarray, windows: list[int]) -> dict[int, np.ndarray]:
+    """Moyennes sur les k dernières lignes du groupe (NaN ignorés) : différences de sommes cumulées."""
+    ok = ~np.isnan(x)
+    cs = np.r_[0.0, np.cumsum(np.where(ok, x, 0.0))]
+    cn = np.r_[0, np.cumsum(ok)]
+    i = np.arange(len(x))
+    out = {}
+    for k in windows:
+        lo = np.maximum(i - k + 1, start_of)
+        s, c = cs[i + 1] - cs[lo], cn[i + 1] - cn[lo]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            out[k] = np.where(c > 0, s / np.maximum(c, 1), np.nan)
+    return out
+
+def ewm_means(x: np.ndarray, rank: np.ndarray, span: int,
+              num0: np.ndarray, den0: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    EWM adjust=True par groupe (lignes triées, rang dans le groupe), avec état initial (num0, den0)
+    par ligne (0 = début de série) :
+    récurrence num_i = w·num_{i-1} + x_i (num_{-1} = num0), den idem avec 1[x_i renseigné].
+    Une passe par rang (tous les joueurs à la fois) : pas de sommes cumulées mises à l'échelle
+    w^-r, dont la différence perdait les petites valeurs (annulation float64) sur une saison.
+    Renvoie (moyennes, num, den).
+    """
+    w = 1.0 - 2.0 / (span + 1.0)
+    ok = ~np.isnan(x)
+    a = np.where(ok, x, 0.0)
+    b = ok.astype(float)
+    num, den = np.empty(len(x)), np.empty(len(x))
+    order = np.argsort(rank, kind="stable")
+    bounds = np.searchsorted(rank[order], np.arange(int(rank.max(initial=-1)) + 2))
+    for r in range(len(bounds) - 1):
+        idx = order[bounds[r]:bounds[r + 1]]
+        prev_num = w * num0[idx] if r == 0 else w * num[idx - 1]
+        prev_den = w * den0[idx] if r == 0 else w * den[idx - 1]
+        num[idx] = prev_num + a[idx]
+        den[idx] = prev_den + b[idx]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.where(den > 0, num / np.where(den > 0, den, 1.0), np.nan)
+    return mean, num, den
+
+def compute_features(rows: pd.DataFrame, seed: dict[str, pd.Series] | None = None) -> tuple[pd.DataFrame, dict]:
+    """
+    Features de lignes triées par joueur. seed : état EWM {"<m>_<k>_num"/"_den": Series par player_id}
+    appliqué à la 1re ligne de chaque joueur. Renvoie (features, état final par joueur).
+    """
+    pids = rows["player_id"].to_numpy()
+    start_of, rank = _group_layout(pids)
+    last = np.r_[pids[1:] != pids[:-1], True] if len(pids) else np.zeros(0, dtype=bool)
+    feats, state = {}, {}
+    for m in METRICS:
+        x = rows[m].to_numpy(dtype=float)
+        for k, v in rolling_means(x, start_of, WINDOWS).items():
+            feats[f"{m}_roll{k}"] = v
+        for k in WINDOWS:
+            num0 = den0 = np.zeros(len(x))
+            if seed is not None:
+                num0 = pd.Series(pids).map(seed[f"{m}_{k}_num"]).fillna(0.0).to_numpy()
+                den0 = pd.Series(pids).map(seed[f"{m}_{k}_den"]).fillna(0.0).to_numpy()
+            mean, num, den = ewm_means(x, rank, k, num0, den0)
+            feats[f"{m}_ewm{k}"] = mean
+            state[f"{m}_{k}_num"] = pd.Series(num[last], index=pids[last])
+            state[f"{m}_{k}_den"] = pd.Series(den[last], index=pids[last])
+    return pd.DataFrame(feats, index=rows.index)[feature_columns()], state
+
+# --- Stockage (npz typé + index CSR par joueur) ---
+def _to_arrays(table: pd.DataFrame, state: dict, meta: dict) -> dict[str, np.ndarray]:
+    pids = table["player_id"].to_numpy(dtype=np.int64)
+    players, offsets = np.unique(pids, return_index=True)
+    arr = {
+        "player_id": pids,
+        "gw": table["gw"].to_numpy(dtype=np.int64),
+        "fixture": table["fixture"].fillna(-1).to_numpy(dtype=np.int64),
+        "kickoff": table["kickoff"].to_numpy().astype("datetime64[s]"),
+        "players": players,
+        "player_offsets": np.r_[offsets, len(pids)].astype(np.int64),
+        "meta": np.array(json.dumps(meta)),
+    }
+    for c in METRICS:
+        arr[c] = table[c].to_numpy(dtype=np.float64)
+    for c in feature_columns():
+        arr[c] = table[c].to_numpy(dtype=np.float32)
+    for name, s in state.items():
+        arr[f"state_{name}"] = s.reindex(players).to_numpy(dtype=float)
+    return arr
+
+def load_store(path: Path = FEATURES_FILE) -> dict[str, np.ndarray] | None:
+    if not Path(path).exists():
+        return None
+    with np.load(path, allow_pickle=False) as z:
+        return {k: z[k] for k in z.files}
+
+def store_meta(store: dict) -> dict:
+    return json.loads(str(store["meta"])) if store is not None and "meta" in store else {}
+
+def store_frame(store: dict) -> pd.DataFrame:
+    cols = KEY_COLS + list(METRICS) + feature_columns()
+    df = pd.DataFrame({c: store[c] for c in cols})
+    df["fixture"] = df["fixture"].where(df["fixture"] >= 0).astype("Int64")
+    return df
+
+def store_state(store: dict) -> dict[str, pd.Series]:
+    return {k[len("state_"):]: pd.Series(store[k], index=store["players"]) for k in store if k.startswith("state_")}
+
+def load_features(path: Path = FEATURES_FILE) -> pd.DataFrame:
+    """Table des features indexée par (player_id, fixture), triée par joueur puis match."""
+    store = load_store(path)
+    if store is None:
+        raise FileNotFoundError(f"{path} introuvable — lancer build_form_features.py")
+    return store_frame(store).set_index(["player_id", "fixture"])
+
+def player_rows(store: dict, player_id: int) -> slice:
+    """Lignes d'un joueur dans les tableaux du store (recherche dichotomique dans l'index)."""
+    i = int(np.searchsorted(store["players"], player_id))
+    if i >= len(store["players"]) or store["players"][i] != player_id:
+        return slice(0, 0)
+    return slice(int(store["player_offsets"][i]), int(store["player_offsets"][i + 1]))
+
+# --- Mise à jour ---
+def source_hashes() -> dict[str, str]:
+    """Hash par GW des partitions sources (par match + totaux), partitions mises à jour au passage."""
+    pm = update_partitions("gw_permatch", SEASON)["manifest"]["partitions"]
+    tot = update_partitions("gw", SEASON)["manifest"]["partitions"]
+    return {g: f"{pm[g]['sha1']}:{tot.get(g, {}).get('sha1', '')}" for g in pm}
+
+def read_gw_rows(gws: list[int]) -> pd.DataFrame:
+    frames = []
+    for gw in gws:
+        pm = pd.read_csv(dataset_dir("gw_permatch") / f"gw{gw}.csv")
+        tot_path = dataset_dir("gw") / f"gw{gw}.csv"
+        frames.append(match_rows(pm, pd.read_csv(tot_path) if tot_path.exists() else None))
+    frames = [f for f in frames if not f.empty]
+    return sort_rows(pd.concat(frames, ignore_index=True)) if frames else pd.DataFrame(columns=KEY_COLS + list(METRICS))
+
+def update_features(rebuild: bool = False) -> tuple[pd.DataFrame, dict]:
+    """Met à jour le store ; renvoie (table, {"mode", "gws"})."""
+    hashes = source_hashes()
+    store = None if rebuild else load_store()
+    meta = store_meta(store)
+    old = meta.get("gw_hashes", {}) if meta.get("version") == STORE_VERSION else {}
+    changed = sorted(int(g) for g in hashes if old.get(g) != hashes[g])
+    kept = [int(g) for g in old if g in hashes and old[g] == hashes[g]]
+    removed = [g for g in old if g not in hashes]
+    append = store is not None and bool(old) and not removed and (not changed or min(changed) > max(kept, default=0))
+
+    if append and not changed:
+        return store_frame(store), {"mode": "up to date", "gws": []}
+    if append:
+        prev = store_frame(store)
+        new = read_gw_rows(changed)
+        # contexte fenêtres : 7 derniers matchs de chaque joueur concerné
+        ctx = prev[prev["player_id"].isin(new["player_id"].unique())].groupby("player_id").tail(max(WINDOWS) - 1)
+        ctx = ctx[KEY_COLS + list(METRICS)]
+        both = sort_rows(pd.concat([ctx.assign(_new=False), new.assign(_new=True)], ignore_index=True))
+        prev_state = store_state(store)
+        # EWM : état du dernier match stocké, appliqué à la 1re ligne nouvelle (contexte exclu)
+        only_new = both[both["_new"]].reset_index(drop=True)
+        feats_new, state_new = compute_features(only_new, seed=prev_state)
+        roll_all, _ = compute_features(both.drop(columns="_new"))
+        roll_cols = [c for c in feature_columns() if "_roll" in c]
+        feats_new[roll_cols] = roll_all.loc[both["_new"].to_numpy(), roll_cols].to_numpy()
+        table = sort_rows(pd.concat([prev, pd.concat([only_new.drop(columns="_new"), feats_new], axis=1)],
+                                    ignore_index=True))
+        state = {k: state_new[k].combine_first(prev_state.get(k, pd.Series(dtype=float))) for k in state_new}
+        mode, gws = "append", changed
+    else:
+        rows = read_gw_rows(sorted(int(g) for g in hashes))
+        feats, state = compute_features(rows)
+        table = pd.concat([rows, feats], axis=1)
+        mode, gws = "rebuild", sorted(int(g) for g in hashes)
+
+    meta = {"version": STORE_VERSION, "gw_hashes": hashes, "windows": WINDOWS, "metrics": METRICS,
+            "rows": int(len(table)), "built_at_utc": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")}
+    FEATURES_DIR.mkdir(parents=True, exist_ok=True)
+    np.savez_compressed(FEATURES_FILE, **_to_arrays(table, state, meta))
+    return table, {"mode": mode, "gws": gws}
+
+def main():
+    ap = argparse.ArgumentParser(description="Build the per-player rolling-form feature store from per-match data.")
+    ap.add_argument("--rebuild", action="store_true", help="Recalcule toutes les GW.")
+    args = ap.parse_args()
+
+    table, info = update_features(rebuild=args.rebuild)
+    print(f"[INFO] {info['mode']} : GW {info['gws']} ; {len(table):,} lignes, "
+          f"{table['player_id'].nunique() if len(table) else 0} joueurs, {len(feature_columns())} features")
+    print(f"[PASS] {FEATURES_FILE.name} written")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,352 @@
+# scripts/build_model_input.py
+"""
+Jeu d'entrée modèle unique, pré-joint et typé, une ligne par (player_id, gw) — remplace la liste
+de fichiers de data/FPL- files for model.txt (snapshot, historiques, forecast, fixtures, deadlines,
+gwX, merged_gw) lus et joints à chaque lancement du modèle.
+
+Colonnes (état à la deadline de la GW, sans fuite d'information) :
+- clés : player_id, gw, deadline
+- état joueur : dernier snapshot players_raw avant la deadline (équipe, poste, prix, ownership,
+  statut, chance de jouer, transferts de la GW)
+- tendance prix / ownership : écart avec le snapshot précédant la deadline de TREND_DAYS jours
+- NTI / forecast : dernière ligne de price_change_forecast_history avant la deadline
+- fixtures : matrice build_fixture_matrix (nb de matchs, FDR moyen, force adverse, part à domicile,
+  blank / double, repos min, FDR moyen des 3 GW suivantes)
+- forme : features build_form_features du dernier match des GW précédentes (préfixe form_)
+- cibles : points et minutes de la GW (totaux gwN, NaN pour la GW à venir)
+GW couvertes : 1 .. prochaine GW (deadlines.csv).
+
+Stockage colonnaire : data/model_input/<colonne>.npy (un tableau typé par colonne, lignes triées
+par gw puis player_id) + _manifest.json (dtypes, vocabulaires des catégories, blocs de lignes et
+signature des entrées par GW, sha1 par colonne). Lecture = np.load(mmap_mode="r") par colonne
+(load_model_input). Seules les colonnes dont le contenu change sont réécrites ; data/model_input est
+un artefact de build hors git (conservé en CI par actions/cache avec data/partitions).
+Incrémental : signature par GW (snapshots retenus, dernière ligne forecast, tranche de la matrice,
+hash des GW de forme antérieures, partition des totaux) ; seules les GW dont la signature change sont
+recalculées, les autres blocs sont recopiés tels quels.
+
+Usage :
+  python scripts/build_model_input.py [--rebuild]
+"""
+
+from __future__ import annotations
+import argparse
+import hashlib
+import json
+import os
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+from utils_io import list_all_snapshots
+from gw_partitions import SEASON, dataset_dir, update_partitions
+from build_fixture_matrix import ensure_matrix
+from build_form_features import load_store, store_frame, store_meta, feature_columns
+
+ROOT = Path(__file__).resolve().parents[1]
+DATA_DIR = ROOT / "data"
+SNAP_DIR = DATA_DIR / "snapshots"
+DEADLINES_CSV = DATA_DIR / "deadlines.csv"
+FORECAST_HIST = DATA_DIR / "price_change_forecast_history.csv"
+OUT_DIR = DATA_DIR / "model_input"
+MANIFEST = OUT_DIR / "_manifest.json"
+INPUT_VERSION = 1
+
+PLAYERS_STEM = "players_raw"
+STATE_COLS = ["team", "element_type", "now_cost", "selected_by_percent", "chance_of_playing_next_round",
+              "transfers_in_event", "transfers_out_event"]
+FORECAST_COLS = ["NTI_1h", "NTI_24h", "risk_up", "risk_down"]
+CATEGORIES = {
+    "status": ["a", "d", "i", "s", "u", "n"],
+    "momentum": ["up", "down", "flat"],
+    "forecast": ["+0.1", "-0.1", "stable"],
+}
+TREND_DAYS = 7
+OUTLOOK_GWS = 3
+KEY_COLS = ["player_id", "gw"]
+INT_COLS = {"team", "element_type", "n_fixtures"}  # -1 = inconnu (comme les codes de catégories)
+
+# --- Entrées ---
+def load_deadlines() -> tuple[pd.DataFrame, int]:
+    """(deadlines par GW en UTC naïf, prochaine GW)."""
+    d = pd.read_csv(DEADLINES_CSV)
+    d = d.rename(columns={"id": "gw"})[["gw", "deadline_time"] + [c for c in ["is_next"] if c in d.columns]]
+    d["deadline"] = pd.to_datetime(d["deadline_time"], utc=True).dt.tz_localize(None)
+    nxt = d.loc[d["is_next"].astype(str) == "True", "gw"] if "is_next" in d.columns else pd.Series(dtype=int)
+    if nxt.empty:
+        future = d.loc[d["deadline"] > pd.Timestamp.utcnow().tz_localize(None), "gw"]
+        nxt = future.head(1) if not future.empty else d["gw"].tail(1)
+    return d[["gw", "deadline"]], int(nxt.iloc[0])
+
+def snapshot_before(snaps: list[tuple[datetime, Path]], t: pd.Timestamp) -> Path | None:
+    """Dernier snapshot players_raw horodaté avant t (horodatages UTC de list_all_snapshots)."""
+    ts = [s for s, _ in snaps]
+    i = int(np.searchsorted(np.array(ts, dtype="datetime64[s]"), np.datetime64(t.to_pydatetime(), "s"), side="right"))
+    return snaps[i - 1][1] if i > 0 else None
+
+def read_state(path: Path | None) -> pd.DataFrame:
+    cols = {"id", "status", *STATE_COLS}
+    if path is None:
+        return pd.DataFrame(columns=["id", "status", *STATE_COLS])
+    df = pd.read_csv(path, usecols=lambda c: c.strip() in cols)
+    for c in cols - set(df.columns):
+        df[c] = np.nan
+    df["id"] = pd.to_numeric(df["id"], errors="coerce")
+    return df[df["id"].notna()].astype({"id": "int64"}).drop_duplicates("id", keep="last")
+
+def fixture_tables(m: dict) -> dict[str, np.ndarray]:
+    """Résumés (équipe × GW) de la matrice fixtures."""
+    occupied = m["opponent"] >= 0
+    with np.errstate(invalid="ignore"):
+        diff = np.nanmean(m["difficulty"], axis=2)
+        home = np.where(m["n_fixtures"] > 0,
+                        (m["is_home"] == 1).sum(axis=2) / np.maximum(occupied.sum(axis=2), 1), np.nan)
+        out = {
+            "n_fixtures": m["n_fixtures"].astype(np.int64),
+            "fdr_mean": diff,
+            "opp_strength_mean": np.nanmean(m["opp_strength"], axis=2),
+            "home_share": home,
+            "blank": m["blank"],
+            "double": m["double"],
+            "min_rest_days": m["min_rest_days"],
+        }
+        # FDR moyen des OUTLOOK_GWS GW à partir de g (créneaux renseignés)
+        d = m["difficulty"]
+        s = np.nan_to_num(d).sum(axis=2)
+        c = (~np.isnan(d)).sum(axis=2)
+        cs = np.concatenate([np.zeros((d.shape[0], 1)), np.cumsum(s, axis=1)], axis=1)
+        cc = np.concatenate([np.zeros((d.shape[0], 1)), np.cumsum(c, axis=1)], axis=1)
+        g = np.arange(d.shape[1])
+        hi = np.minimum(g + OUTLOOK_GWS, d.shape[1])
+        out[f"fdr_next{OUTLOOK_GWS}"] = np.where(cc[:, hi] - cc[:, g] > 0,
+                                                (cs[:, hi] - cs[:, g]) / np.maximum(cc[:, hi] - cc[:, g], 1), np.nan)
+    return out
+
+# --- Signature par GW ---
+def _sha1(obj) -> str:
+    return hashlib.sha1(json.dumps(obj, sort_keys=True, default=str).encode()).hexdigest()
+
+def gw_signatures(deadlines: pd.DataFrame, snaps, fc_times: pd.Series, m: dict, form_hashes: dict,
+                  totals: dict) -> dict[str, str]:
+    sigs = {}
+    team_ids, n_gw = m["team_ids"], len(m["gws"])
+    for gw, dl in deadlines[["gw", "deadline"]].itertuples(index=False):
+        now_snap = snapshot_before(snaps, dl)
+        prev_snap = snapshot_before(snaps, dl - timedelta(days=TREND_DAYS))
+        fc = fc_times[fc_times <= dl]
+        gi = slice(gw - 1, min(gw - 1 + OUTLOOK_GWS, n_gw))
+        mat = hashlib.sha1(b"".join(np.ascontiguousarray(m[k][:, gi]).tobytes()
+                                    for k in ("opponent", "difficulty", "is_home", "opp_strength"))).hexdigest()
+        sigs[str(gw)] = _sha1({
+            "v": INPUT_VERSION, "deadline": dl, "teams": team_ids.tolist(),
+            "snap": now_snap.name if now_snap else None, "prev": prev_snap.name if prev_snap else None,
+            "fc": fc.max() if not fc.empty else None, "matrix": mat,
+            "form": {g: h for g, h in form_hashes.items() if int(g) < gw},
+            "totals": totals.get(str(gw), {}).get("sha1"),
+        })
+    return sigs
+
+# --- Construction d'un bloc GW ---
+def build_gw_block(gw: int, dl: pd.Timestamp, snaps, fc: pd.DataFrame, fx: dict, team_ids: np.ndarray,
+                   form: pd.DataFrame) -> pd.DataFrame:
+    state = read_state(snapshot_before(snaps, dl))
+    prev = read_state(snapshot_before(snaps, dl - timedelta(days=TREND_DAYS)))
+    tot_path = dataset_dir("gw") / f"gw{gw}.csv"
+    tot = pd.read_csv(tot_path) if tot_path.exists() else pd.DataFrame(columns=["element"])
+    tid = "element" if "element" in tot.columns else "player_id"
+    tot = tot.assign(player_id=pd.to_numeric(tot[tid], errors="coerce")).dropna(subset=["player_id"])
+    tot = tot.astype({"player_id": "int64"}).drop_duplicates("player_id")
+
+    ids = np.union1d(state["id"].to_numpy(dtype=np.int64), tot["player_id"].to_numpy(dtype=np.int64))
+    out = pd.DataFrame({"player_id": ids, "gw": gw, "deadline": dl})
+    st = state.set_index("id")
+    for c in STATE_COLS + ["status"]:
+        out[c] = out["player_id"].map(st[c]).to_numpy()
+    pv = prev.set_index("id")
+    out["cost_delta_7d"] = pd.to_numeric(out["now_cost"], errors="coerce") - pd.to_numeric(out["player_id"].map(pv["now_cost"]), errors="coerce")
+    out["own_delta_7d"] = (pd.to_numeric(out["selected_by_percent"], errors="coerce")
+                           - pd.to_numeric(out["player_id"].map(pv["selected_by_percent"]), errors="coerce"))
+
+    # NTI / forecast : dernière ligne avant la deadline
+    last_fc = fc[fc["t"] <= dl].drop_duplicates("id", keep="last").set_index("id")
+    for c in FORECAST_COLS + ["momentum", "forecast"]:
+        out[c] = out["player_id"].map(last_fc[c]).to_numpy() if c in last_fc.columns else np.nan
+
+    # fixtures : équipe du joueur à la deadline (sinon équipe des totaux)
+    team = pd.to_numeric(out["team"], errors="coerce")
+    if "team" in tot.columns:
+        team = team.fillna(out["player_id"].map(tot.set_index("player_id")["team"]))
+    ti = np.searchsorted(team_ids, team.fillna(-1).to_numpy(dtype=np.int64))
+    ok = (ti < len(team_ids)) & (team_ids[np.minimum(ti, len(team_ids) - 1)] == team.fillna(-1).to_numpy()) \
+        & (gw <= fx["n_fixtures"].shape[1])
+    for k, arr in fx.items():
+        vals = np.full(len(out), np.nan)
+        vals[ok] = arr[ti[ok], gw - 1]
+        out[k] = vals
+
+    # forme : dernier match des GW précédentes
+    if not form.empty:
+        prior = form[form["gw"] < gw].drop_duplicates("player_id", keep="last").set_index("player_id")
+        for c in feature_columns():
+            out[f"form_{c}"] = out["player_id"].map(prior[c]).to_numpy(dtype=float)
+
+    # cibles
+    t = tot.set_index("player_id")
+    for c, name in (("total_points", "target_points"), ("minutes", "target_minutes")):
+        out[name] = pd.to_numeric(out["player_id"].map(t[c]), errors="coerce") if c in t.columns else np.nan
+    return out
+
+# --- Typage / stockage ---
+def to_columns(df: pd.DataFrame) -> dict[str, np.ndarray]:
+    cols = {}
+    for c in df.columns:
+        s = df[c]
+        if c in CATEGORIES:
+            cats = CATEGORIES[c]
+            codes = pd.Categorical(s.astype("string").str.strip(), categories=cats).codes
+            cols[c] = codes.astype(np.int8)
+        elif c == "deadline":
+            cols[c] = s.to_numpy().astype("datetime64[s]")
+        elif c in ("blank", "double"):
+            cols[c] = np.where(pd.isna(s), -1, s.fillna(False).astype(bool).astype(np.int8)).astype(np.int8)
+        elif c in KEY_COLS:
+            cols[c] = s.to_numpy(dtype=np.int64)
+        elif c in INT_COLS:
+            cols[c] = pd.to_numeric(s, errors="coerce").fillna(-1).to_numpy(dtype=np.int64)
+        elif c.startswith("form_"):
+            cols[c] = pd.to_numeric(s, errors="coerce").to_numpy(dtype=np.float32)
+        else:
+            cols[c] = pd.to_numeric(s, errors="coerce").to_numpy(dtype=np.float64)
+    return cols
+
+def load_manifest_mi() -> dict | None:
+    if not MANIFEST.exists():
+        return None
+    with open(MANIFEST, "r", encoding="utf-8") as f:
+        m = json.load(f)
+    return m if m.get("version") == INPUT_VERSION else None
+
+def load_model_input(columns: list[str] | None = None, mmap_mode: str | None = "r") -> dict[str, np.ndarray]:
+    """Colonnes du jeu d'entrée (memmap en lecture seule par défaut)."""
+    man = load_manifest_mi()
+    if man is None:
+        raise FileNotFoundError(f"{MANIFEST} introuvable — lancer build_model_input.py")
+    names = columns or list(man["columns"])
+    return {c: np.load(OUT_DIR / man["columns"][c]["file"], mmap_mode=mmap_mode) for c in names}
+
+def model_frame(columns: list[str] | None = None) -> pd.DataFrame:
+    """DataFrame (catégories décodées, entiers -1 -> NA) indexé par (player_id, gw)."""
+    man = load_manifest_mi()
+    arrs = load_model_input(columns)
+    df = pd.DataFrame({c: np.asarray(a) for c, a in arrs.items()})
+    for c, spec in man["columns"].items():
+        if c in df.columns and "categories" in spec:
+            df[c] = pd.Categorical.from_codes(df[c], categories=spec["categories"])
+        elif c in df.columns and "na" in spec:
+            df[c] = df[c].astype("Int64").mask(df[c] == spec["na"])
+    return df.set_index(KEY_COLS) if set(KEY_COLS) <= set(df.columns) else df
+
+def write_store(cols: dict[str, np.ndarray], blocks: dict[str, list[int]], sigs: dict[str, str],
+                old_man: dict | None) -> list[str]:
+    """
+    Écrit seulement les colonnes dont le contenu a changé (sha1 du manifest précédent), chacune via
+    un .tmp + os.replace, puis le manifest en dernier ; renvoie les colonnes réécrites.
+    """
+    OUT_DIR.mkdir(parents=True, exist_ok=True)
+    old_spec = (old_man or {}).get("columns", {})
+    spec, written = {}, []
+    for c, arr in cols.items():
+        arr = np.ascontiguousarray(arr)
+        digest = hashlib.sha1(str(arr.dtype).encode() + arr.tobytes()).hexdigest()
+        spec[c] = {"file": f"{c}.npy", "dtype": str(arr.dtype), "sha1": digest}
+        if c in CATEGORIES:
+            spec[c]["categories"] = CATEGORIES[c]
+        elif c in INT_COLS or c in ("blank", "double"):
+            spec[c]["na"] = -1
+        if old_spec.get(c, {}).get("sha1") != digest or not (OUT_DIR / f"{c}.npy").exists():
+            tmp = OUT_DIR / f"{c}.npy.tmp"
+            with open(tmp, "wb") as f:
+                np.save(f, arr)
+            os.replace(tmp, OUT_DIR / f"{c}.npy")
+            written.append(c)
+    for c in set(old_spec) - set(spec):
+        (OUT_DIR / old_spec[c]["file"]).unlink(missing_ok=True)
+    man = {"version": INPUT_VERSION, "key": KEY_COLS, "rows": int(len(cols["gw"])),
+           "columns": spec, "gw_blocks": blocks, "gw_signatures": sigs,
+           "built_at_utc": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")}
+    tmp = MANIFEST.with_suffix(".json.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(man, f, ensure_ascii=False, indent=1)
+    os.replace(tmp, MANIFEST)
+    return written
+
+# --- Mise à jour ---
+def update_model_input(rebuild: bool = False) -> dict:
+    """Recalcule les blocs GW dont la signature a changé ; renvoie {"rebuilt", "kept", "rows"}."""
+    deadlines, next_gw = load_deadlines()
+    deadlines = deadlines[deadlines["gw"] <= next_gw]
+    snaps = list_all_snapshots(SNAP_DIR, PLAYERS_STEM)
+    fc_times = pd.Series(dtype="datetime64[ns]")
+    if FORECAST_HIST.exists():
+        fc_times = pd.to_datetime(pd.read_csv(FORECAST_HIST, usecols=["snapshot_time"])["snapshot_time"],
+                                  utc=True, errors="coerce").dt.tz_localize(None)
+    m, _ = ensure_matrix()
+    form_store = load_store()
+    form_hashes = store_meta(form_store).get("gw_hashes", {})
+    totals = update_partitions("gw", SEASON)["manifest"]["partitions"]
+    sigs = gw_signatures(deadlines, snaps, fc_times, m, form_hashes, totals)
+    if not sigs:
+        raise SystemExit("[ERROR] aucune deadline dans data/deadlines.csv")
+
+    man = None if rebuild else load_manifest_mi()
+    old_sigs = man["gw_signatures"] if man else {}
+    todo = [g for g in sigs if old_sigs.get(g) != sigs[g]]
+    kept = [g for g in sigs if g not in todo]
+    if not todo and man is not None and set(old_sigs) == set(sigs):
+        return {"rebuilt": [], "kept": len(kept), "rows": man["rows"], "written": 0}
+
+    new_blocks = {}
+    if todo:
+        fc = pd.DataFrame(columns=["id", "t"])
+        if FORECAST_HIST.exists():
+            fc = pd.read_csv(FORECAST_HIST, usecols=lambda c: c in {"snapshot_time", "id", *FORECAST_COLS, "momentum", "forecast"})
+            fc["t"] = pd.to_datetime(fc["snapshot_time"], utc=True, errors="coerce").dt.tz_localize(None)
+            fc = fc.sort_values("t", kind="mergesort")
+        fx = fixture_tables(m)
+        form = store_frame(form_store) if form_store is not None else pd.DataFrame()
+        for g in todo:
+            dl = deadlines.loc[deadlines["gw"] == int(g), "deadline"].iloc[0]
+            new_blocks[g] = to_columns(build_gw_block(int(g), dl, snaps, fc, fx, m["team_ids"], form))
+
+    # blocs conservés lus en mémoire (pas de memmap ouvert pendant la réécriture des fichiers)
+    old_cols = load_model_input(mmap_mode=None) if kept else {}
+    names = list(next(iter(new_blocks.values())).keys()) if new_blocks else list(old_cols)
+    parts, blocks, start = {c: [] for c in names}, {}, 0
+    for g in sorted(sigs, key=int):
+        if g in new_blocks:
+            block = new_blocks[g]
+        else:
+            lo, hi = man["gw_blocks"][g]
+            block = {c: old_cols[c][lo:hi] for c in names}
+        n = len(block["gw"])
+        for c in names:
+            parts[c].append(block[c])
+        blocks[g] = [start, start + n]
+        start += n
+    del old_cols
+    written = write_store({c: np.concatenate(parts[c]) for c in names}, blocks, sigs, man)
+    return {"rebuilt": sorted(int(g) for g in todo), "kept": len(kept), "rows": start, "written": len(written)}
+
+def main():
+    ap = argparse.ArgumentParser(description="Build the single pre-joined model input dataset keyed by (player, GW).")
+    ap.add_argument("--rebuild", action="store_true", help="Recalcule toutes les GW.")
+    args = ap.parse_args()
+
+    res = update_model_input(rebuild=args.rebuild)
+    print(f"[INFO] GW recalculées {res['rebuilt']}, {res['kept']} inchangée(s) ; {res['rows']:,} lignes, "
+          f"{res['written']} colonne(s) réécrite(s)")
+    print(f"[PASS] {OUT_DIR.name}/ " + ("written" if res["rebuilt"] else "up to date"))
+
+if __name__ == "__main__":
+    main()
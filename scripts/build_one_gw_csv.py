@@ -1,5 +1,6 @@
 # scripts/build_one_gw_csv.py
 # Construit data/season/gw{GW}.csv (par joueur) depuis l'API /event/{gw}/live
+# (gw_build.py produit aussi gw{GW}_permatch.csv depuis le même payload)
 # Always Write + snapshot
 
 import argparse, requests, pandas as pd
@@ -13,6 +14,7 @@ if str(ROOT) not in sys.path:
 # ============================================================================
 
 from scripts.utils_io import ensure_dirs, write_gw_and_snapshot
+from scripts.gw_build import build_context, totals_frame
 
 UA = {"User-Agent": "Mozilla/5.0 (FPL-GWBuild/1.1)"}
 BOOTSTRAP = "https://fantasy.premierleague.com/api/bootstrap-static/"
@@ -27,35 +29,9 @@ def fetch_event_live(gw: int):
     return r.json()
 
 def build_gw_per_player(gw: int) -> pd.DataFrame:
-    boot = fetch_bootstrap()
-    live = fetch_event_live(gw)
-
-    elems_boot = pd.DataFrame(boot.get("elements", []))  # mapping id -> noms, team, element_type
-    teams = pd.DataFrame(boot.get("teams", []))
-    id2name = teams.set_index("id")["name"].to_dict() if not teams.empty else {}
-
-    el = pd.DataFrame(live.get("elements", []))  # [{"id": <player_id>, "stats": {...}}]
-    if el.empty:
-        raise RuntimeError(f"Aucune donnée live pour GW{gw}")
-
-    # IMPORTANT: normaliser la Series de dicts via .tolist()
-    stats = pd.json_normalize(el["stats"].tolist())
-    stats.columns = [c.replace(".", "_") for c in stats.columns]
-    stats.insert(0, "element", el["id"].values)
-
-    df = stats
-    df["gw"] = gw
-
-    if not elems_boot.empty:
-        base = elems_boot[["id","web_name","team","element_type"]].rename(columns={"id":"element"})
-        df = df.merge(base, on="element", how="left")
-        df["team_name"] = df["team"].map(id2name)
-        pos_map = {1:"GK",2:"DEF",3:"MID",4:"FWD"}
-        df["position"] = df["element_type"].map(pos_map)
-
-    order = ["element","web_name","team_name","position","gw","minutes","total_points"]
-    cols = [c for c in order if c in df.columns] + [c for c in df.columns if c not in order]
-    return df[cols]
+    # moteur commun (gw_build) : mêmes colonnes que gw_build.py, sans la partie par match
+    ctx = build_context(fetch_bootstrap(), [])
+    return totals_frame(gw, fetch_event_live(gw), ctx)
 
 def main():
     p = argparse.ArgumentParser()
@@ -0,0 +1,243 @@
+# scripts/build_points_cube.py
+"""
+Cube de décomposition des points joueur × GW × identifiant de stat, depuis les blocs "explain" des
+event_N_live.json archivés (data/raw/<horodatage>/). Seul "value" survit dans gwN_permatch.csv ;
+ici "points" ET "value" sont conservés (sommés sur les matchs de la GW).
+
+Tableaux (P joueurs × G GWs × S identifiants) :
+- points (int32), value (float32) : 0 si le joueur n'a pas la stat dans la GW
+Index : players (ids triés, recherche dichotomique), stats (identifiants triés), gws (1..G),
+player_team (équipe du joueur d'après le bootstrap-static archivé le plus récent, -1 = inconnue),
+n_fixtures (P × G, matchs présents dans explain).
+
+- le fichier retenu pour une GW est celui du dossier brut le plus récent
+- parse des GW en parallèle (processus, --jobs) ; le meta garde le sha1 de chaque source : seules les
+  GW nouvelles ou modifiées sont relues, les autres tranches sont recopiées du cube existant
+- requêtes = réductions de tableaux (select, share_by_team, player_breakdown)
+
+Usage :
+  python scripts/build_points_cube.py [--rebuild] [--jobs 4] [--stat bonus] [--last 5]
+"""
+
+from __future__ import annotations
+import argparse
+import hashlib
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+from gw_build import normalize_explain
+
+ROOT = Path(__file__).resolve().parents[1]
+RAW_DIR = ROOT / "data" / "raw"
+CUBE_FILE = ROOT / "data" / "points_cube.npz"
+CUBE_VERSION = 1
+LIVE_RX = re.compile(r"^event_(\d+)_live\.json$")
+
+# --- Sources ---
+def live_sources(raw_dir: Path = RAW_DIR) -> dict[int, Path]:
+    """{gw: event_N_live.json} ; dossier horodaté le plus récent si une GW est archivée plusieurs fois."""
+    out = {}
+    for d in sorted(p for p in raw_dir.iterdir() if p.is_dir()) if raw_dir.exists() else []:
+        for p in d.glob("event_*_live.json"):
+            m = LIVE_RX.match(p.name)
+            if m:
+                out[int(m.group(1))] = p
+    return out
+
+def latest_bootstrap(raw_dir: Path = RAW_DIR) -> Path | None:
+    found = sorted(raw_dir.glob("*/bootstrap-static.json")) if raw_dir.exists() else []
+    return found[-1] if found else None
+
+def _sha1(path: Path) -> str:
+    return hashlib.sha1(path.read_bytes()).hexdigest()
+
+def parse_live(path: Path) -> dict[str, np.ndarray]:
+    """Une GW aplatie en colonnes (player_id, identifier, points, value) + matchs par joueur (worker)."""
+    with open(path, "r", encoding="utf-8") as f:
+        elements = json.load(f).get("elements", [])
+    pid, ident, pts, val, m_pid = [], [], [], [], []
+    for el in elements:
+        for m in normalize_explain(el.get("explain", [])):
+            m_pid.append(el["id"])
+            for st in m.get("stats", []) or []:
+                if st.get("identifier") is None:
+                    continue
+                pid.append(el["id"])
+                ident.append(st["identifier"])
+                pts.append(st.get("points") or 0)
+                val.append(st.get("value") or 0)
+    return {
+        "player_id": np.array(pid, dtype=np.int64),
+        "identifier": np.array(ident, dtype=str),
+        "points": np.array(pts, dtype=np.int32),
+        "value": np.array(val, dtype=np.float32),
+        "match_player_id": np.array(m_pid, dtype=np.int64),
+    }
+
+def parse_many(paths: dict[int, Path], jobs: int) -> dict[int, dict]:
+    if jobs > 1 and len(paths) > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as ex:
+            return dict(zip(paths, ex.map(parse_live, paths.values())))
+    return {gw: parse_live(p) for gw, p in paths.items()}
+
+def player_teams(players: np.ndarray, boot_path: Path | None) -> np.ndarray:
+    if boot_path is None:
+        return np.full(len(players), -1, dtype=np.int64)
+    with open(boot_path, "r", encoding="utf-8") as f:
+        el = pd.DataFrame(json.load(f).get("elements", []), columns=["id", "team"])
+    team = el.drop_duplicates("id").set_index("id")["team"]
+    return team.reindex(players).fillna(-1).to_numpy(dtype=np.int64)
+
+# --- Construction ---
+def _read_meta(c: dict) -> dict:
+    return json.loads(str(c["meta"])) if c is not None and "meta" in c else {}
+
+def load_cube(path: Path = CUBE_FILE) -> dict[str, np.ndarray] | None:
+    if not Path(path).exists():
+        return None
+    with np.load(path, allow_pickle=False) as z:
+        return {k: z[k] for k in z.files}
+
+def update_cube(rebuild: bool = False, jobs: int = 1) -> tuple[dict[str, np.ndarray], list[int]]:
+    """Cube à jour ; renvoie (cube, GW relues)."""
+    sources = live_sources()
+    if not sources:
+        raise SystemExit(f"[ERROR] aucun event_N_live.json dans {RAW_DIR}")
+    boot = latest_bootstrap()
+    hashes = {str(gw): {"file": f"{p.parent.name}/{p.name}", "sha1": _sha1(p)} for gw, p in sources.items()}
+    boot_sha = _sha1(boot) if boot else None
+
+    old = None if rebuild else load_cube()
+    meta = _read_meta(old)
+    if meta.get("version") != CUBE_VERSION:
+        old, meta = None, {}
+    old_src = meta.get("sources", {})
+    todo = sorted(gw for gw in sources if old_src.get(str(gw)) != hashes[str(gw)])
+    if old is not None and not todo and set(old_src) == set(hashes) and meta.get("bootstrap_sha1") == boot_sha:
+        return old, []
+
+    parsed = parse_many({gw: sources[gw] for gw in todo}, jobs)
+    kept = [gw for gw in sorted(sources) if gw not in parsed]
+
+    # index : union des joueurs / identifiants des GW relues et des tranches conservées
+    pids = [p["player_id"] for p in parsed.values()] + [p["match_player_id"] for p in parsed.values()]
+    idents = [p["identifier"] for p in parsed.values()]
+    if kept:
+        pids.append(old["players"])
+        idents.append(old["stats"])
+    players = np.unique(np.concatenate(pids)) if pids else np.array([], dtype=np.int64)
+    stats = np.unique(np.concatenate(idents)) if idents else np.array([], dtype=str)
+    G = max(sources)
+    shape = (len(players), G, len(stats))
+    points = np.zeros(shape, dtype=np.int32)
+    value = np.zeros(shape, dtype=np.float32)
+    n_fix = np.zeros(shape[:2], dtype=np.int8)
+
+    if kept:
+        pi = np.searchsorted(players, old["players"])
+        si = np.searchsorted(stats, old["stats"])
+        g = np.array(kept) - 1
+        points[np.ix_(pi, g, si)] = old["points"][:, g]
+        value[np.ix_(pi, g, si)] = old["value"][:, g]
+        n_fix[np.ix_(pi, g)] = old["n_fixtures"][:, g]
+    for gw, p in parsed.items():
+        pi = np.searchsorted(players, p["player_id"])
+        si = np.searchsorted(stats, p["identifier"])
+        np.add.at(points[:, gw - 1], (pi, si), p["points"])
+        np.add.at(value[:, gw - 1], (pi, si), p["value"])
+        np.add.at(n_fix[:, gw - 1], np.searchsorted(players, p["match_player_id"]), 1)
+
+    meta = {"version": CUBE_VERSION, "sources": hashes, "bootstrap": boot.parent.name if boot else None,
+            "bootstrap_sha1": boot_sha, "built_at_utc": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")}
+    cube = {
+        "players": players.astype(np.int64),
+        "stats": stats,
+        "gws": np.arange(1, G + 1, dtype=np.int64),
+        "player_team": player_teams(players, boot),
+        "points": points,
+        "value": value,
+        "n_fixtures": n_fix,
+        "meta": np.array(json.dumps(meta)),
+    }
+    CUBE_FILE.parent.mkdir(parents=True, exist_ok=True)
+    np.savez_compressed(CUBE_FILE, **cube)
+    return cube, todo
+
+# --- Requêtes ---
+def player_index(c: dict, player_ids) -> np.ndarray:
+    """Position de chaque id dans le cube (-1 si absent)."""
+    ids = np.atleast_1d(np.asarray(player_ids, dtype=np.int64))
+    i = np.minimum(np.searchsorted(c["players"], ids), max(len(c["players"]) - 1, 0))
+    return np.where(c["players"][i] == ids, i, -1) if len(c["players"]) else np.full(len(ids), -1)
+
+def stat_index(c: dict, stats) -> np.ndarray:
+    names = np.atleast_1d(np.asarray(stats, dtype=str))
+    i = np.minimum(np.searchsorted(c["stats"], names), max(len(c["stats"]) - 1, 0))
+    if len(c["stats"]) == 0 or (c["stats"][i] != names).any():
+        raise KeyError(f"identifiant(s) inconnu(s) : {sorted(set(names) - set(c['stats']))}")
+    return i
+
+def gw_range(c: dict, last: int | None = None, upto: int | None = None) -> slice:
+    """Tranche de GW : les `last` GW jusqu'à `upto` (défaut : dernière GW avec des données)."""
+    played = np.flatnonzero(c["n_fixtures"].any(axis=0))
+    end = upto if upto is not None else (int(played[-1]) + 1 if len(played) else len(c["gws"]))
+    start = max(0, end - last) if last else 0
+    return slice(start, end)
+
+def select(c: dict, field: str = "points", players=None, gws: slice = slice(None), stats=None) -> np.ndarray:
+    """Sous-cube (joueurs × GW × stats) ; None = tout l'axe ; joueurs absents -> lignes de zéros."""
+    arr = c[field][:, gws]
+    if stats is not None:
+        arr = arr[:, :, stat_index(c, stats)]
+    if players is not None:
+        pi = player_index(c, players)
+        arr = np.where((pi >= 0)[:, None, None], arr[np.maximum(pi, 0)], 0)
+    return arr
+
+def share_by_team(c: dict, stat: str = "bonus", last: int | None = 5, field: str = "points") -> pd.DataFrame:
+    """Part de `stat` dans le total de `field` par équipe sur les `last` dernières GW."""
+    sl = gw_range(c, last)
+    arr = c[field][:, sl]
+    stat_tot = arr[:, :, stat_index(c, stat)[0]].sum(axis=1)
+    all_tot = arr.sum(axis=(1, 2))
+    teams, inv = np.unique(c["player_team"], return_inverse=True)
+    s = np.bincount(inv, weights=stat_tot, minlength=len(teams))
+    t = np.bincount(inv, weights=all_tot, minlength=len(teams))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        share = np.where(t != 0, s / t, np.nan)
+    df = pd.DataFrame({"team": teams, f"{stat}_{field}": s, f"total_{field}": t, "share": np.round(share, 4)})
+    return df.sort_values("share", ascending=False, kind="mergesort").reset_index(drop=True)
+
+def player_breakdown(c: dict, player_id: int, field: str = "points") -> pd.DataFrame:
+    """Décomposition GW × stat d'un joueur (GW sans match exclues)."""
+    i = int(player_index(c, player_id)[0])
+    if i < 0:
+        return pd.DataFrame(columns=list(c["stats"]))
+    played = c["n_fixtures"][i] > 0
+    return pd.DataFrame(c[field][i][played], index=pd.Index(c["gws"][played], name="gw"), columns=c["stats"])
+
+def main():
+    ap = argparse.ArgumentParser(description="Build the player x GW x stat points-breakdown cube from archived event/live JSON.")
+    ap.add_argument("--rebuild", action="store_true", help="Relit toutes les GW.")
+    ap.add_argument("--jobs", type=int, default=min(4, os.cpu_count() or 1), help="Processus de parse.")
+    ap.add_argument("--stat", default="bonus", help="Identifiant affiché (part par équipe).")
+    ap.add_argument("--last", type=int, default=5, help="Nombre de GW de la fenêtre affichée.")
+    args = ap.parse_args()
+
+    c, parsed = update_cube(rebuild=args.rebuild, jobs=args.jobs)
+    P, G, S = c["points"].shape
+    print(f"[INFO] {P} joueurs × {G} GWs × {S} identifiants ; GW relues {parsed}")
+    if args.stat in set(c["stats"]):
+        print(share_by_team(c, args.stat, args.last).head(5).to_string(index=False))
+    else:
+        print(f"[WARN] identifiant inconnu : {args.stat}")
+    print(f"[PASS] {CUBE_FILE.name} {'written' if parsed else 'up to date'}")
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,56 @@
 # scripts/build_summaries.py
 # Génère des fichiers légers dans summaries/ à partir des CSV de data/
 # Robuste aux colonnes manquantes, variations de schéma et conflits git non résolus.
+#
+# Chaque résumé est un "builder" enregistré (@summary) qui déclare ses sources et les colonnes utiles.
+# Un état (summaries/_build_state.json) garde le hash de contenu de chaque source : seuls les
+# builders dont une entrée a changé sont relancés ; chaque source est chargée au plus une fois,
+# à la demande, et limitée aux colonnes déclarées par les builders qui tournent.
+# players_raw_history.csv (append-only, toute la saison) est lu depuis la fin : seules les deux
+# dernières dates sont parsées (read_csv_tail), mémoire et temps indépendants de la saison.
+# thresholds_calibration lit les sketches de quantiles par tranche d'ownership (quantile_sketch),
+# tenus à jour par append_price_change_forecast.py : coût constant, quelle que soit la taille de l'historique.
+#
+# Usage :
+#   python scripts/build_summaries.py [--force] [--only fixtures_outlook.json ...]
 
 from __future__ import annotations
-import os, json
+import os, json, hashlib, argparse
 from datetime import datetime, timezone
 import pandas as pd
 
+from utils_io import read_csv_tail
+from analytics import top_k
+from quantile_sketch import load_calibration, rebuild_calibration, calibration_table, METRICS
+from build_fixture_matrix import ensure_matrix, outlook, difficulty_ranking, blanks_doubles, HORIZON
+
 ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 DATA = os.path.join(ROOT, "data")
 OUTDIR = os.path.join(ROOT, "summaries")
-os.makedirs(OUTDIR, exist_ok=True)
+STATE_FILE = os.path.join(OUTDIR, "_build_state.json")
+# modules importés par les builders : inclus dans script_hash (et dans paths: de build-summaries.yml)
+BUILDER_MODULES = ["analytics.py", "quantile_sketch.py", "build_fixture_matrix.py", "utils_io.py"]
 
 UTC_NOW = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
 
+# Sources (nom logique -> fichier dans data/), dans l'ordre du rapport d'anomalies
+SOURCES = {
+    "players_snap": "players_raw_snapshot_current.csv",
+    "players_hist": "players_raw_history.csv",
+    "pcf": "price_change_forecast.csv",
+    "pcf_hist": "price_change_forecast_history.csv",
+    "fixtures": "fixtures.csv",
+    "deadlines": "deadlines.csv",
+    "merged_gw": "merged_gw.csv",
+    "teams": "teams.csv",
+    "calib_sketch": "sketches/forecast_calibration.json",
+}
+LINE_COUNT_SOURCES = ["players_snap", "players_hist", "pcf", "pcf_hist", "fixtures", "deadlines", "merged_gw"]
+
+ID_CANDIDATES = ["player_id", "element", "id", "player", "playerid"]
+HISTORY_TIME_COLS = ["date", "snapshot_time"]  # colonne temporelle de players_raw_history (ancien / actuel)
+HISTORY_DAYS = 2                               # dernière date + veille
+
 # ---------- Utilitaires ----------
 
 def has_conflict_markers(path: str) -> bool:
@@ -25,18 +62,21 @@ def has_conflict_markers(path: str) -> bool:
     except Exception:
         return False
 
-def read_csv_robust(path: str) -> pd.DataFrame:
+def read_csv_robust(path: str, usecols=None, nrows: int | None = None) -> pd.DataFrame:
     """
     Essaie d'abord moteur C (séparateur virgule, low_memory=False),
     puis fallback moteur Python (auto-détection du séparateur, sans low_memory).
     """
     try:
-        return pd.read_csv(path, sep=",", engine="c", encoding="utf-8", low_memory=False)
+        return pd.read_csv(path, sep=",", engine="c", encoding="utf-8", low_memory=False, usecols=usecols, nrows=nrows)
     except Exception:
-        return pd.read_csv(path, sep=None, engine="python", encoding="utf-8")
+        return pd.read_csv(path, sep=None, engine="python", encoding="utf-8", usecols=usecols, nrows=nrows)
 
-def load_csv(path: str, expect: list[str] | None = None) -> tuple[pd.DataFrame, list[str]]:
-    """Lit un CSV si présent. Normalise les colonnes (minuscule/trim). Retourne (df, anomalies)."""
+def load_csv(path: str, expect: list[str] | None = None, columns: set[str] | None = None) -> tuple[pd.DataFrame, list[str]]:
+    """
+    Lit un CSV si présent. Normalise les colonnes (minuscule/trim). Retourne (df, anomalies).
+    `columns` : noms normalisés à lire (None = toutes).
+    """
     anoms = []
     rel = os.path.relpath(path, ROOT)
 
@@ -49,9 +89,11 @@ def load_csv(path: str, expect: list[str] | None = None) -> tuple[pd.DataFrame,
         anoms.append(f"git_conflict_markers:{rel}")
         return pd.DataFrame(), anoms
 
-    # Lecture robuste (C -> Python)
+    # Lecture robuste (C -> Python) ; l'entête seule suffit à détecter un CSV mal parsé
+    usecols = None if columns is None else (lambda c: c.strip().lower() in columns)
     try:
-        df = read_csv_robust(path)
+        header = read_csv_robust(path, nrows=0)
+        df = read_csv_robust(path, usecols=usecols) if header.shape[1] > 1 else header
     except Exception as e3:
         anoms.append(f"read_error:{rel}:{e3}")
         return pd.DataFrame(), anoms
@@ -60,7 +102,7 @@ def load_csv(path: str, expect: list[str] | None = None) -> tuple[pd.DataFrame,
     df.columns = [c.strip().lower() for c in df.columns]
 
     # Si une seule colonne → probablement CSV mal parsé (entête cassée, etc.)
-    if df.shape[1] == 1:
+    if header.shape[1] == 1:
         anoms.append(f"single_column_parse:{rel}:{df.columns.tolist()}")
         return pd.DataFrame(), anoms
 
@@ -73,12 +115,11 @@ def load_csv(path: str, expect: list[str] | None = None) -> tuple[pd.DataFrame,
 
 def detect_player_id(df: pd.DataFrame):
     """Trouve la colonne identifiant joueur et renomme en 'player_id' si nécessaire."""
-    cand = ["player_id", "element", "id", "player", "playerid"]
-    found = next((c for c in cand if c in df.columns), None)
+    found = next((c for c in ID_CANDIDATES if c in df.columns), None)
     if found and found != "player_id":
         df.rename(columns={found: "player_id"}, inplace=True)
         return "player_id", []
-    return found, ([] if found else [f"id_not_found:{cand}"])
+    return found, ([] if found else [f"id_not_found:{ID_CANDIDATES}"])
 
 def to_num(df: pd.DataFrame, cols: list[str]):
     for c in cols:
@@ -99,263 +140,418 @@ def file_info(path: str):
         sz = None
     return {"path": os.path.relpath(path, ROOT), "size_bytes": sz}
 
-# ---------- Chargements ----------
+def count_lines(path: str) -> int:
+    """Même résultat que sum(1 for _ in open(path, "rb")), par blocs de 1 Mo."""
+    n, last = 0, b""
+    with open(path, "rb") as f:
+        while chunk := f.read(1 << 20):
+            n += chunk.count(b"\n")
+            last = chunk[-1:]
+    return n + (1 if last not in (b"", b"\n") else 0)
+
+# ---------- Hash de contenu des sources ----------
+
+def file_hash(path: str, cache: dict) -> str:
+    """sha1 du contenu ; réutilise le hash en cache si taille et mtime n'ont pas bougé."""
+    if not os.path.exists(path):
+        return "missing"
+    st = os.stat(path)
+    rel = os.path.relpath(path, ROOT)
+    hit = cache.get(rel)
+    if hit and hit.get("size") == st.st_size and hit.get("mtime_ns") == st.st_mtime_ns:
+        return hit["sha1"]
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        while chunk := f.read(1 << 20):
+            h.update(chunk)
+    cache[rel] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha1": h.hexdigest()}
+    return cache[rel]["sha1"]
+
+def script_hash() -> str:
+    """Toute modification de ce script ou d'un module de calcul importé invalide l'ensemble des résumés."""
+    h = hashlib.sha1()
+    here = os.path.dirname(os.path.abspath(__file__))
+    for name in [os.path.basename(__file__), *BUILDER_MODULES]:
+        with open(os.path.join(here, name), "rb") as f:
+            h.update(name.encode() + b"\0" + f.read())
+    return h.hexdigest()
+
+# ---------- Registre des builders ----------
+
+BUILDERS: dict[str, dict] = {}
+
+def summary(output: str, inputs: dict[str, list[str] | None]):
+    """
+    Enregistre un builder produisant summaries/<output>.
+    `inputs` : {source: colonnes lues} ; None = fichier utilisé sans chargement (ex: comptage de lignes).
+    Le builder reçoit `src(name)` (DataFrame chargé à la demande) et renvoie (objet JSON, anomalies).
+    """
+    def deco(fn):
+        BUILDERS[output] = {"output": output, "inputs": inputs, "fn": fn}
+        return fn
+    return deco
+
+def load_history_tail(path: str, columns: set[str] | None = None) -> tuple[pd.DataFrame, list[str]]:
+    """
+    Dernières HISTORY_DAYS dates de players_raw_history.csv (lecture depuis la fin du fichier).
+    - `date` dérivée de `snapshot_time` si absente ; `price_m` dérivé de now_cost (dixièmes) si absent
+    - une ligne par (id, date) : dernier snapshot de la journée
+    """
+    anoms = []
+    rel = os.path.relpath(path, ROOT)
+    if not os.path.exists(path):
+        return pd.DataFrame(), [f"missing_file:{rel}"]
+    if has_conflict_markers(path):
+        return pd.DataFrame(), [f"git_conflict_markers:{rel}"]
+
+    header = read_csv_robust(path, nrows=0)
+    names = [c.strip().lower() for c in header.columns]
+    tcol = next((c for c in HISTORY_TIME_COLS if c in names), None)
+    if tcol is None:
+        return pd.DataFrame(), [f"missing_cols:{rel}:{HISTORY_TIME_COLS}"]
+    wanted = None if columns is None else {*columns, tcol, "now_cost"}
+    usecols = None if wanted is None else (lambda c: c.strip().lower() in wanted)
+    floor_day = lambda t: t.normalize() - pd.Timedelta(days=HISTORY_DAYS - 1)
+    try:
+        df = read_csv_tail(path, tcol, floor_day, usecols=usecols)
+    except Exception as e3:
+        return pd.DataFrame(), [f"read_error:{rel}:{e3}"]
+
+    df.columns = [c.strip().lower() for c in df.columns]
+    if df.empty:
+        return df, anoms
+    if "date" not in df.columns:
+        df["date"] = pd.to_datetime(df[tcol], errors="coerce").dt.strftime("%Y-%m-%d")
+    if "price_m" not in df.columns and "now_cost" in df.columns:
+        df["price_m"] = pd.to_numeric(df["now_cost"], errors="coerce") / 10.0
+    if "id" in df.columns:
+        df = df.drop_duplicates(["id", "date"], keep="last").reset_index(drop=True)
+    return df, anoms
 
-anomalies: list[str] = []
+CALIB_QUANTILES = {"p50": 0.5, "p90": 0.9, "p99": 0.99}
 
-players_snap, a = load_csv(os.path.join(DATA, "players_raw_snapshot_current.csv")); anomalies += a
-players_hist, a = load_csv(os.path.join(DATA, "players_raw_history.csv")); anomalies += a
-pcf, a = load_csv(os.path.join(DATA, "price_change_forecast.csv")); anomalies += a
-pcf_hist, a = load_csv(os.path.join(DATA, "price_change_forecast_history.csv")); anomalies += a
-fixtures, a = load_csv(os.path.join(DATA, "fixtures.csv")); anomalies += a
-deadlines, a = load_csv(os.path.join(DATA, "deadlines.csv")); anomalies += a
-merged_gw, a = load_csv(os.path.join(DATA, "merged_gw.csv")); anomalies += a
+def load_calibration_sketch(path: str, columns: set[str] | None = None) -> tuple[pd.DataFrame, list[str]]:
+    """
+    Table (metric, own_bucket, n, mean, p50, p90, p99) lue dans les sketches t-digest.
+    Sketches absents -> reconstruits en mémoire depuis l'historique (une fois, par blocs).
+    """
+    anoms = []
+    sk = load_calibration(path)
+    if sk is None:
+        anoms.append(f"missing_file:{os.path.relpath(path, ROOT)}")
+        sk = rebuild_calibration(os.path.join(DATA, SOURCES["pcf_hist"]))
+    tables = [calibration_table(sk, m, CALIB_QUANTILES).assign(metric=m) for m in METRICS]
+    return pd.concat(tables, ignore_index=True), anoms
+
+# Lecteurs spécifiques (sinon load_csv)
+SOURCE_READERS = {"players_hist": load_history_tail, "calib_sketch": load_calibration_sketch}
+
+_LOADED: dict[str, tuple[pd.DataFrame, list[str]]] = {}
+
+def make_loader(columns_needed: dict[str, set[str]]):
+    """Loader paresseux : chaque source est lue au plus une fois (colonnes = union des besoins)."""
+    def src(name: str) -> pd.DataFrame:
+        if name not in _LOADED:
+            reader = SOURCE_READERS.get(name)
+            path = os.path.join(DATA, SOURCES[name])
+            _LOADED[name] = (reader(path, columns_needed.get(name)) if reader
+                             else load_csv(path, columns=columns_needed.get(name)))
+        # copie superficielle : un builder peut renommer/convertir sans toucher au cache
+        return _LOADED[name][0].copy(deep=False)
+    return src
 
 # ---------- line_counts.json ----------
-line_counts = {}
-for rel in [
-    "players_raw_snapshot_current.csv",
-    "players_raw_history.csv",
-    "price_change_forecast.csv",
-    "price_change_forecast_history.csv",
-    "fixtures.csv",
-    "deadlines.csv",
-    "merged_gw.csv",
-]:
-    p = os.path.join(DATA, rel)
-    if os.path.exists(p):
-        try:
-            c = sum(1 for _ in open(p, "rb"))
-        except Exception:
+@summary("line_counts.json", {name: None for name in LINE_COUNT_SOURCES})
+def build_line_counts(src):
+    line_counts = {}
+    for rel in (SOURCES[name] for name in LINE_COUNT_SOURCES):
+        p = os.path.join(DATA, rel)
+        if os.path.exists(p):
+            try:
+                c = count_lines(p)
+            except Exception:
+                c = None
+        else:
             c = None
-    else:
-        c = None
-    line_counts[rel] = c
-
-write_json(os.path.join(OUTDIR, "line_counts.json"), {
-    "last_updated_utc": UTC_NOW,
-    "counts": line_counts
-})
+        line_counts[rel] = c
+    return {"last_updated_utc": UTC_NOW, "counts": line_counts}, []
 
 # ---------- players_snapshot_summary.json ----------
-snap_summary = {"last_updated_utc": UTC_NOW, "by_position": [], "by_team": [], "top_selected": []}
-if not players_snap.empty:
-    # Harmoniser le prix: accepter 'now_cost'/'cost' comme alias de 'price_m'
-    if "price_m" not in players_snap.columns:
-        for alias in ["now_cost", "cost"]:
-            if alias in players_snap.columns:
-                players_snap.rename(columns={alias: "price_m"}, inplace=True)
-                break
-
-    # Harmoniser le nom d'équipe pour l'affichage (team_name prioritaire)
-    tcol = "team_name" if "team_name" in players_snap.columns else ("team" if "team" in players_snap.columns else None)
-
-    # Conversions numériques (si présentes)
-    to_num(players_snap, ["price_m", "selected_by_percent"])
-
-    # by_position
-    if "position" in players_snap.columns and "id" in players_snap.columns:
-        agg_pos = {"n": ("id", "count")}
-        if "price_m" in players_snap.columns:
-            agg_pos["avg_price"] = ("price_m", "mean")
-        if "selected_by_percent" in players_snap.columns:
-            agg_pos["avg_sel"] = ("selected_by_percent", "mean")
-
-        g = players_snap.groupby("position", dropna=False).agg(**agg_pos).reset_index()
-        snap_summary["by_position"] = head_dict(g.sort_values("position"))
-
-    # by_team
-    if tcol and "id" in players_snap.columns:
-        agg_team = {"n": ("id", "count")}
-        if "price_m" in players_snap.columns:
-            agg_team["avg_price"] = ("price_m", "mean")
-        if "selected_by_percent" in players_snap.columns:
-            agg_team["avg_sel"] = ("selected_by_percent", "mean")
-
-        g = players_snap.groupby(tcol, dropna=False).agg(**agg_team).reset_index().rename(columns={tcol: "team"})
-        try:
-            g_sorted = g.sort_values("team")
-        except Exception:
-            g_sorted = g.sort_values("n", ascending=False)
-        snap_summary["by_team"] = head_dict(g_sorted)
-
-    # top selected
-    if {"id", "web_name", "selected_by_percent"} <= set(players_snap.columns):
-        keep = ["id", "web_name", "position", "price_m", "selected_by_percent"]
-        if tcol:
-            keep.append(tcol)
-        keep = [c for c in keep if c in players_snap.columns]
-        top = players_snap[keep].copy()
-        if tcol and tcol != "team_name":
-            top.rename(columns={tcol: "team"}, inplace=True)
-        if "selected_by_percent" in top.columns:
-            top = top.sort_values("selected_by_percent", ascending=False).head(20)
-        elif "price_m" in top.columns:
-            top = top.sort_values("price_m", ascending=False).head(20)
-        snap_summary["top_selected"] = head_dict(top)
-
-write_json(os.path.join(OUTDIR, "players_snapshot_summary.json"), snap_summary)
+@summary("players_snapshot_summary.json", {"players_snap": [
+    "id", "web_name", "position", "price_m", "now_cost", "cost", "selected_by_percent", "team_name", "team"]})
+def build_players_snapshot_summary(src):
+    players_snap = src("players_snap")
+    snap_summary = {"last_updated_utc": UTC_NOW, "by_position": [], "by_team": [], "top_selected": []}
+    if not players_snap.empty:
+        # Harmoniser le prix: accepter 'now_cost'/'cost' comme alias de 'price_m'
+        if "price_m" not in players_snap.columns:
+            for alias in ["now_cost", "cost"]:
+                if alias in players_snap.columns:
+                    players_snap.rename(columns={alias: "price_m"}, inplace=True)
+                    break
+
+        # Harmoniser le nom d'équipe pour l'affichage (team_name prioritaire)
+        tcol = "team_name" if "team_name" in players_snap.columns else ("team" if "team" in players_snap.columns else None)
+
+        # Conversions numériques (si présentes)
+        to_num(players_snap, ["price_m", "selected_by_percent"])
+
+        # by_position
+        if "position" in players_snap.columns and "id" in players_snap.columns:
+            agg_pos = {"n": ("id", "count")}
+            if "price_m" in players_snap.columns:
+                agg_pos["avg_price"] = ("price_m", "mean")
+            if "selected_by_percent" in players_snap.columns:
+                agg_pos["avg_sel"] = ("selected_by_percent", "mean")
+
+            g = players_snap.groupby("position", dropna=False).agg(**agg_pos).reset_index()
+            snap_summary["by_position"] = head_dict(g.sort_values("position"))
+
+        # by_team
+        if tcol and "id" in players_snap.columns:
+            agg_team = {"n": ("id", "count")}
+            if "price_m" in players_snap.columns:
+                agg_team["avg_price"] = ("price_m", "mean")
+            if "selected_by_percent" in players_snap.columns:
+                agg_team["avg_sel"] = ("selected_by_percent", "mean")
+
+            g = players_snap.groupby(tcol, dropna=False).agg(**agg_team).reset_index().rename(columns={tcol: "team"})
+            try:
+                g_sorted = g.sort_values("team")
+            except Exception:
+                g_sorted = g.sort_values("n", ascending=False)
+            snap_summary["by_team"] = head_dict(g_sorted)
+
+        # top selected
+        if {"id", "web_name", "selected_by_percent"} <= set(players_snap.columns):
+            keep = ["id", "web_name", "position", "price_m", "selected_by_percent"]
+            if tcol:
+                keep.append(tcol)
+            keep = [c for c in keep if c in players_snap.columns]
+            top = players_snap[keep].copy()
+            if tcol and tcol != "team_name":
+                top.rename(columns={tcol: "team"}, inplace=True)
+            if "selected_by_percent" in top.columns:
+                top = top_k(top, "selected_by_percent", 20)
+            elif "price_m" in top.columns:
+                top = top_k(top, "price_m", 20)
+            snap_summary["top_selected"] = head_dict(top)
+    return snap_summary, []
 
 # ---------- ownership_momentum.json ----------
-own_mom = {"last_updated_utc": UTC_NOW, "most_in": [], "most_out": []}
-if not players_hist.empty and {"id","date","selected_by_percent","transfers_in","transfers_out"} <= set(players_hist.columns):
-    to_num(players_hist, ["selected_by_percent","transfers_in","transfers_out","price_m"])
-    players_hist["date"] = pd.to_datetime(players_hist["date"], errors="coerce")
-    last_date = players_hist["date"].max()
-    prev_date = last_date - pd.Timedelta(days=1) if pd.notna(last_date) else None
-    if pd.notna(last_date):
-        last = players_hist[players_hist["date"] == last_date]
-        if prev_date is not None:
-            prev = players_hist[players_hist["date"] == prev_date][["id","selected_by_percent"]].rename(
-                columns={"selected_by_percent":"selected_by_percent_prev"}
-            )
-            last = last.merge(prev, on="id", how="left")
-            last["delta_sel"] = last["selected_by_percent"] - last["selected_by_percent_prev"]
-        else:
-            last["delta_sel"] = pd.NA
-        last["net_transfers"] = (last.get("transfers_in", 0) - last.get("transfers_out", 0))
-        cols = ["id","web_name","team_name","position","price_m","selected_by_percent","delta_sel","net_transfers"]
-        cols = [c for c in cols if c in last.columns]
-        last = last[cols].copy()
-        own_mom["most_in"]  = head_dict(last.sort_values(["net_transfers","delta_sel"], ascending=[False, False]).head(20))
-        own_mom["most_out"] = head_dict(last.sort_values(["net_transfers","delta_sel"], ascending=[True, True]).head(20))
-
-write_json(os.path.join(OUTDIR, "ownership_momentum.json"), own_mom)
+@summary("ownership_momentum.json", {"players_hist": [
+    "id", "date", "web_name", "team_name", "position", "price_m", "selected_by_percent", "transfers_in", "transfers_out"]})
+def build_ownership_momentum(src):
+    players_hist = src("players_hist")
+    own_mom = {"last_updated_utc": UTC_NOW, "most_in": [], "most_out": []}
+    if not players_hist.empty and {"id","date","selected_by_percent","transfers_in","transfers_out"} <= set(players_hist.columns):
+        to_num(players_hist, ["selected_by_percent","transfers_in","transfers_out","price_m"])
+        players_hist["date"] = pd.to_datetime(players_hist["date"], errors="coerce")
+        last_date = players_hist["date"].max()
+        prev_date = last_date - pd.Timedelta(days=1) if pd.notna(last_date) else None
+        if pd.notna(last_date):
+            last = players_hist[players_hist["date"] == last_date]
+            if prev_date is not None:
+                prev = players_hist[players_hist["date"] == prev_date][["id","selected_by_percent"]].rename(
+                    columns={"selected_by_percent":"selected_by_percent_prev"}
+                )
+                last = last.merge(prev, on="id", how="left")
+                last["delta_sel"] = last["selected_by_percent"] - last["selected_by_percent_prev"]
+            else:
+                last["delta_sel"] = pd.NA
+            last["net_transfers"] = (last.get("transfers_in", 0) - last.get("transfers_out", 0))
+            cols = ["id","web_name","team_name","position","price_m","selected_by_percent","delta_sel","net_transfers"]
+            cols = [c for c in cols if c in last.columns]
+            last = last[cols].copy()
+            own_mom["most_in"]  = head_dict(top_k(last, ["net_transfers","delta_sel"], 20, ascending=[False, False]))
+            own_mom["most_out"] = head_dict(top_k(last, ["net_transfers","delta_sel"], 20, ascending=[True, True]))
+    return own_mom, []
 
 # ---------- price_changes_observed.json ----------
-pco = {"last_updated_utc": UTC_NOW, "risers": [], "fallers": []}
-if not players_hist.empty and {"id","date","price_m"} <= set(players_hist.columns):
-    players_hist["date"] = pd.to_datetime(players_hist["date"], errors="coerce")
-    to_num(players_hist, ["price_m"])
-    last_date = players_hist["date"].max()
-    if pd.notna(last_date):
-        last = players_hist[players_hist["date"] == last_date][["id","web_name","team_name","position","price_m"]].copy()
-        prev = players_hist[players_hist["date"] == (last_date - pd.Timedelta(days=1))][["id","price_m"]].rename(columns={"price_m":"price_prev"})
-        last = last.merge(prev, on="id", how="left")
-        last["price_delta"] = last["price_m"] - last["price_prev"]
-        risers = last.sort_values("price_delta", ascending=False).query("price_delta > 0").head(20)
-        fallers = last.sort_values("price_delta", ascending=True).query("price_delta < 0").head(20)
-        pco["risers"]  = head_dict(risers)
-        pco["fallers"] = head_dict(fallers)
-
-write_json(os.path.join(OUTDIR, "price_changes_observed.json"), pco)
+@summary("price_changes_observed.json", {"players_hist": ["id", "date", "web_name", "team_name", "position", "price_m"]})
+def build_price_changes_observed(src):
+    players_hist = src("players_hist")
+    pco = {"last_updated_utc": UTC_NOW, "risers": [], "fallers": []}
+    if not players_hist.empty and {"id","date","price_m"} <= set(players_hist.columns):
+        players_hist["date"] = pd.to_datetime(players_hist["date"], errors="coerce")
+        to_num(players_hist, ["price_m"])
+        last_date = players_hist["date"].max()
+        if pd.notna(last_date):
+            cols = [c for c in ["id","web_name","team_name","position","price_m"] if c in players_hist.columns]
+            last = players_hist[players_hist["date"] == last_date][cols].copy()
+            prev = players_hist[players_hist["date"] == (last_date - pd.Timedelta(days=1))][["id","price_m"]].rename(columns={"price_m":"price_prev"})
+            last = last.merge(prev, on="id", how="left")
+            last["price_delta"] = last["price_m"] - last["price_prev"]
+            risers = top_k(last[last["price_delta"] > 0], "price_delta", 20, ascending=False)
+            fallers = top_k(last[last["price_delta"] < 0], "price_delta", 20, ascending=True)
+            pco["risers"]  = head_dict(risers)
+            pco["fallers"] = head_dict(fallers)
+    return pco, []
 
 # ---------- price_change_forecast_summary.json ----------
-pcf_sum = {"last_updated_utc": UTC_NOW, "top_up": [], "top_down": []}
-if not pcf.empty:
-    # Tolérance aux noms et harmonisation d'ID
-    cand_id, a = detect_player_id(pcf); anomalies += a
-    if cand_id and cand_id != "player_id":
-        pcf.rename(columns={cand_id: "player_id"}, inplace=True)
-    if "now_cost" in pcf.columns and "price_m" not in pcf.columns:
-        pcf.rename(columns={"now_cost": "price_m"}, inplace=True)
-
-    # 'forecast' peut être textuel (ex: 'stable'); s'il n'y a pas 'forecast_delta', on ne sort que ce qui est possible
-    to_num(pcf, ["price_m","forecast_delta"])
-    if "forecast_delta" in pcf.columns:
-        keep = [c for c in ["player_id","id","web_name","team_name","price_m","forecast_delta"] if c in pcf.columns]
-        pcf_top = pcf[keep].copy()
-        pcf_sum["top_up"]   = head_dict(pcf_top.sort_values("forecast_delta", ascending=False).head(20))
-        pcf_sum["top_down"] = head_dict(pcf_top.sort_values("forecast_delta", ascending=True ).head(20))
-
-write_json(os.path.join(OUTDIR, "price_change_forecast_summary.json"), pcf_sum)
+@summary("price_change_forecast_summary.json", {"pcf": [
+    *ID_CANDIDATES, "web_name", "team_name", "price_m", "now_cost", "forecast_delta"]})
+def build_price_change_forecast_summary(src):
+    pcf = src("pcf")
+    anomalies = []
+    pcf_sum = {"last_updated_utc": UTC_NOW, "top_up": [], "top_down": []}
+    if not pcf.empty:
+        # Tolérance aux noms et harmonisation d'ID
+        cand_id, a = detect_player_id(pcf); anomalies += a
+        if cand_id and cand_id != "player_id":
+            pcf.rename(columns={cand_id: "player_id"}, inplace=True)
+        if "now_cost" in pcf.columns and "price_m" not in pcf.columns:
+            pcf.rename(columns={"now_cost": "price_m"}, inplace=True)
+
+        # 'forecast' peut être textuel (ex: 'stable'); s'il n'y a pas 'forecast_delta', on ne sort que ce qui est possible
+        to_num(pcf, ["price_m","forecast_delta"])
+        if "forecast_delta" in pcf.columns:
+            keep = [c for c in ["player_id","id","web_name","team_name","price_m","forecast_delta"] if c in pcf.columns]
+            pcf_top = pcf[keep].copy()
+            pcf_sum["top_up"]   = head_dict(top_k(pcf_top, "forecast_delta", 20, ascending=False))
+            pcf_sum["top_down"] = head_dict(top_k(pcf_top, "forecast_delta", 20, ascending=True))
+    return pcf_sum, anomalies
 
 # ---------- thresholds_calibration.json ----------
-thr = {"last_updated_utc": UTC_NOW, "by_ownership_bucket": []}
-if not pcf_hist.empty and {"id","date","forecast_delta"} <= set(pcf_hist.columns):
-    to_num(pcf_hist, ["forecast_delta","selected_by_percent"])
-    own = pcf_hist.get("selected_by_percent")
-    if own is not None:
-        bins = [-0.01, 5, 10, 20, 40, 60, 100]
-        labels = ["0-5","5-10","10-20","20-40","40-60","60-100"]
-        pcf_hist["own_bucket"] = pd.cut(pcf_hist["selected_by_percent"].astype(float), bins=bins, labels=labels)
-        g = pcf_hist.groupby("own_bucket").agg(
-            n=("forecast_delta","count"),
-            avg_delta=("forecast_delta","mean"),
-            p90=("forecast_delta", lambda s: s.quantile(0.9))
-        ).reset_index()
-        thr["by_ownership_bucket"] = head_dict(g)
-
-write_json(os.path.join(OUTDIR, "thresholds_calibration.json"), thr)
+# pcf_hist déclaré aussi : sketch absent -> table reconstruite depuis l'historique (load_calibration_sketch)
+@summary("thresholds_calibration.json", {"calib_sketch": None, "pcf_hist": None})
+def build_thresholds_calibration(src):
+    # n / moyenne exacts, quantiles approchés (erreur de rang ~1/compression) — sans relire l'historique
+    cal = src("calib_sketch")
+    thr = {"last_updated_utc": UTC_NOW, "by_ownership_bucket": [], "nti24_by_ownership_bucket": []}
+    if not cal.empty:
+        delta = cal[cal["metric"] == "forecast_delta"]
+        if delta["n"].sum() > 0:
+            g = delta[["own_bucket", "n", "mean", "p90"]].rename(columns={"mean": "avg_delta"})
+            thr["by_ownership_bucket"] = head_dict(g)
+        nti = cal[cal["metric"] == "NTI_24h"]
+        if nti["n"].sum() > 0:
+            thr["nti24_by_ownership_bucket"] = nti.drop(columns="metric").to_dict(orient="records")
+    return thr, []
 
 # ---------- fixtures_outlook.json ----------
-fx = {"last_updated_utc": UTC_NOW, "by_team_next3": []}
-if not fixtures.empty:
-    for c in ["event","team_h","team_a","team_h_score","team_a_score","finished"]:
-        if c not in fixtures.columns:
-            fixtures[c] = pd.NA
-    to_num(fixtures, ["event","team_h","team_a"])
-    next_gw = None
-    try:
-        if "finished" in fixtures.columns and "event" in fixtures.columns:
-            unfinished = fixtures[(fixtures["finished"] == False) & pd.notna(fixtures["event"])]
-            next_gw = int(unfinished["event"].min()) if not unfinished.empty else int(fixtures["event"].max())
-    except Exception:
-        pass
-    outlook = []
-    if next_gw is not None:
-        teams = pd.unique(pd.concat([fixtures["team_h"], fixtures["team_a"]], ignore_index=True).dropna()).astype(int)
-        for t in teams:
-            tfx = fixtures[(fixtures["team_h"]==t) | (fixtures["team_a"]==t)]
-            fut = tfx[tfx["event"].astype("Int64") >= next_gw].sort_values("event").head(3)
-            outlook.append({
-                "team_id": int(t),
-                "gw_sequence": fut["event"].tolist(),
-                "opponents": [
-                    (int(r["team_a"]) if int(r["team_h"])==t else int(r["team_h"])) for _, r in fut.iterrows()
-                ]
-            })
-    fx["by_team_next3"] = outlook
-
-write_json(os.path.join(OUTDIR, "fixtures_outlook.json"), fx)
+# Tranches de la matrice équipe × GW (build_fixture_matrix, reconstruite seulement si fixtures/teams changent)
+@summary("fixtures_outlook.json", {"fixtures": None, "teams": None})
+def build_fixtures_outlook(src):
+    fx = {"last_updated_utc": UTC_NOW, "by_team_next3": []}
+    if os.path.exists(os.path.join(DATA, SOURCES["fixtures"])):
+        m, _ = ensure_matrix()
+        fx["next_gw"] = json.loads(str(m["meta"])).get("next_gw")
+        fx["by_team_next3"] = outlook(m, n_fixtures=3)
+        fx[f"difficulty_next{HORIZON}"] = difficulty_ranking(m, horizon=HORIZON).to_dict(orient="records")
+        fx[f"blanks_doubles_next{HORIZON}"] = blanks_doubles(m, horizon=HORIZON)
+    return fx, []
 
 # ---------- gw_summary.json ----------
-gw_sum = {"last_updated_utc": UTC_NOW, "top_players": []}
-if not merged_gw.empty:
-    id_col, a = detect_player_id(merged_gw); anomalies += a
-    if id_col:
-        # Colonnes minimales
-        for c in ["minutes","total_points","goals_scored","assists"]:
-            if c not in merged_gw.columns:
-                merged_gw[c] = pd.NA
-        # per90 robuste (évite NAType): remplacer 0 par NaN float
-        pts = pd.to_numeric(merged_gw.get("total_points"), errors="coerce")
-        mins = pd.to_numeric(merged_gw.get("minutes"), errors="coerce").replace(0, float("nan"))
-        merged_gw["points_per90"] = (pts * 90.0) / mins
-        keep = [c for c in ["player_id","web_name","team_name","position","minutes","total_points","points_per90","goals_scored","assists"] if c in merged_gw.columns]
-        top = merged_gw[keep].copy().sort_values(["total_points","points_per90"], ascending=[False, False]).head(25)
-        gw_sum["top_players"] = head_dict(top)
-
-write_json(os.path.join(OUTDIR, "gw_summary.json"), gw_sum)
-
-# ---------- anomaly_report.json ----------
-write_json(os.path.join(OUTDIR, "anomaly_report.json"), {
-    "last_updated_utc": UTC_NOW,
-    "notes": anomalies,
-})
-
-# ---------- manifest.json ----------
-produced = []
-for f in [
-    "manifest.json",
-    "line_counts.json",
-    "players_snapshot_summary.json",
-    "ownership_momentum.json",
-    "price_changes_observed.json",
-    "price_change_forecast_summary.json",
-    "thresholds_calibration.json",
-    "fixtures_outlook.json",
-    "gw_summary.json",
-    "anomaly_report.json",
-]:
-    p = os.path.join(OUTDIR, f)
-    if os.path.exists(p):
-        produced.append(file_info(p))
-
-manifest = {
-    "last_updated_utc": UTC_NOW,
-    "produced": produced
-}
-write_json(os.path.join(OUTDIR, "manifest.json"), manifest)
-
-print(f"[summaries] OK - {len(produced)} fichiers écrits · {UTC_NOW}")
+@summary("gw_summary.json", {"merged_gw": [
+    *ID_CANDIDATES, "web_name", "team_name", "position", "minutes", "total_points", "goals_scored", "assists"]})
+def build_gw_summary(src):
+    merged_gw = src("merged_gw")
+    anomalies = []
+    gw_sum = {"last_updated_utc": UTC_NOW, "top_players": []}
+    if not merged_gw.empty:
+        id_col, a = detect_player_id(merged_gw); anomalies += a
+        if id_col:
+            # Colonnes minimales
+            for c in ["minutes","total_points","goals_scored","assists"]:
+                if c not in merged_gw.columns:
+                    merged_gw[c] = pd.NA
+            # per90 robuste (évite NAType): remplacer 0 par NaN float
+            pts = pd.to_numeric(merged_gw.get("total_points"), errors="coerce")
+            mins = pd.to_numeric(merged_gw.get("minutes"), errors="coerce").replace(0, float("nan"))
+            merged_gw["points_per90"] = (pts * 90.0) / mins
+            keep = [c for c in ["player_id","web_name","team_name","position","minutes","total_points","points_per90","goals_scored","assists"] if c in merged_gw.columns]
+            top = top_k(merged_gw[keep], ["total_points","points_per90"], 25, ascending=[False, False])
+            gw_sum["top_players"] = head_dict(top)
+    return gw_sum, anomalies
+
+# ---------- Orchestration ----------
+
+def load_state() -> dict:
+    try:
+        with open(STATE_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def main():
+    ap = argparse.ArgumentParser(description="Build summaries/ (only builders whose inputs changed).")
+    ap.add_argument("--force", action="store_true", help="Relance tous les builders.")
+    ap.add_argument("--only", nargs="*", default=None, help="Limite aux sorties listées (ex: fixtures_outlook.json).")
+    args = ap.parse_args()
+
+    os.makedirs(OUTDIR, exist_ok=True)
+    state = load_state()
+    hash_cache = state.get("hash_cache", {})
+    code = script_hash()
+    if state.get("script_sha1") != code:
+        state["builders"] = {}  # code modifié -> tout est à refaire
+    prev_builders = state.get("builders", {})
+    source_anoms = state.get("source_anomalies", {})
+
+    hashes = {name: file_hash(os.path.join(DATA, rel), hash_cache) for name, rel in SOURCES.items()}
+
+    # Builders à relancer : entrées modifiées, sortie absente ou --force
+    todo = []
+    for out, b in BUILDERS.items():
+        if args.only is not None and out not in args.only:
+            continue
+        deps = {name: hashes[name] for name in b["inputs"]}
+        prev = prev_builders.get(out)
+        if args.force or prev is None or prev.get("inputs") != deps or not os.path.exists(os.path.join(OUTDIR, out)):
+            todo.append(out)
+
+    # Colonnes à charger par source : union des besoins des builders relancés
+    columns_needed: dict[str, set[str]] = {}
+    for out in todo:
+        for name, cols in BUILDERS[out]["inputs"].items():
+            if cols is not None:
+                columns_needed.setdefault(name, set()).update(c.lower() for c in cols)
+    src = make_loader(columns_needed)
+
+    builders_state = dict(prev_builders)
+    for out in todo:
+        b = BUILDERS[out]
+        obj, anoms = b["fn"](src)
+        write_json(os.path.join(OUTDIR, out), obj)
+        builders_state[out] = {"inputs": {name: hashes[name] for name in b["inputs"]}, "anomalies": anoms}
+    for name, (_, anoms) in _LOADED.items():
+        source_anoms[name] = anoms
+
+    # ---------- anomaly_report.json ----------
+    # anomalies de chargement (dernier chargement connu de chaque source) puis anomalies des builders
+    notes = [a for name in SOURCES for a in source_anoms.get(name, [])]
+    notes += [a for out in BUILDERS for a in builders_state.get(out, {}).get("anomalies", [])]
+    write_json(os.path.join(OUTDIR, "anomaly_report.json"), {
+        "last_updated_utc": UTC_NOW,
+        "notes": notes,
+    })
+
+    # ---------- manifest.json ----------
+    produced = []
+    for f in ["manifest.json", *BUILDERS, "anomaly_report.json"]:
+        p = os.path.join(OUTDIR, f)
+        if os.path.exists(p):
+            produced.append(file_info(p))
+
+    manifest = {
+        "last_updated_utc": UTC_NOW,
+        "produced": produced
+    }
+    write_json(os.path.join(OUTDIR, "manifest.json"), manifest)
+
+    with open(STATE_FILE, "w", encoding="utf-8") as f:
+        json.dump({
+            "script_sha1": code,
+            "hash_cache": hash_cache,
+            "source_anomalies": source_anoms,
+            "builders": builders_state,
+        }, f, ensure_ascii=False, indent=2)
+
+    skipped = [out for out in BUILDERS if out not in todo]
+    print(f"[summaries] {len(todo)} builder(s) relancé(s), {len(skipped)} à jour, "
+          f"{len(_LOADED)} source(s) chargée(s) · {UTC_NOW}")
+    print(f"[summaries] OK - {len(produced)} fichiers écrits · {UTC_NOW}")
+
+if __name__ == "__main__":
+    main()
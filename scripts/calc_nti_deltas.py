@@ -2,10 +2,11 @@
 from __future__ import annotations
 
 from pathlib import Path
-from datetime import datetime
+from datetime import datetime, timedelta
 import pandas as pd
 
-from utils_io import ensure_dirs, latest_two_snapshots, read_csv_safe
+from utils_io import ensure_dirs, list_all_snapshots, snapshot_timestamp, snapshot_fingerprint, read_csv_safe
+from rebuild_nti_log import NTI_ALIASES, nti_24h
 
 DATA_DIR   = Path("data")
 SNAP_DIR   = DATA_DIR / "snapshots"
@@ -13,19 +14,54 @@ DELTAS_DIR = DATA_DIR / "deltas"
 NTI_LOG    = DELTAS_DIR / "nti_deltas.csv"
 
 PLAYERS_STEM = "players_raw"
+STALE_LOOKBACK_H = 48  # fenêtre où un état identique au dernier snapshot le rend suspect
 
 def _read_with_ts(path: Path) -> tuple[pd.DataFrame, datetime]:
-    stamp = path.stem.split("_")[-1]
-    ts = datetime.strptime(stamp, "%Y-%m-%dT%H-%M")
+    ts = snapshot_timestamp(path, PLAYERS_STEM)
     df = pd.read_csv(path)
     df.columns = [c.strip().lower() for c in df.columns]
+    for src, dst in NTI_ALIASES.items():
+        if src in df.columns and dst not in df.columns:
+            df = df.rename(columns={src: dst})
     return df, ts
 
+def _fingerprint(path: Path) -> str | None:
+    df = pd.read_csv(path, usecols=lambda c: c.strip().lower() in {"id", *NTI_ALIASES, "transfers_in_event",
+                                                                   "transfers_out_event", "now_cost"})
+    df.columns = [c.strip().lower() for c in df.columns]
+    return snapshot_fingerprint(df.rename(columns={k: v for k, v in NTI_ALIASES.items() if v not in df.columns}))
+
+def _latest_two() -> tuple[Path | None, Path | None, bool]:
+    """
+    Dernier snapshot, précédent retenu, et indicateur "dernier snapshot à ignorer".
+    Ordre UTC (tous formats) ; sur les STALE_LOOKBACK_H dernières heures, un snapshot dont le contenu
+    (snapshot_fingerprint) a déjà été vu est écarté : même état déjà journalisé, ou fichier périmé.
+    """
+    snaps = list_all_snapshots(SNAP_DIR, PLAYERS_STEM)
+    if not snaps:
+        return None, None, False
+    t_last = snaps[-1][0]
+    recent = [f for t, f in snaps if t >= t_last - timedelta(hours=STALE_LOOKBACK_H)]
+    kept, seen = [], set()
+    for f in recent:
+        fp = _fingerprint(f)
+        if fp is None or fp not in seen:
+            kept.append(f)
+            seen.add(fp)
+    latest = recent[-1]
+    if kept[-1] != latest:
+        return latest, None, True
+    prev = kept[-2] if len(kept) > 1 else (snaps[-len(recent) - 1][1] if len(snaps) > len(recent) else None)
+    return latest, prev, False
+
 def main():
     ensure_dirs(DELTAS_DIR)
-    latest, prev = latest_two_snapshots(SNAP_DIR, PLAYERS_STEM)
+    latest, prev, stale = _latest_two()
     if latest is None:
         raise SystemExit("[WARN] No snapshot found yet.")
+    if stale:
+        print(f"[WARN] {latest.name} : contenu identique à un snapshot antérieur -> log NTI inchangé.")
+        return
 
     # Cas initial : un seul snapshot
     if prev is None:
@@ -88,19 +124,9 @@ def main():
 
     log = log.sort_values(["id", "timestamp"]).reset_index(drop=True)
 
-    # Recalcul NTI_24h par joueur
-    nti24_values = []
-    for pid, grp in log.groupby("id", sort=False):
-        ts_series = grp["timestamp"]
-        nti1h = pd.to_numeric(grp["NTI_1h"], errors="coerce").fillna(0.0)
-        vals = []
-        for i, t in enumerate(ts_series):
-            window_start = t - pd.Timedelta(hours=24)
-            mask = (ts_series > window_start) & (ts_series <= t)
-            vals.append(float(nti1h[mask].sum()))
-        nti24_values.extend(vals)
-
-    log["NTI_24h"] = nti24_values
+    # Recalcul NTI_24h par joueur (fenêtre ]t-24h, t], vectorisé)
+    nti1h = pd.to_numeric(log["NTI_1h"], errors="coerce").fillna(0.0)
+    log["NTI_24h"] = nti_24h(log["id"], log["timestamp"], nti1h)
 
     log.to_csv(NTI_LOG, index=False)
     print("[PASS] NTI deltas updated.")
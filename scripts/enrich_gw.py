@@ -1,139 +1,116 @@
 # scripts/enrich_gw.py
 # Rôle:
 # - Enrichit data/season/gwX.csv avec: fixture, kickoff_time (UTC), opponent_team, name
-# - Source principale: gwX_permatch.csv
+# - Source principale: gwX_permatch.csv (index (element, gw) de enrich_merged_gw)
 # - Fallback kickoff_time: fixtures.csv
-# - Nettoyage systématique des colonnes suffixées (fixture/opponent_team/kickoff_time)
-# - Écrit TOUJOURS un courant + snapshot via write_gw_and_snapshot
+# - Même étape d'enrichissement vectorisée que enrich_merged_gw (enrich_frame)
+# - Lot de GW dans un seul processus (--gws 1-38 / --all) : fixtures.csv et player_idlist.csv lus
+#   une seule fois, GW enrichies en parallèle si --jobs > 1, écritures groupées (un seul horodatage)
+# - Écrit TOUJOURS un courant + snapshot (data/snapshots/gwX_*.csv)
+#
+# Usage:
+#   python scripts/enrich_gw.py --gw 5
+#   python scripts/enrich_gw.py --gws 1-38 [--jobs 4]
+#   python scripts/enrich_gw.py --all
 
 import argparse
+import re
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 from pathlib import Path
 import pandas as pd
-from utils_io import ensure_dirs, write_gw_and_snapshot
-
-def load_csv(path: Path) -> pd.DataFrame:
-    if not path.exists():
-        raise FileNotFoundError(f"Introuvable: {path}")
-    return pd.read_csv(path, encoding="utf-8")
-
-def unify_element(df: pd.DataFrame) -> pd.DataFrame:
-    if "element" in df.columns:
-        return df
-    for cand in ("player_id", "id"):
-        if cand in df.columns:
-            out = df.copy()
-            out["element"] = out[cand]
-            return out
-    raise KeyError("Aucune colonne d'identifiant joueur (element/player_id/id).")
-
-def prefer_full_name(row) -> str | None:
-    fn = str(row.get("first_name") or "").strip()
-    sn = str(row.get("second_name") or "").strip()
-    if fn and sn:
-        return f"{fn} {sn}"
-    wn = str(row.get("web_name") or "").strip()
-    return wn or None
-
-def coalesce_columns(df: pd.DataFrame, base: str) -> pd.DataFrame:
-    """
-    Unifie 'base' parmi les variantes: base, base__pm, base_map, base_x, base_y, base_from_fix.
-    Garde une seule colonne 'base' au final.
-    """
-    variants = [base, f"{base}__pm", f"{base}_map", f"{base}_x", f"{base}_y", f"{base}_from_fix"]
-    present = [c for c in variants if c in df.columns]
-    if not present:
-        return df
-    if base not in df.columns:
-        df[base] = pd.NA
-    for c in present:
-        if c == base:
-            continue
-        df[base] = df[base].fillna(df[c])
-    # drop toutes les variantes sauf la finale
-    for c in present:
-        if c != base and c in df.columns:
-            df.drop(columns=[c], inplace=True, errors="ignore")
-    return df
-
-def main():
-    parser = argparse.ArgumentParser(description="Enrichit gwX.csv avec fixture/kickoff_time/opponent_team/name")
-    parser.add_argument("--gw", type=int, required=True)
-    args = parser.parse_args()
-
-    root = Path(__file__).resolve().parents[1]
-    ensure_dirs(root)
-
+from utils_io import ensure_dirs, now_local, snapshot_copies
+from enrich_merged_gw import load_csv, index_frame, enrich_context, enrich_frame
+
+ROOT = Path(__file__).resolve().parents[1]
+
+def parse_gws(specs: list[str]) -> list[int]:
+    """["1-5", "7,9"] -> [1, 2, 3, 4, 5, 7, 9]"""
+    out = set()
+    for spec in specs:
+        for tok in filter(None, re.split(r"[,\s]+", spec)):
+            lo, _, hi = tok.partition("-")
+            out.update(range(int(lo), int(hi or lo) + 1))
+    return sorted(out)
+
+def gw_paths(root: Path, gw: int) -> tuple[Path, Path]:
+    """gwX.csv & gwX_permatch.csv (priorité data/season, fallback racine)"""
     season_dir = root / "data" / "season"
-    fixtures_path = root / "data" / "fixtures.csv"
-    pid_path = root / "data" / "player_idlist.csv"
-
-    # Localiser gwX.csv & gwX_permatch.csv (priorité data/season, fallback racine)
-    gw_path = season_dir / f"gw{args.gw}.csv"
+    gw_path = season_dir / f"gw{gw}.csv"
     if not gw_path.exists():
-        gw_path = root / f"gw{args.gw}.csv"
-    pm_path = season_dir / f"gw{args.gw}_permatch.csv"
+        gw_path = root / f"gw{gw}.csv"
+    pm_path = season_dir / f"gw{gw}_permatch.csv"
     if not pm_path.exists():
-        pm_path = root / f"gw{args.gw}_permatch.csv"
-
-    gw = unify_element(load_csv(gw_path))
-    pm = unify_element(load_csv(pm_path))
-
-    # Nettoyage préalable dans les 2 DataFrames (si fichiers héritent d'anciennes merges)
-    for base in ["fixture", "opponent_team", "kickoff_time"]:
-        gw = coalesce_columns(gw, base)
-        pm = coalesce_columns(pm, base)
+        pm_path = root / f"gw{gw}_permatch.csv"
+    return gw_path, pm_path
 
-    need_pm = ["element","fixture","opponent_team"]
-    missing = [c for c in need_pm if c not in pm.columns]
-    if missing:
-        raise KeyError(f"Colonnes manquantes dans gw{args.gw}_permatch.csv: {missing}")
-
-    # Jointure: si 'fixture' déjà dans gw, joindre sur (element, fixture), sinon sur element
-    join_cols = ["element","fixture"] if "fixture" in gw.columns else ["element"]
-
-    pm_for_merge = pm.copy()
-    if join_cols == ["element"]:
-        # éviter la duplication (double GW) en gardant la 1re occurrence
-        pm_for_merge = pm_for_merge.sort_values(["element","fixture"]).drop_duplicates("element", keep="first")
-
-    cols_inject = ["element","fixture","opponent_team"] + (["kickoff_time"] if "kickoff_time" in pm_for_merge.columns else [])
-
-    # IMPORTANT: utiliser un suffixe sûr pour éviter '..._x' déjà existants dans le CSV
-    gw2 = gw.merge(pm_for_merge[cols_inject], on=join_cols, how="left", suffixes=("", "__pm"))
-
-    # Coalesce après merge (supprime *_x, *_y, *_map, *__pm, *_from_fix)
-    for base in ["fixture", "opponent_team", "kickoff_time"]:
-        gw2 = coalesce_columns(gw2, base)
-
-    # Compléter kickoff_time via fixtures.csv si manquant
-    if ("kickoff_time" not in gw2.columns) or (gw2["kickoff_time"].isna().any()):
-        if fixtures_path.exists():
-            fixtures = load_csv(fixtures_path)
-            if {"id","kickoff_time"}.issubset(fixtures.columns):
-                fix_mini = fixtures[["id","kickoff_time"]].rename(columns={"id":"fixture"})
-                gw2 = gw2.merge(fix_mini, on="fixture", how="left", suffixes=("", "_from_fix"))
-                gw2 = coalesce_columns(gw2, "kickoff_time")
-
-    # name : full name si possible, sinon web_name
-    if "name" not in gw2.columns or gw2["name"].isna().all():
-        if pid_path.exists():
-            pid = load_csv(pid_path)[["id","web_name","first_name","second_name"]].rename(columns={"id":"element"})
-            gw2 = gw2.merge(pid, on="element", how="left")
-            gw2["name"] = gw2.apply(prefer_full_name, axis=1)
-            gw2.drop(columns=["first_name","second_name","web_name"], inplace=True, errors="ignore")
-        elif "web_name" in gw2.columns and "name" not in gw2.columns:
-            gw2["name"] = gw2["web_name"]
-        elif "name" not in gw2.columns:
-            gw2["name"] = pd.NA
+def available_gws(root: Path) -> list[int]:
+    """GW ayant gwX.csv et gwX_permatch.csv dans data/season."""
+    season_dir = root / "data" / "season"
+    gws = [int(m.group(1)) for p in season_dir.glob("gw*.csv") if (m := re.match(r"^gw(\d+)\.csv$", p.name))]
+    return sorted(g for g in gws if (season_dir / f"gw{g}_permatch.csv").exists())
+
+def enrich_one(gw: int, root: Path, ctx: dict) -> pd.DataFrame:
+    gw_path, pm_path = gw_paths(root, gw)
+    df = load_csv(gw_path)
+    index = index_frame(load_csv(pm_path), gw, pm_path.name)
+    if "gw" not in df.columns:
+        df.insert(0, "gw", gw)
+    return enrich_frame(df, index, ctx)
+
+def _enrich_safe(gw: int, root: Path, ctx: dict):
+    try:
+        return gw, enrich_one(gw, root, ctx), None
+    except Exception as e:
+        return gw, None, f"{type(e).__name__}: {e}"
+
+def enrich_many(gws: list[int], root: Path = ROOT, jobs: int = 1) -> tuple[dict, dict]:
+    """Enrichit plusieurs GW avec un seul chargement des tables partagées ; renvoie (frames, erreurs)."""
+    ctx, _ = enrich_context(root)
+    if jobs <= 1 or len(gws) <= 1:
+        results = [_enrich_safe(g, root, ctx) for g in gws]
+    else:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(gws))) as ex:
+            results = list(ex.map(_enrich_safe, gws, repeat(root), repeat(ctx)))
+    frames = {g: df for g, df, err in results if err is None}
+    errors = {g: err for g, _, err in results if err is not None}
+    return frames, errors
+
+def write_batch(root: Path, frames: dict) -> None:
+    """Courants data/season/gwX.csv + snapshots data/snapshots/gwX_<ts>.csv (snapshot_copies, même ts pour le lot)."""
+    season_dir = root / "data" / "season"
+    ensure_dirs(season_dir)
+    paths = []
+    for gw, df in sorted(frames.items()):
+        current_path = season_dir / f"gw{gw}.csv"
+        df.to_csv(current_path, index=False)
+        paths.append(current_path)
+    ts = now_local()
+    snapshot_copies(paths, ts)
+    print(f"[WROTE] {len(frames)} GW -> {season_dir} (+ snapshots _{ts:%Y%m%d_%H%M%S})")
 
-    # Types (nullable autorisé)
-    for c in ["element","fixture","opponent_team","minutes"]:
-        if c in gw2.columns:
-            gw2[c] = pd.to_numeric(gw2[c], errors="coerce").astype("Int64")
+def main():
+    parser = argparse.ArgumentParser(description="Enrichit gwX.csv avec fixture/kickoff_time/opponent_team/name")
+    sel = parser.add_mutually_exclusive_group(required=True)
+    sel.add_argument("--gw", type=int)
+    sel.add_argument("--gws", nargs="+", help="GW à enrichir : 1-38, 3,5,7 ...")
+    sel.add_argument("--all", action="store_true", help="Toutes les GW ayant gwX.csv et gwX_permatch.csv.")
+    parser.add_argument("--jobs", type=int, default=1, help="Processus en parallèle (défaut 1).")
+    args = parser.parse_args()
 
-    # Écriture (courant: data/season/gwX.csv + snapshot: data/snapshots/gwX_*.csv)
-    write_gw_and_snapshot(root, gw2, args.gw, stem="gw")
-    print(f"[OK] gw{args.gw}.csv enrichi (fixture, kickoff_time, opponent_team, name)")
+    ensure_dirs(ROOT)
+    gws = [args.gw] if args.gw is not None else available_gws(ROOT) if args.all else parse_gws(args.gws)
+    if not gws:
+        raise SystemExit("[WARN] Aucune GW à enrichir.")
+
+    frames, errors = enrich_many(gws, ROOT, args.jobs)
+    for gw, err in errors.items():
+        print(f"[WARN] gw{gw}: {err}")
+    if args.gw is not None and errors:
+        raise SystemExit(1)
+    if frames:
+        write_batch(ROOT, frames)
+    print(f"[OK] {len(frames)} GW enrichie(s) (fixture, kickoff_time, opponent_team, name) : {sorted(frames)}")
 
 if __name__ == "__main__":
     main()
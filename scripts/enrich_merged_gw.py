@@ -1,15 +1,24 @@
 # scripts/enrich_merged_gw.py
 # Rôle:
 # - Enrichit data/merged_gw.csv avec: fixture, kickoff_time (UTC), opponent_team, name
-# - Parcourt tous les gw*_permatch.csv (data/season puis racine)
-# - Jointure sur (element, gw/round/event) si dispo, sinon fallback
+# - Étape unique d'enrichissement (aussi utilisée par enrich_gw.py pour une GW)
+# - Index précalculé (element, gw) -> fixture / opponent_team / kickoff_time : une partition par
+#   gw*_permatch.csv (dataset gw_partitions "fixture_index", 1er match par joueur et GW)
+# - Partitions enrichies par GW (dataset "merged_gw_enriched") : seules les GW dont gwN.csv, la
+#   partition d'index ou les tables partagées (kickoff des fixtures, noms) ont changé sont recalculées
+# - name vectorisé (prénom + nom, sinon web_name)
 # - Unifie toujours les colonnes (coalesce) pour éviter fixture_x/fixture_y/_map
-# - Écrit TOUJOURS courant + snapshot via write_current_and_snapshot
+# - Écrit TOUJOURS courant (streaming des partitions) + snapshot
 
+import argparse
+import hashlib
 from pathlib import Path
-import re, glob
+import re
 import pandas as pd
-from utils_io import ensure_dirs, write_current_and_snapshot
+from utils_io import ensure_dirs, snapshot_copies
+from gw_partitions import (dataset_dir, register_dataset, update_partitions, sync_dataset, _merged_gw)
+
+ROOT = Path(__file__).resolve().parents[1]
 
 def load_csv(path: Path) -> pd.DataFrame:
     if not path.exists():
@@ -26,13 +35,14 @@ def unify_element(df: pd.DataFrame) -> pd.DataFrame:
             return out
     raise KeyError("Aucune colonne d'identifiant joueur (element/player_id/id).")
 
-def prefer_full_name(row) -> str | None:
-    fn = str(row.get("first_name") or "").strip()
-    sn = str(row.get("second_name") or "").strip()
-    if fn and sn:
-        return f"{fn} {sn}"
-    wn = str(row.get("web_name") or "").strip()
-    return wn or None
+def full_name(df: pd.DataFrame) -> pd.Series:
+    """name vectorisé : "first_name second_name" si les deux sont renseignés, sinon web_name, sinon None."""
+    def clean(c):
+        s = df[c] if c in df.columns else pd.Series(pd.NA, index=df.index)
+        return s.astype("string").str.strip().fillna("")
+    fn, sn, wn = clean("first_name"), clean("second_name"), clean("web_name")
+    name = (fn + " " + sn).where((fn != "") & (sn != ""), wn)
+    return name.where(name != "", None).astype(object)
 
 def parse_gw_from_filename(fn: str):
     m = re.search(r"gw(\d+)_permatch\.csv$", fn)
@@ -55,79 +65,93 @@ def coalesce_columns(df: pd.DataFrame, base: str) -> pd.DataFrame:
             df.drop(columns=[cand], inplace=True, errors="ignore")
     return df
 
-def main():
-    root = Path(__file__).resolve().parents[1]
-    ensure_dirs(root)
-
-    merged_path = root / "data" / "merged_gw.csv"
+# --- Index (element, gw) -> fixture / opponent_team / kickoff_time ---
+INDEX_COLS = ["element", "fixture", "opponent_team", "kickoff_time"]
+KEY_COLS = ["fixture", "opponent_team", "kickoff_time"]
+
+def index_frame(pm: pd.DataFrame, gw: int, name: str = "", ctx=None) -> pd.DataFrame:
+    """Une ligne par joueur pour la GW (1er match si double GW), depuis un gw*_permatch.csv."""
+    pm = unify_element(pm)
+    for base in KEY_COLS:
+        pm = coalesce_columns(pm, base)
+    missing = [c for c in ["element", "fixture", "opponent_team"] if c not in pm.columns]
+    if missing:
+        raise KeyError(f"Colonnes manquantes dans {name or f'gw{gw}_permatch.csv'}: {missing}")
+    pm = pm[[c for c in INDEX_COLS if c in pm.columns]].copy()
+    pm.insert(1, "gw", gw)
+    return pm.sort_values(["element", "fixture"], kind="mergesort").drop_duplicates(["element", "gw"], keep="first")
+
+# --- Tables partagées : kickoff des fixtures, noms joueurs ---
+NAME_COLS = ["web_name", "first_name", "second_name"]
+
+def enrich_context(root: Path = ROOT) -> tuple[dict, str]:
+    """
+    (contexte, empreinte) : fixture -> kickoff_time et noms par joueur (player_idlist, complété par
+    first_name / second_name / web_name de players_raw.csv : player_idlist ne porte que web_name).
+    """
     fixtures_path = root / "data" / "fixtures.csv"
     pid_path = root / "data" / "player_idlist.csv"
+    raw_path = root / "data" / "players_raw.csv"
+    kick = None
+    if fixtures_path.exists():
+        fixtures = load_csv(fixtures_path)
+        if {"id", "kickoff_time"}.issubset(fixtures.columns):
+            kick = fixtures.set_index("id")["kickoff_time"]
+    pid = None
+    if pid_path.exists():
+        pid = load_csv(pid_path)
+        pid = pid[[c for c in ["id"] + NAME_COLS if c in pid.columns]]
+        pid = pid.rename(columns={"id": "element"}).drop_duplicates("element").set_index("element")
+    if raw_path.exists():
+        raw = pd.read_csv(raw_path, encoding="utf-8", usecols=lambda c: c in NAME_COLS + ["id"])
+        if "id" in raw.columns:
+            raw = raw.rename(columns={"id": "element"}).drop_duplicates("element").set_index("element")
+            pid = raw if pid is None else pid.combine_first(raw)
+    h = hashlib.sha1()
+    for part in (kick, pid):
+        h.update(b"-" if part is None else part.to_csv().encode())
+    return {"kickoff": kick, "pid": pid}, h.hexdigest()
+
+# --- Enrichissement d'un DataFrame (une GW ou plusieurs) ---
+def enrich_frame(df: pd.DataFrame, index: pd.DataFrame, ctx: dict) -> pd.DataFrame:
+    mg = unify_element(df)
+    for base in KEY_COLS:
+        mg = coalesce_columns(mg, base)
 
-    merged = unify_element(load_csv(merged_path))
-
-    # Détecter la colonne GW si présente
-    gw_col = next((c for c in ["gw","round","event"] if c in merged.columns), None)
-
-    # Collecter gw*_permatch.csv (data/season d'abord, puis racine)
-    pm_files = sorted(glob.glob(str(root / "data" / "season" / "gw*_permatch.csv")))
-    if not pm_files:
-        pm_files = sorted(glob.glob(str(root / "gw*_permatch.csv")))
-    if not pm_files:
-        raise FileNotFoundError("Aucun gw*_permatch.csv trouvé (data/season/ ou racine).")
-
-    rows = []
-    for fp in pm_files:
-        pm = unify_element(load_csv(Path(fp)))
-        cols = ["element","fixture","opponent_team"]
-        if "kickoff_time" in pm.columns:
-            cols.append("kickoff_time")
-        pm = pm[cols].copy()
-        gw_num = parse_gw_from_filename(Path(fp).name)
-        if gw_col is not None and gw_num is not None:
-            pm[gw_col] = gw_num
-            pm = pm.sort_values(["element","fixture"]).drop_duplicates(["element", gw_col], keep="first")
-        else:
-            pm = pm.sort_values(["element","fixture"]).drop_duplicates("element", keep="first")
-        rows.append(pm)
-
-    mapping = pd.concat(rows, ignore_index=True).drop_duplicates()
-
-    # Jointure principale (toujours avec suffixes pour contrôler et coalescer ensuite)
-    if gw_col is not None and gw_col in mapping.columns:
-        mg = merged.merge(mapping, on=["element", gw_col], how="left", suffixes=("", "_map"))
-    else:
-        if "fixture" in merged.columns:
-            mg = merged.merge(mapping, on="fixture", how="left", suffixes=("", "_map"))
+    # Jointure sur (element, gw) avec l'index, puis coalesce (les valeurs déjà présentes priment)
+    if not index.empty:
+        gw_col = next((c for c in ["gw", "round", "event"] if c in mg.columns), None)
+        if gw_col is not None:
+            mg = mg.merge(index.rename(columns={"gw": gw_col}), on=["element", gw_col], how="left", suffixes=("", "_map"))
         else:
-            mg = merged.merge(mapping.groupby("element", as_index=False).first(), on="element", how="left", suffixes=("", "_map"))
-
-    # Coalesce systématique des colonnes clés
-    for base in ["fixture", "opponent_team", "kickoff_time"]:
-        mg = coalesce_columns(mg, base)
+            mg = mg.merge(index.drop(columns=["gw"]).drop_duplicates("element"), on="element", how="left", suffixes=("", "_map"))
+        for base in KEY_COLS:
+            mg = coalesce_columns(mg, base)
 
     # Compléter kickoff_time via fixtures.csv si encore manquant et si 'fixture' existe
+    kick = ctx.get("kickoff")
     if "fixture" in mg.columns and (("kickoff_time" not in mg.columns) or (mg["kickoff_time"].isna().any())):
-        if fixtures_path.exists():
-            fixtures = load_csv(fixtures_path)
-            if {"id","kickoff_time"}.issubset(fixtures.columns):
-                fix_mini = fixtures[["id","kickoff_time"]].rename(columns={"id":"fixture"})
-                mg = mg.merge(fix_mini, on="fixture", how="left", suffixes=("", "_from_fix"))
-                # Coalesce de kickoff_time avec la version issue des fixtures
-                if "kickoff_time_from_fix" in mg.columns:
-                    mg["kickoff_time"] = mg["kickoff_time"].fillna(mg["kickoff_time_from_fix"])
-                    mg.drop(columns=["kickoff_time_from_fix"], inplace=True, errors="ignore")
-                # Re-coalesce au cas où
-                mg = coalesce_columns(mg, "kickoff_time")
+        if kick is not None:
+            from_fix = pd.to_numeric(mg["fixture"], errors="coerce").map(kick)
+            mg["kickoff_time"] = mg["kickoff_time"].fillna(from_fix) if "kickoff_time" in mg.columns else from_fix
         else:
             print("[INFO] fixtures.csv introuvable — 'kickoff_time' non complété via fixtures.")
 
-    # name : full name si possible sinon web_name
-    if "name" not in mg.columns or mg["name"].isna().all():
-        if pid_path.exists():
-            pid = load_csv(pid_path)[["id","web_name","first_name","second_name"]].rename(columns={"id":"element"})
-            mg = mg.merge(pid, on="element", how="left")
-            mg["name"] = mg.apply(prefer_full_name, axis=1)
-            mg.drop(columns=["first_name","second_name","web_name"], inplace=True, errors="ignore")
+    # name : full name si possible sinon web_name, complété ligne à ligne (même format dans toutes
+    # les partitions GW, qu'une GW porte déjà la colonne name ou non)
+    if "name" not in mg.columns or mg["name"].isna().any():
+        pid = ctx.get("pid")
+        if pid is not None:
+            names = pd.DataFrame(index=mg.index)
+            ids = mg["element"]
+            for c in ["first_name", "second_name", "web_name"]:
+                if c in mg.columns:
+                    names[c] = mg[c]
+                if c in pid.columns:
+                    looked = ids.map(pid[c])
+                    names[c] = names[c].fillna(looked) if c in names.columns else looked
+            full = full_name(names)
+            mg["name"] = mg["name"].fillna(full) if "name" in mg.columns else full
         elif "web_name" in mg.columns and "name" not in mg.columns:
             mg["name"] = mg["web_name"]
         elif "name" not in mg.columns:
@@ -137,12 +161,40 @@ def main():
     for c in ["element","fixture","opponent_team","minutes"]:
         if c in mg.columns:
             mg[c] = pd.to_numeric(mg[c], errors="coerce").astype("Int64")
+    return mg
+
+# --- Partitions (gw_partitions) ---
+def _index_partition_path(gw: int) -> Path:
+    return dataset_dir("fixture_index") / f"gw{gw}.csv"
 
-    write_current_and_snapshot(
-        mg,
-        current_path=merged_path,
-        name_for_snapshot="merged_gw"
-    )
+def _enriched_partition(df: pd.DataFrame, gw: int, name: str, ctx: dict) -> pd.DataFrame:
+    p = _index_partition_path(gw)
+    index = pd.read_csv(p) if p.exists() else pd.DataFrame(columns=["element", "gw"] + KEY_COLS)
+    # même partition que build_merged_gw (gw si absente, alias player_id <- element), puis enrichie
+    return enrich_frame(_merged_gw(df, gw, name), index, ctx)
+
+register_dataset("fixture_index", r"^gw(\d+)_permatch\.csv$", index_frame)
+register_dataset("merged_gw_enriched", r"^gw(\d+)\.csv$", _enriched_partition,
+                 deps=lambda gw: [_index_partition_path(gw)], context=enrich_context)
+
+def main():
+    ap = argparse.ArgumentParser(description="Enrich merged_gw.csv (fixture, kickoff_time, opponent_team, name), changed GWs only.")
+    ap.add_argument("--rebuild", action="store_true", help="Recalcule toutes les partitions.")
+    args = ap.parse_args()
+
+    ensure_dirs(ROOT)
+    season = ROOT / "data" / "season"
+    merged_path = ROOT / "data" / "merged_gw.csv"
+
+    idx = update_partitions("fixture_index", season, rebuild=args.rebuild)
+    if not idx["manifest"]["partitions"]:
+        raise FileNotFoundError("Aucun gw*_permatch.csv trouvé (data/season/).")
+
+    res = sync_dataset("merged_gw_enriched", merged_path, season, rebuild=args.rebuild)
+    if res is None:
+        raise FileNotFoundError(f"Aucun gwN.csv trouvé dans {season}")
+    snap = snapshot_copies([merged_path])[0]
+    print(f"[WRITE] {merged_path.name} réécrit + snapshot {snap.name}")
     print("[OK] data/merged_gw.csv enrichi (fixture, kickoff_time, opponent_team, name)")
 
 if __name__ == "__main__":
@@ -0,0 +1,171 @@
+# scripts/fixtures_scd.py
+"""
+Journal des fixtures en dimension à évolution lente (SCD type 2), à la place des snapshots complets.
+
+data/fixtures_scd.csv : une ligne par VERSION d'un match
+  id, version, valid_from, valid_to, change, event, kickoff_time, team_h, team_a,
+  team_h_name, team_a_name, provisional_start_time
+- valid_from / valid_to : horodatages UTC ISO ("...Z") ; valid_to vide = version courante
+- change : "" (chargement initial), "added", ou champs modifiés ("event,kickoff_time")
+- Un match reprogrammé -> version courante fermée + nouvelle version ; un match disparu -> fermée
+- Diff entre versions courantes et nouvelle liste via table_diff (colonnaire, par masques)
+- Le journal ne grossit qu'avec les changements réels ; data/fixtures_scd_state.json garde le dernier
+  horodatage intégré (mise à jour incrémentale)
+
+API de requête :
+  as_of(ts)                  liste des fixtures telle qu'elle était à ts
+  changes_between(start, end) changements (ajouts, reprogrammations, suppressions) dans ]start, end]
+  fixture_history(id)         toutes les versions d'un match
+
+Usage :
+  python scripts/fixtures_scd.py [--rebuild]      # intègre data/fixtures_snapshots/*.csv (nouveaux seulement)
+  python scripts/fixtures_scd.py --as-of 2025-09-01T00:00:00Z
+"""
+
+from __future__ import annotations
+import argparse
+import json
+from datetime import datetime
+from pathlib import Path
+import pandas as pd
+
+from table_diff import diff_tables
+
+ROOT = Path(__file__).resolve().parents[1]
+DATA = ROOT / "data"
+SNAP_DIR = DATA / "fixtures_snapshots"
+SCD_FILE = DATA / "fixtures_scd.csv"
+STATE_FILE = DATA / "fixtures_scd_state.json"
+
+KEY = "id"
+TRACKED = ["event", "kickoff_time", "team_h", "team_a", "team_h_name", "team_a_name", "provisional_start_time"]
+INT_COLS = ["event", "team_h", "team_a"]
+SCD_COLS = [KEY, "version", "valid_from", "valid_to", "change"] + TRACKED
+
+def iso_utc(ts) -> str:
+    """Horodatage -> "YYYY-MM-DDTHH:MM:SSZ" (naïf = UTC)."""
+    t = pd.Timestamp(ts)
+    t = t.tz_localize("UTC") if t.tzinfo is None else t.tz_convert("UTC")
+    return t.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+def snapshot_ts(path: Path) -> str:
+    """fixtures_YYYYMMDD-HHMMSS.csv (UTC) -> ISO."""
+    return iso_utc(datetime.strptime(Path(path).stem.replace("fixtures_", ""), "%Y%m%d-%H%M%S"))
+
+def canon(df: pd.DataFrame) -> pd.DataFrame:
+    """Colonnes suivies, types stables (Int64 / texte) : pas de faux changements 29 vs 29.0."""
+    out = pd.DataFrame({KEY: pd.to_numeric(df[KEY], errors="coerce").astype("Int64")})
+    for c in TRACKED:
+        s = df[c] if c in df.columns else pd.Series(pd.NA, index=df.index)
+        if c in INT_COLS:
+            out[c] = pd.to_numeric(s, errors="coerce").astype("Int64")
+        else:
+            out[c] = s.where(s.notna(), pd.NA).astype("string")
+    return out[out[KEY].notna()].reset_index(drop=True)
+
+# --- Journal ---
+def load_log() -> pd.DataFrame:
+    if not SCD_FILE.exists():
+        return pd.DataFrame(columns=SCD_COLS)
+    log = pd.read_csv(SCD_FILE, dtype={"valid_from": "string", "valid_to": "string", "change": "string"},
+                      keep_default_na=False, na_values={c: [""] for c in SCD_COLS if c != "change"})
+    log["version"] = log["version"].astype(int)
+    return pd.concat([canon(log), log[["version", "valid_from", "valid_to", "change"]]], axis=1)[SCD_COLS]
+
+def load_state() -> dict:
+    if not STATE_FILE.exists():
+        return {}
+    with open(STATE_FILE, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def save_log(log: pd.DataFrame, last_ts: str):
+    log.sort_values([KEY, "version"], kind="mergesort").to_csv(SCD_FILE, index=False, encoding="utf-8")
+    with open(STATE_FILE, "w", encoding="utf-8") as f:
+        json.dump({"last_snapshot": last_ts, "n_versions": int(len(log))}, f, ensure_ascii=False)
+
+def current_versions(log: pd.DataFrame) -> pd.DataFrame:
+    return log[log["valid_to"].isna()]
+
+def apply_snapshot(log: pd.DataFrame, fixtures: pd.DataFrame, ts: str) -> tuple[pd.DataFrame, dict]:
+    """Intègre une liste de fixtures observée à `ts` ; renvoie (journal, diff table_diff vs versions courantes)."""
+    snap = canon(fixtures)
+    cur = current_versions(log)
+    d = diff_tables(cur, snap, KEY, TRACKED)
+    changed = d["changed"]
+    closing = set(changed[KEY].tolist()) | set(d["removed"])
+    if closing:
+        log = log.copy()
+        log.loc[log["valid_to"].isna() & log[KEY].isin(list(closing)), "valid_to"] = ts
+
+    new_ids = changed[KEY].tolist() + d["added"]
+    if not new_ids:
+        return log, d
+    rows = snap.set_index(KEY).loc[new_ids].reset_index()
+    last_version = log.groupby(KEY)["version"].max() if not log.empty else pd.Series(dtype=int)
+    rows["version"] = rows[KEY].map(last_version).fillna(0).astype(int).to_numpy() + 1
+    rows["valid_from"] = ts
+    rows["valid_to"] = pd.NA
+    first_load = log.empty
+    rows["change"] = (changed["changed_fields"].tolist()
+                      + ["" if first_load else "added"] * len(d["added"]))
+    rows = rows.astype({"valid_from": "string", "valid_to": "string", "change": "string"})
+    frames = [f for f in (log, rows[SCD_COLS]) if not f.empty]
+    return pd.concat(frames, ignore_index=True), d
+
+def update_from_snapshots(rebuild: bool = False) -> tuple[pd.DataFrame, int]:
+    """Intègre les snapshots de data/fixtures_snapshots plus récents que le dernier intégré."""
+    log = pd.DataFrame(columns=SCD_COLS) if rebuild else load_log()
+    last = None if rebuild else load_state().get("last_snapshot")
+    files = sorted(SNAP_DIR.glob("fixtures_*.csv"))
+    n = 0
+    for fp in files:
+        ts = snapshot_ts(fp)
+        if last is not None and ts <= last:
+            continue
+        log, _ = apply_snapshot(log, pd.read_csv(fp), ts)
+        last, n = ts, n + 1
+    if last is not None:
+        save_log(log, last)
+    return log, n
+
+# --- API de requête ---
+def as_of(ts, log: pd.DataFrame | None = None) -> pd.DataFrame:
+    """Fixtures valides à l'instant ts (valid_from <= ts < valid_to)."""
+    log = load_log() if log is None else log
+    t = iso_utc(ts)
+    alive = (log["valid_from"] <= t) & (log["valid_to"].isna() | (log["valid_to"] > t))
+    return log[alive.fillna(False).astype(bool)][[KEY] + TRACKED].sort_values(KEY).reset_index(drop=True)
+
+def changes_between(start, end, log: pd.DataFrame | None = None) -> pd.DataFrame:
+    """Ajouts / reprogrammations (nouvelles versions) et suppressions (versions fermées sans suite) dans ]start, end]."""
+    log = load_log() if log is None else log
+    s, e = iso_utc(start), iso_utc(end)
+    new = log[(log["valid_from"] > s) & (log["valid_from"] <= e) & (log["change"] != "")]
+    new = new.assign(changed_at=new["valid_from"])
+    last = log.groupby(KEY)["version"].transform("max") == log["version"]
+    gone = log[last & log["valid_to"].notna() & (log["valid_to"] > s) & (log["valid_to"] <= e)]
+    gone = gone.assign(changed_at=gone["valid_to"], change="removed")
+    out = pd.concat([f for f in (new, gone) if not f.empty] or [new], ignore_index=True)
+    return out[["changed_at", KEY, "version", "change"] + TRACKED].sort_values(["changed_at", KEY]).reset_index(drop=True)
+
+def fixture_history(fixture_id: int, log: pd.DataFrame | None = None) -> pd.DataFrame:
+    log = load_log() if log is None else log
+    return log[log[KEY] == fixture_id].sort_values("version").reset_index(drop=True)
+
+def main():
+    ap = argparse.ArgumentParser(description="Maintain the SCD type-2 fixtures change log.")
+    ap.add_argument("--rebuild", action="store_true", help="Reconstruit depuis tous les snapshots fixtures.")
+    ap.add_argument("--as-of", help="Affiche la liste des fixtures à cet instant (UTC).")
+    args = ap.parse_args()
+
+    if args.as_of:
+        print(as_of(args.as_of).to_string(index=False))
+        return
+    log, n = update_from_snapshots(rebuild=args.rebuild)
+    n_changes = int((log["change"].fillna("") != "").sum()) if not log.empty else 0
+    print(f"[INFO] {n} snapshot(s) intégré(s) ; {log[KEY].nunique() if not log.empty else 0} fixtures, "
+          f"{len(log)} versions ({n_changes} changements)")
+    print(f"[PASS] {SCD_FILE.name} written")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+# scripts/gw_build.py
+"""
+Moteur unique de construction d'une GW : un seul payload event/{gw}/live/ -> deux sorties.
+
+- gw{N}.csv          : totaux par joueur (live["elements"][i]["stats"]), même format que build_one_gw_csv
+- gw{N}_permatch.csv : une ligne par joueur × match (live["elements"][i]["explain"]), même format
+                       que build_one_gw_permatch_csv, joint à la table fixtures partagée
+Contexte partagé (bootstrap + toutes les fixtures) chargé une fois : 3 requêtes par GW au lieu de 5-6,
+et un seul parse du JSON live.
+
+Usage :
+  python scripts/gw_build.py --gw 5            # écrit gw5.csv (+ snapshot) et gw5_permatch.csv
+  python scripts/gw_build.py --gw 5 --no-permatch
+"""
+
+from __future__ import annotations
+import argparse
+from pathlib import Path
+import requests
+import pandas as pd
+
+from utils_io import write_gw_and_snapshot
+
+ROOT = Path(__file__).resolve().parents[1]
+SEASON_DIR = ROOT / "data" / "season"
+
+UA = {"User-Agent": "Mozilla/5.0 (FPL-GWBuild/1.1)"}
+BOOTSTRAP = "https://fantasy.premierleague.com/api/bootstrap-static/"
+EVENT_LIVE = "https://fantasy.premierleague.com/api/event/{gw}/live/"
+FIXTURES = "https://fantasy.premierleague.com/api/fixtures/"
+
+POS_MAP = {1: "GK", 2: "DEF", 3: "MID", 4: "FWD"}
+TOTALS_ORDER = ["element", "web_name", "team_name", "position", "gw", "minutes", "total_points"]
+PERMATCH_ORDER = [
+    "gw", "fixture", "kickoff_time",
+    "player_id", "web_name", "first_name", "second_name", "position",
+    "team", "team_name", "team_short", "is_home", "opponent_team", "opponent_name", "opponent_short",
+    "team_h", "team_h_score", "team_a", "team_a_score",
+    "minutes", "goals_scored", "assists", "clean_sheets", "goals_conceded", "own_goals",
+    "saves", "penalties_saved", "penalties_missed", "yellow_cards", "red_cards",
+    "bonus", "bps", "influence", "creativity", "threat", "ict_index",
+    "expected_goals", "expected_assists", "expected_goal_involvements", "expected_goals_conceded",
+    "total_points"
+]
+FIXTURE_COLS = ["id", "event", "kickoff_time", "team_h", "team_a", "team_h_score", "team_a_score"]
+
+def fetch_json(url: str, session: requests.Session | None = None):
+    r = (session or requests).get(url, headers=UA, timeout=30)
+    r.raise_for_status()
+    return r.json()
+
+def fetch_event_live(gw: int, session: requests.Session | None = None) -> dict:
+    return fetch_json(EVENT_LIVE.format(gw=gw), session)
+
+# --- Contexte partagé ---
+def build_context(boot: dict, fixtures: list) -> dict:
+    """Tables partagées par toutes les GW : joueurs, équipes, fixtures (id -> fixture, event -> gw)."""
+    players = pd.DataFrame(boot.get("elements", []))
+    if not players.empty:
+        players = players[["id", "web_name", "first_name", "second_name", "team", "element_type"]].copy()
+        players["position"] = players["element_type"].map(POS_MAP)
+    teams = pd.DataFrame(boot.get("teams", []))
+    by_gw: dict[int, list] = {}
+    for f in fixtures or []:
+        if f.get("event") is not None:
+            by_gw.setdefault(int(f["event"]), []).append(f)
+    return {
+        "events": boot.get("events", []),
+        "players": players,
+        "id2name": teams.set_index("id")["name"].to_dict() if not teams.empty else {},
+        "id2short": teams.set_index("id")["short_name"].to_dict() if not teams.empty else {},
+        "fixtures_by_gw": by_gw,
+    }
+
+def gw_fixtures(ctx: dict, gw: int) -> pd.DataFrame:
+    """Fixtures d'une GW (fixture, gw, kickoff, équipes, scores) ; types inférés sur la seule GW."""
+    fx = pd.json_normalize(ctx["fixtures_by_gw"].get(gw, []))
+    if fx.empty:
+        return pd.DataFrame(columns=["fixture", "gw"])
+    return fx[[c for c in FIXTURE_COLS if c in fx.columns]].rename(columns={"id": "fixture", "event": "gw"})
+
+def load_context(session: requests.Session | None = None) -> dict:
+    return build_context(fetch_json(BOOTSTRAP, session), fetch_json(FIXTURES, session))
+
+# --- Totaux par joueur (stats) ---
+def totals_frame(gw: int, live: dict, ctx: dict) -> pd.DataFrame:
+    el = pd.DataFrame(live.get("elements", []))  # [{"id": <player_id>, "stats": {...}}]
+    if el.empty:
+        raise RuntimeError(f"Aucune donnée live pour GW{gw}")
+
+    # IMPORTANT: normaliser la Series de dicts via .tolist()
+    stats = pd.json_normalize(el["stats"].tolist())
+    stats.columns = [c.replace(".", "_") for c in stats.columns]
+    stats.insert(0, "element", el["id"].values)
+
+    df = stats
+    df["gw"] = gw
+
+    players = ctx["players"]
+    if not players.empty:
+        base = players[["id", "web_name", "team", "element_type"]].rename(columns={"id": "element"})
+        df = df.merge(base, on="element", how="left")
+        df["team_name"] = df["team"].map(ctx["id2name"])
+        df["position"] = df["element_type"].map(POS_MAP)
+
+    cols = [c for c in TOTALS_ORDER if c in df.columns] + [c for c in df.columns if c not in TOTALS_ORDER]
+    return df[cols]
+
+# --- Lignes par match (explain) ---
+def normalize_explain(explain):
+    """Aplati 'explain' (liste de dicts ou liste de listes) en une liste de dicts {'fixture', 'stats': [...]}."""
+    out = []
+    if not isinstance(explain, list):
+        return out
+    for chunk in explain:
+        if isinstance(chunk, dict) and "fixture" in chunk:
+            out.append(chunk)
+        elif isinstance(chunk, list):
+            for sub in chunk:
+                if isinstance(sub, dict) and "fixture" in sub:
+                    out.append(sub)
+    return out
+
+def flatten_explain(elements: list) -> tuple[dict, pd.DataFrame]:
+    """
+    Aplatit explain en colonnes : matchs {player_id, fixture} (une entrée par joueur × match) et
+    stats (match, identifier, value) — pas de dict intermédiaire par ligne.
+    """
+    m_pid, m_fix, s_match, s_ident, s_val = [], [], [], [], []
+    for el in elements:
+        pid = el["id"]
+        for m in normalize_explain(el.get("explain", [])):
+            k = len(m_pid)
+            m_pid.append(pid)
+            m_fix.append(m.get("fixture"))
+            stats = m.get("stats", []) or []
+            s_match.extend([k] * len(stats))
+            s_ident.extend(st.get("identifier") for st in stats)
+            s_val.extend(st.get("value") for st in stats)
+    matches = {"player_id": m_pid, "fixture": m_fix}
+    stats = pd.DataFrame({"match": s_match, "identifier": s_ident, "value": s_val})
+    return matches, stats
+
+def pivot_stats(stats: pd.DataFrame, n_matches: int) -> pd.DataFrame:
+    """Un seul pivot (match × identifier) ; dernière valeur si un identifiant est répété dans un match."""
+    stats = stats[stats["identifier"].notna()].drop_duplicates(["match", "identifier"], keep="last")
+    if stats.empty:
+        return pd.DataFrame(index=pd.RangeIndex(n_matches))
+    # pivot en object puis inférence par colonne : int64 si complète, float64 si trous (comme un DataFrame de dicts)
+    wide = stats.astype({"value": object}).pivot(index="match", columns="identifier", values="value")
+    wide.columns.name = None
+    return wide.reindex(pd.RangeIndex(n_matches)).infer_objects()
+
+def permatch_frame(gw: int, live: dict, ctx: dict) -> pd.DataFrame:
+    """Vide si la GW n'a pas encore de données par match (explain vide)."""
+    matches, stats = flatten_explain(live.get("elements", []))
+    n = len(matches["player_id"])
+    if n == 0:
+        return pd.DataFrame()
+    df = pd.DataFrame({"gw": gw, **matches}).join(pivot_stats(stats, n))
+
+    df = df.merge(ctx["players"].rename(columns={"id": "player_id"}), on="player_id", how="left")
+    df = df.merge(gw_fixtures(ctx, gw), on=["fixture", "gw"], how="left")
+
+    df["team_name"] = df["team"].map(ctx["id2name"])
+    df["team_short"] = df["team"].map(ctx["id2short"])
+    # domicile / adversaire : comparaisons vectorisées avec team_h / team_a
+    team_h = df["team_h"] if "team_h" in df.columns else pd.Series(float("nan"), index=df.index)
+    team_a = df["team_a"] if "team_a" in df.columns else pd.Series(float("nan"), index=df.index)
+    is_home = (df["team"] == team_h).to_numpy()
+    df["is_home"] = is_home
+    df["opponent_team"] = team_a.where(is_home, team_h)
+    df["opponent_name"] = df["opponent_team"].map(ctx["id2name"])
+    df["opponent_short"] = df["opponent_team"].map(ctx["id2short"])
+    return df[[c for c in PERMATCH_ORDER if c in df.columns]]
+
+def build_gw(gw: int, live: dict, ctx: dict) -> tuple[pd.DataFrame | None, pd.DataFrame]:
+    """Les deux sorties d'une GW depuis un seul payload live (totaux None si aucun joueur)."""
+    totals = totals_frame(gw, live, ctx) if live.get("elements") else None
+    return totals, permatch_frame(gw, live, ctx)
+
+# --- Écritures ---
+def write_totals(df: pd.DataFrame, gw: int):
+    write_gw_and_snapshot(ROOT, df, gw, stem="gw")
+
+def write_permatch(df: pd.DataFrame, gw: int, season_dir: Path = SEASON_DIR) -> Path:
+    out = season_dir / f"gw{gw}_permatch.csv"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    df.to_csv(out, index=False, encoding="utf-8")
+    print(f"OK gw{gw}_permatch.csv écrit -> {out}  ({len(df)} lignes)")
+    return out
+
+def main():
+    ap = argparse.ArgumentParser(description="Build gwN.csv and gwN_permatch.csv from one event/live payload.")
+    ap.add_argument("--gw", type=int, required=True)
+    ap.add_argument("--no-permatch", action="store_true", help="Totaux par joueur uniquement.")
+    args = ap.parse_args()
+
+    with requests.Session() as s:
+        ctx = load_context(s)
+        live = fetch_event_live(args.gw, s)
+    totals, permatch = build_gw(args.gw, live, ctx)
+    if totals is None:
+        raise SystemExit(f"[WARN] Aucune donnée live pour GW{args.gw}")
+    write_totals(totals, args.gw)
+    if not args.no_permatch:
+        if permatch.empty:
+            print(f"WARN GW{args.gw}: aucune donnée 'par match' (explain vide) - pas de fichier permatch.")
+        else:
+            write_permatch(permatch, args.gw)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+# scripts/gw_partitions.py
+"""
+Sorties fusionnées (merged_gw, merged_gw_permatch) maintenues en jeux partitionnés par GW.
+
+data/partitions/<dataset>/gw{N}.csv   : partition transformée (une par fichier source data/season)
+data/partitions/<dataset>/_manifest.json :
+  {"version", "dataset", "partitions": {gw: {"source", "sha1", "rows", "columns"}}}
+- update_partitions : hash du contenu de chaque source (+ fichiers dépendants de la GW + empreinte
+  du contexte partagé) ; seules les partitions dont le hash a changé (ou nouvelles) sont relues /
+  transformées / réécrites ; sources disparues -> partition supprimée
+- export_partitions : CSV fusionné produit en streaming des partitions dans l'ordre des GW
+  (en-tête = union des colonnes dans l'ordre d'apparition, comme pd.concat(sort=False)) ;
+  partition au schéma complet -> copie d'octets sans parse, sinon relue et réalignée
+Le coût d'une fusion devient proportionnel aux GW modifiées, plus une copie d'octets de la saison.
+data/partitions est un cache de build, hors git (.gitignore) : en CI il est conservé d'un run à
+l'autre par actions/cache (daily_full_update.yml) ; sans cache, tout est reconstruit au 1er appel.
+
+Datasets (transformations des anciens scripts de fusion) :
+  merged_gw          gw{N}.csv          + gw si absente, alias player_id <- element (build_merged_gw)
+  gw                 gw{N}.csv          + gw en tête si absente (build_gw_outputs)
+  gw_permatch        gw{N}_permatch.csv + gw en tête si absente (build_gw_outputs)
+  merged_gw_permatch gw{N}_permatch.csv + source_file (build_merged_gw_permatch)
+D'autres datasets s'enregistrent via register_dataset (ex. enrich_merged_gw).
+
+Usage :
+  python scripts/gw_partitions.py merged_gw --out data/merged_gw.csv [--rebuild]
+"""
+
+from __future__ import annotations
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+from pathlib import Path
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+DATA = ROOT / "data"
+SEASON = DATA / "season"
+PARTITIONS = DATA / "partitions"
+PARTITION_VERSION = "2"  # incrémenter quand une transformation change : partitions en cache reconstruites
+
+# --- Transformations par partition : (df, gw, nom du fichier source, contexte) -> df ---
+def _merged_gw(df: pd.DataFrame, gw: int, name: str, ctx=None) -> pd.DataFrame:
+    if "gw" not in df.columns:
+        df["gw"] = gw
+    # alias player_id si nécessaire
+    if "player_id" not in df.columns and "element" in df.columns:
+        df["player_id"] = df["element"]
+    return df
+
+def _gw_front(df: pd.DataFrame, gw: int, name: str, ctx=None) -> pd.DataFrame:
+    if "gw" not in df.columns:
+        df.insert(0, "gw", gw)
+    return df
+
+def _source_file(df: pd.DataFrame, gw: int, name: str, ctx=None) -> pd.DataFrame:
+    df["source_file"] = name
+    return df
+
+DATASETS: dict[str, dict] = {}
+
+def register_dataset(name: str, pattern: str, transform, deps=None, context=None) -> None:
+    """
+    deps(gw) -> [Path] : fichiers dont dépend la partition (leur contenu entre dans le hash)
+    context() -> (ctx, empreinte) : tables partagées passées à transform ; l'empreinte entre dans
+    le hash de chaque partition (changement -> toutes les partitions reconstruites)
+    """
+    DATASETS[name] = {"pattern": pattern, "transform": transform, "deps": deps, "context": context}
+
+register_dataset("merged_gw", r"^gw(\d+)\.csv$", _merged_gw)
+register_dataset("gw", r"^gw(\d+)\.csv$", _gw_front)
+register_dataset("gw_permatch", r"^gw(\d+)_permatch\.csv$", _gw_front)
+register_dataset("merged_gw_permatch", r"^gw(\d+)_permatch\.csv$", _source_file)
+
+# --- Manifest ---
+def dataset_dir(dataset: str) -> Path:
+    return PARTITIONS / dataset
+
+def manifest_path(dataset: str) -> Path:
+    return dataset_dir(dataset) / "_manifest.json"
+
+def load_manifest(dataset: str) -> dict:
+    p = manifest_path(dataset)
+    if p.exists():
+        with open(p, "r", encoding="utf-8") as f:
+            m = json.load(f)
+        if m.get("version") == PARTITION_VERSION:
+            return m
+    return {"version": PARTITION_VERSION, "dataset": dataset, "partitions": {}}
+
+def save_manifest(dataset: str, manifest: dict) -> None:
+    with open(manifest_path(dataset), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+
+def content_hash(path: Path, *extra: Path, salt: str = "") -> str:
+    """sha1 du contenu de path (+ fichiers extra existants, + empreinte de contexte)."""
+    h = hashlib.sha1(Path(path).read_bytes())
+    for p in extra:
+        if Path(p).exists():
+            h.update(Path(p).name.encode())
+            h.update(Path(p).read_bytes())
+    h.update(salt.encode())
+    return h.hexdigest()
+
+def season_sources(pattern: str, season_dir: Path = SEASON) -> dict[int, Path]:
+    """{gw: fichier source} pour les fichiers de data/season correspondant au motif."""
+    rx = re.compile(pattern, re.IGNORECASE)
+    out = {}
+    for p in season_dir.glob("gw*.csv"):
+        m = rx.match(p.name)
+        if m:
+            out[int(m.group(1))] = p
+    return out
+
+# --- Mise à jour incrémentale ---
+def update_partitions(dataset: str, season_dir: Path = SEASON, rebuild: bool = False, on_replace=None) -> dict:
+    """
+    Remplace uniquement les partitions dont la source a changé.
+    on_replace(gw, ancienne partition) est appelé avant qu'une partition existante ne soit remplacée
+    ou supprimée (mise à jour d'agrégats dérivés : retrait de l'ancienne contribution).
+    Renvoie {"manifest", "rebuilt": [gw], "removed": [gw], "kept": n}.
+    """
+    def drop_old(gw: int):
+        part = ddir / f"gw{gw}.csv"
+        if on_replace is not None and str(gw) in parts and part.exists():
+            on_replace(gw, pd.read_csv(part))
+
+    spec = DATASETS[dataset]
+    pattern, transform, deps = spec["pattern"], spec["transform"], spec["deps"]
+    ctx, salt = spec["context"]() if spec["context"] else (None, "")
+    ddir = dataset_dir(dataset)
+    ddir.mkdir(parents=True, exist_ok=True)
+    manifest = {"version": PARTITION_VERSION, "dataset": dataset, "partitions": {}} if rebuild else load_manifest(dataset)
+    parts = manifest["partitions"]
+    sources = season_sources(pattern, season_dir)
+
+    rebuilt, kept = [], 0
+    for gw, src in sorted(sources.items()):
+        digest = content_hash(src, *(deps(gw) if deps else []), salt=salt)
+        entry = parts.get(str(gw))
+        if entry and entry["sha1"] == digest and entry["source"] == src.name and (ddir / f"gw{gw}.csv").exists():
+            kept += 1
+            continue
+        try:
+            df = transform(pd.read_csv(src), gw, src.name, ctx)
+        except Exception as e:
+            print(f"[WARN] cannot read {src.name}: {e}")
+            drop_old(gw)
+            parts.pop(str(gw), None)
+            (ddir / f"gw{gw}.csv").unlink(missing_ok=True)
+            continue
+        drop_old(gw)
+        df.to_csv(ddir / f"gw{gw}.csv", index=False, encoding="utf-8")
+        parts[str(gw)] = {"source": src.name, "sha1": digest, "rows": int(len(df)), "columns": list(df.columns)}
+        rebuilt.append(gw)
+
+    removed = sorted(int(g) for g in parts if int(g) not in sources)
+    for gw in removed:
+        drop_old(gw)
+        parts.pop(str(gw))
+        (ddir / f"gw{gw}.csv").unlink(missing_ok=True)
+
+    save_manifest(dataset, manifest)
+    return {"manifest": manifest, "rebuilt": rebuilt, "removed": removed, "kept": kept}
+
+# --- Export en streaming ---
+def union_columns(manifest: dict) -> list[str]:
+    cols: list[str] = []
+    seen = set()
+    for gw in sorted(manifest["partitions"], key=int):
+        for c in manifest["partitions"][gw]["columns"]:
+            if c not in seen:
+                seen.add(c)
+                cols.append(c)
+    return cols
+
+def export_partitions(dataset: str, out_path: Path, manifest: dict | None = None) -> int:
+    """Écrit le CSV fusionné (partitions dans l'ordre des GW) ; renvoie le nombre de lignes."""
+    manifest = manifest or load_manifest(dataset)
+    ddir = dataset_dir(dataset)
+    cols = union_columns(manifest)
+    header = pd.DataFrame(columns=cols).to_csv(index=False)
+    tmp = Path(out_path).with_suffix(".csv.tmp")
+    rows = 0
+    with open(tmp, "w", encoding="utf-8", newline="") as out:
+        out.write(header)
+        for gw in sorted(manifest["partitions"], key=int):
+            entry = manifest["partitions"][gw]
+            part = ddir / f"gw{gw}.csv"
+            if entry["columns"] == cols:
+                # même schéma : copie des lignes de données telles quelles
+                with open(part, "r", encoding="utf-8", newline="") as f:
+                    f.readline()
+                    shutil.copyfileobj(f, out)
+            else:
+                pd.read_csv(part).reindex(columns=cols).to_csv(out, index=False, header=False)
+            rows += entry["rows"]
+    os.replace(tmp, out_path)
+    return rows
+
+def sync_dataset(dataset: str, out_path: Path, season_dir: Path = SEASON, rebuild: bool = False) -> dict | None:
+    """update_partitions + export ; None si aucune partition (rien n'est écrit)."""
+    res = update_partitions(dataset, season_dir, rebuild=rebuild)
+    if not res["manifest"]["partitions"]:
+        return None
+    res["rows"] = export_partitions(dataset, out_path, res["manifest"])
+    print(f"[INFO] {dataset}: {len(res['rebuilt'])} partition(s) reconstruite(s) {res['rebuilt']}, "
+          f"{res['kept']} inchangée(s), {len(res['removed'])} supprimée(s)")
+    return res
+
+def main():
+    ap = argparse.ArgumentParser(description="Maintain GW-partitioned merged datasets and export the merged CSV.")
+    ap.add_argument("dataset", choices=sorted(DATASETS))
+    ap.add_argument("--out", required=True, help="CSV fusionné à écrire.")
+    ap.add_argument("--rebuild", action="store_true", help="Reconstruit toutes les partitions.")
+    args = ap.parse_args()
+
+    res = sync_dataset(args.dataset, Path(args.out), rebuild=args.rebuild)
+    if res is None:
+        raise SystemExit(f"[WARN] Aucune source pour {args.dataset} dans {SEASON}")
+    print(f"[PASS] {Path(args.out).name} written ({res['rows']:,} rows)")
+
+if __name__ == "__main__":
+    main()
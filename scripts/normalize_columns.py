@@ -6,7 +6,18 @@
 # - Réécrire chaque fichier + snapshot daté dans data/snapshots/
 #
 # Usage :
-#   py -3.13 scripts/normalize_columns.py
+#   py -3.13 scripts/normalize_columns.py [--force] [--jobs 4]
+#
+# Parallélisme : les fichiers à normaliser sont indépendants ; --jobs N les répartit sur N processus
+# (les plus gros d'abord). Chaque worker lit / normalise / réécrit son fichier ; les snapshots datés
+# sont faits ensuite en un lot (copie des fichiers écrits, horodatage commun). Timings par fichier.
+#
+# Fast path (empreinte de schéma) :
+# - Pour chaque fichier, seuls l'entête et SAMPLE_ROWS lignes sont lus puis normalisés : si le résultat est
+#   identique (mêmes colonnes, même ordre, mêmes valeurs écrites — ex. 1.0 vs 1 pour les Int64) ET que
+#   l'empreinte (version du normaliseur, type de fichier, colonnes, dtypes) est celle enregistrée lors de
+#   la dernière écriture, le fichier est ignoré (ni relecture complète, ni réécriture, ni snapshot).
+# - Empreintes dans data/_normalize_state.json ; incrémenter NORMALIZER_VERSION à chaque changement de règles.
 #
 # Notes :
 # - On garde kickoff_time tel que l’API (UTC ISO).
@@ -21,61 +32,88 @@
 #     * Dans **players_raw.csv**, on conserve/ajoute **id** comme **duplicat de `element`**.
 
 from pathlib import Path
-import re, glob
+import re, os, glob, json, hashlib, argparse
+from time import perf_counter
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 import pandas as pd
-from utils_io import write_current_and_snapshot
+from utils_io import snapshot_copies
 
 ROOT = Path(__file__).resolve().parents[1]
 DATA = ROOT / "data"
-
-# ---- utilitaires généraux ----------------------------------------------------
+STATE_FILE = DATA / "_normalize_state.json"
+
+NORMALIZER_VERSION = "1"  # à incrémenter dès qu'une règle de normalisation change
+SAMPLE_ROWS = 20          # lignes relues pour vérifier qu'un fichier est déjà canonique
+
+# ---- plans de normalisation compilés ------------------------------------------
+# Les règles ci-dessous ne touchent pas aux données : elles s'appliquent à un schéma symbolique
+# S = {colonne: expression} (ordre = ordre des colonnes). Une expression est un tuple :
+#   ("col", c)            colonne source c
+#   ("na",)               colonne vide (pd.NA)
+#   ("coalesce", (e,...)) première valeur non nulle, par priorité
+#   ("num", e) / ("int", e)   to_numeric / to_numeric + Int64
+#   ("div", e, k)         e / k
+#   ("fullname", fn, sn, web) nom complet (repli sur web_name)
+# Le plan compilé (colonnes de sortie + expressions) est mis en cache par empreinte du schéma
+# d'entrée, puis exécuté en une passe : une allocation par colonne de sortie, sans copies
+# intermédiaires du DataFrame ni fillna variante par variante.
 
 SUFFIXES = ("_x", "_y", "__pm", "_map", "_from_fix")
+NA = ("na",)
 
 def load_csv(path: Path) -> pd.DataFrame:
     return pd.read_csv(path, encoding="utf-8")
 
-def find_variants(df: pd.DataFrame, base_or_alias: str) -> list[str]:
+def _coalesce_expr(exprs: list) -> tuple:
+    """Simplifie : colonnes vides et doublons retirés, une seule source -> la source elle-même."""
+    out = []
+    for e in exprs:
+        if e != NA and e not in out:
+            out.append(e)
+    if not out:
+        return NA
+    return out[0] if len(out) == 1 else ("coalesce", tuple(out))
+
+def _int_expr(e: tuple) -> tuple:
+    return e if e[0] == "int" else ("int", e)
+
+def find_variants(S: dict, base_or_alias: str) -> list[str]:
     cands = [base_or_alias] + [base_or_alias + s for s in SUFFIXES]
-    return [c for c in cands if c in df.columns]
+    return [c for c in cands if c in S]
 
-def coalesce(df: pd.DataFrame, canonical: str, aliases: list[str], drop_others=True):
-    if canonical not in df.columns:
-        df[canonical] = pd.NA
-    used_cols = []
+def coalesce(S: dict, canonical: str, aliases: list[str], drop_others=True):
+    if canonical not in S:
+        S[canonical] = NA
+    srcs, used_cols = [S[canonical]], []
     for a in [canonical] + list(aliases):
-        for v in find_variants(df, a):
+        for v in find_variants(S, a):
             if v == canonical:
                 continue
-            df[canonical] = df[canonical].fillna(df[v])
+            srcs.append(S[v])
             used_cols.append(v)
+    S[canonical] = _coalesce_expr(srcs)
     if drop_others:
         for c in used_cols:
-            if c in df.columns:
-                df.drop(columns=[c], inplace=True, errors="ignore")
-    return df
+            S.pop(c, None)
+    return S
 
-def unify_element_key(df: pd.DataFrame, drop_alias=True):
+def unify_element_key(S: dict, drop_alias=True):
     """element = id = player_id ; garde 'element' et supprime 'id'/'player_id' selon drop_alias."""
-    df = coalesce(df, "element", ["id", "player_id"])
-    if "element" in df.columns:
-        df["element"] = pd.to_numeric(df["element"], errors="coerce").astype("Int64")
+    S = coalesce(S, "element", ["id", "player_id"])
+    if "element" in S:
+        S["element"] = _int_expr(S["element"])
     if drop_alias:
         for c in ("id", "player_id"):
-            if c in df.columns:
-                df.drop(columns=[c], inplace=True, errors="ignore")
-    return df
-
-def build_full_name(df: pd.DataFrame):
-    fn = df.get("first_name")
-    sn = df.get("second_name")
-    if fn is not None and sn is not None:
-        name = (fn.fillna("").astype(str).str.strip() + " " + sn.fillna("").astype(str).str.strip()).str.strip()
-        df["name"] = name.where(name != "", df.get("web_name"))
-    else:
-        if "name" not in df.columns:
-            df["name"] = df.get("web_name")
-    return df
+            S.pop(c, None)
+    return S
+
+def build_full_name(S: dict):
+    if "first_name" in S and "second_name" in S:
+        S["name"] = ("fullname", S["first_name"], S["second_name"], S.get("web_name", NA))
+    elif "name" not in S:
+        S["name"] = S.get("web_name", NA)
+    return S
 
 ABBR_TO_LONG = {
     "xg":  "expected_goals",
@@ -84,56 +122,42 @@ ABBR_TO_LONG = {
     "xgc": "expected_goals_conceded",
 }
 
-def harmonize_xg(df: pd.DataFrame, keep_abbrev: bool):
+def harmonize_xg(S: dict, keep_abbrev: bool):
     for abbr, longn in ABBR_TO_LONG.items():
-        if (longn not in df.columns) and (abbr in df.columns):
-            df[longn] = pd.to_numeric(df[abbr], errors="coerce")
+        if (longn not in S) and (abbr in S):
+            S[longn] = ("num", S[abbr])
     if not keep_abbrev:
         for abbr in ABBR_TO_LONG.keys():
-            if abbr in df.columns:
-                df.drop(columns=[abbr], inplace=True, errors="ignore")
-    return df
+            S.pop(abbr, None)
+    return S
 
-def normalize_match_context(df: pd.DataFrame):
+def normalize_match_context(S: dict):
     # ---- GW & EVENT : conserver les deux ----
-    gw_series = None
-    if "gw" in df.columns:
-        gw_series = pd.to_numeric(df["gw"], errors="coerce")
-    elif "event" in df.columns:
-        gw_series = pd.to_numeric(df["event"], errors="coerce")
-    elif "round" in df.columns:
-        gw_series = pd.to_numeric(df["round"], errors="coerce")
-
-    if gw_series is not None:
-        df["gw"] = gw_series.astype("Int64")
-        if "event" not in df.columns:
-            df["event"] = df["gw"]
-        else:
-            df["event"] = pd.to_numeric(df["event"], errors="coerce").astype("Int64")
+    gw = next((S[c] for c in ("gw", "event", "round") if c in S), None)
+    if gw is not None:
+        S["gw"] = _int_expr(gw)
+        S["event"] = S["gw"] if "event" not in S else _int_expr(S["event"])
 
     # ---- FIXTURE ----
-    df = coalesce(df, "fixture", ["fixture_id", "id_fixture"])
-    if "fixture" in df.columns:
-        df["fixture"] = pd.to_numeric(df["fixture"], errors="coerce").astype("Int64")
+    S = coalesce(S, "fixture", ["fixture_id", "id_fixture"])
+    S["fixture"] = _int_expr(S["fixture"])
 
     # ---- OPPONENT ----
-    df = coalesce(df, "opponent_team", ["opp_team", "opponent_id"])
-    if "opponent_team" in df.columns:
-        df["opponent_team"] = pd.to_numeric(df["opponent_team"], errors="coerce").astype("Int64")
+    S = coalesce(S, "opponent_team", ["opp_team", "opponent_id"])
+    S["opponent_team"] = _int_expr(S["opponent_team"])
 
     # ---- KICKOFF ----
-    df = coalesce(df, "kickoff_time", ["date", "kickoff_datetime"])
-    return df
-
-def normalize_team(df: pd.DataFrame):
-    df = coalesce(df, "team", ["team_id"])
-    if "team" in df.columns:
-        df["team"] = pd.to_numeric(df["team"], errors="coerce").astype("Int64")
-    df = coalesce(df, "team_name", [])
-    df = coalesce(df, "team_short", [])
-    return df
-
-def reorder_columns(df: pd.DataFrame) -> pd.DataFrame:
+    S = coalesce(S, "kickoff_time", ["date", "kickoff_datetime"])
+    return S
+
+def normalize_team(S: dict):
+    S = coalesce(S, "team", ["team_id"])
+    S["team"] = _int_expr(S["team"])
+    S = coalesce(S, "team_name", [])
+    S = coalesce(S, "team_short", [])
+    return S
+
+def reorder_columns(S: dict) -> dict:
     groups = [
         ["element","player_id"],  # 'id' sera ajouté explicitement pour players_raw ci-dessous
         ["web_name","name","first_name","second_name","position"],
@@ -149,148 +173,287 @@ def reorder_columns(df: pd.DataFrame) -> pd.DataFrame:
     ordered, seen = [], set()
     for g in groups:
         for c in g:
-            if c in df.columns and c not in seen:
+            if c in S and c not in seen:
                 ordered.append(c); seen.add(c)
-    rest = [c for c in df.columns if c not in seen and not any(c.endswith(s) for s in SUFFIXES)]
+    rest = [c for c in S if c not in seen and not any(c.endswith(s) for s in SUFFIXES)]
     rest.sort()
-    return df[ordered + rest] if ordered or rest else df
+    return {c: S[c] for c in ordered + rest} if ordered or rest else S
+
+def move_front(S: dict, front: list[str], after: str | None = None) -> dict:
+    """Place `front` en tête (ou juste après `after`), sans changer l'ordre du reste."""
+    front = [c for c in front if c in S]
+    rest = [c for c in S if c not in front]
+    idx = rest.index(after) + 1 if after in rest else 0
+    return {c: S[c] for c in rest[:idx] + front + rest[idx:]}
 
 # ---- normalisations par type de fichier --------------------------------------
 
-def normalize_players_raw(df: pd.DataFrame) -> pd.DataFrame:
-    # Conserver id pour compat outils externes : on NE SUPPRIME PAS id/player_id ici
-    df = unify_element_key(df, drop_alias=False)
-    # S'assurer que 'id' existe et reflète 'element'
-    if "element" in df.columns:
-        if "id" not in df.columns:
-            df["id"] = df["element"]
-        else:
-            df["id"] = pd.to_numeric(df["id"], errors="coerce").astype("Int64")
-            df.loc[df["id"].isna(), "id"] = df["element"]
+def normalize_players_raw(S: dict) -> dict:
+    # Conserver id pour compat outils externes : id reflète element
+    S = unify_element_key(S, drop_alias=False)
+    if "element" in S:
+        S["id"] = S["element"] if "id" not in S else _coalesce_expr([_int_expr(S["id"]), S["element"]])
     # Nom joueur
-    df = coalesce(df, "web_name", ["web_name_x", "web_name_y"])
-    df = build_full_name(df)
+    S = coalesce(S, "web_name", ["web_name_x", "web_name_y"])
+    S = build_full_name(S)
     # Équipe
-    df = normalize_team(df)
+    S = normalize_team(S)
     # Marché : price_m si absent
-    if "now_cost" in df.columns and "price_m" not in df.columns:
-        df["price_m"] = pd.to_numeric(df["now_cost"], errors="coerce") / 10.0
+    if "now_cost" in S and "price_m" not in S:
+        S["price_m"] = ("div", ("num", S["now_cost"]), 10.0)
     # xG (versions longues uniquement dans players_raw)
-    df = harmonize_xg(df, keep_abbrev=False)
+    S = harmonize_xg(S, keep_abbrev=False)
     # Nettoyage suffixes éventuels
     for c in ("web_name_x","web_name_y"):
-        if c in df.columns: df.drop(columns=[c], inplace=True, errors="ignore")
+        S.pop(c, None)
     # Ordre : on place 'id' juste après 'element' si présent
-    df = reorder_columns(df)
-    cols = df.columns.tolist()
-    if "element" in cols and "id" in cols:
-        # injecter 'id' derrière 'element'
-        cols = [c for c in cols if c != "id"]
-        idx = cols.index("element") + 1
-        cols = cols[:idx] + ["id"] + cols[idx:]
-        df = df[cols]
-    return df
-
-def normalize_cleaned_players(df: pd.DataFrame) -> pd.DataFrame:
-    df = unify_element_key(df, drop_alias=True)
-    df = coalesce(df, "web_name", ["web_name_x","web_name_y"])
-    df = build_full_name(df)
-    df = normalize_team(df)
-    df = harmonize_xg(df, keep_abbrev=True)
-    return reorder_columns(df)
-
-def normalize_gw_like(df: pd.DataFrame) -> pd.DataFrame:
-    df = unify_element_key(df, drop_alias=True)
-    df = coalesce(df, "web_name", ["web_name_x","web_name_y"])
-    df = build_full_name(df)
-    df = normalize_team(df)
-    df = normalize_match_context(df)  # conserve gw ET event
-    df = harmonize_xg(df, keep_abbrev=False)
-    return reorder_columns(df)
-
-def normalize_permatch(df: pd.DataFrame) -> pd.DataFrame:
+    S = reorder_columns(S)
+    if "element" in S and "id" in S:
+        S = move_front(S, ["id"], after="element")
+    return S
+
+def normalize_cleaned_players(S: dict) -> dict:
+    S = unify_element_key(S, drop_alias=True)
+    S = coalesce(S, "web_name", ["web_name_x","web_name_y"])
+    S = build_full_name(S)
+    S = normalize_team(S)
+    S = harmonize_xg(S, keep_abbrev=True)
+    return reorder_columns(S)
+
+def normalize_gw_like(S: dict) -> dict:
+    S = unify_element_key(S, drop_alias=True)
+    S = coalesce(S, "web_name", ["web_name_x","web_name_y"])
+    S = build_full_name(S)
+    S = normalize_team(S)
+    S = normalize_match_context(S)  # conserve gw ET event
+    S = harmonize_xg(S, keep_abbrev=False)
+    return reorder_columns(S)
+
+def normalize_permatch(S: dict) -> dict:
     # NE PAS supprimer player_id. On garde aussi element.
-    df = unify_element_key(df, drop_alias=False)
-    if "player_id" not in df.columns and "element" in df.columns:
-        df["player_id"] = df["element"]
-    df = normalize_match_context(df)
-    return reorder_columns(df)
+    S = unify_element_key(S, drop_alias=False)
+    if "player_id" not in S and "element" in S:
+        S["player_id"] = S["element"]
+    S = normalize_match_context(S)
+    return reorder_columns(S)
 
-def normalize_fixtures(df: pd.DataFrame) -> pd.DataFrame:
+def normalize_fixtures(S: dict) -> dict:
     # Conserver 'id' et ajouter 'fixture' = 'id' si absent (ne PAS renommer)
-    df = coalesce(df, "kickoff_time", ["kickoff_datetime","date"])
-    if "id" in df.columns:
-        df["id"] = pd.to_numeric(df["id"], errors="coerce").astype("Int64")
-        if "fixture" not in df.columns:
-            df["fixture"] = df["id"]
-    if "fixture" in df.columns:
-        df["fixture"] = pd.to_numeric(df["fixture"], errors="coerce").astype("Int64")
-    if "event" in df.columns:
-        df["event"] = pd.to_numeric(df["event"], errors="coerce").astype("Int64")
-    if "team_h" in df.columns:
-        df["team_h"] = pd.to_numeric(df["team_h"], errors="coerce").astype("Int64")
-    if "team_a" in df.columns:
-        df["team_a"] = pd.to_numeric(df["team_a"], errors="coerce").astype("Int64")
+    S = coalesce(S, "kickoff_time", ["kickoff_datetime","date"])
+    if "id" in S:
+        S["id"] = _int_expr(S["id"])
+        if "fixture" not in S:
+            S["fixture"] = S["id"]
+    for c in ("fixture", "event", "team_h", "team_a"):
+        if c in S:
+            S[c] = _int_expr(S[c])
 
     # Réordonner en mettant id/fixture en tête
-    df = reorder_columns(df)
-    cols = df.columns.tolist()
-    front = []
-    if "id" in cols: front.append("id")
-    if "fixture" in cols and "fixture" not in front: front.append("fixture")
-    if front:
-        rest = [c for c in cols if c not in front]
-        df = df[front + rest]
-    return df
-
-def normalize_teams(df: pd.DataFrame) -> pd.DataFrame:
-    df = coalesce(df, "name", [])
-    df = coalesce(df, "short_name", [])
-    return df
-
-def normalize_player_idlist(df: pd.DataFrame) -> pd.DataFrame:
-    if "element" not in df.columns and "id" in df.columns:
-        df["element"] = df["id"]
-    df = coalesce(df, "web_name", ["web_name_x","web_name_y"])
-    df = build_full_name(df)
-    df = normalize_team(df)
-    return reorder_columns(df)
+    S = reorder_columns(S)
+    return move_front(S, ["id", "fixture"])
+
+def normalize_teams(S: dict) -> dict:
+    S = coalesce(S, "name", [])
+    S = coalesce(S, "short_name", [])
+    return S
+
+def normalize_player_idlist(S: dict) -> dict:
+    if "element" not in S and "id" in S:
+        S["element"] = S["id"]
+    S = coalesce(S, "web_name", ["web_name_x","web_name_y"])
+    S = build_full_name(S)
+    S = normalize_team(S)
+    return reorder_columns(S)
+
+# ---- compilation / exécution des plans ------------------------------------------
+
+RULES = {
+    "players_raw": normalize_players_raw,
+    "cleaned_players": normalize_cleaned_players,
+    "gw": normalize_gw_like,
+    "merged_gw": normalize_gw_like,
+    "permatch": normalize_permatch,
+    "merged_permatch": normalize_permatch,
+    "fixtures": normalize_fixtures,
+    "teams": normalize_teams,
+    "player_idlist": normalize_player_idlist,
+    "generic": normalize_gw_like,
+}
+
+_PLANS: dict[str, dict] = {}
+
+def compile_plan(kind: str, columns: list[str]) -> dict:
+    """Plan {columns, exprs} pour un schéma d'entrée, mis en cache par empreinte (kind, colonnes)."""
+    key = hashlib.sha1(json.dumps([NORMALIZER_VERSION, kind, list(columns)]).encode("utf-8")).hexdigest()
+    plan = _PLANS.get(key)
+    if plan is None:
+        S = RULES[kind]({c: ("col", c) for c in columns})
+        plan = _PLANS[key] = {"key": key, "columns": list(S), "exprs": list(S.values())}
+    return plan
+
+def _coalesce_values(series: list[pd.Series]) -> pd.Series:
+    """Première valeur non nulle : np.where si dtypes NumPy identiques, sinon fillna (mêmes règles que pandas)."""
+    out = series[0]
+    for s in series[1:]:
+        miss = out.isna().to_numpy()
+        if not miss.any():
+            break
+        if out.dtype == s.dtype and isinstance(out.dtype, np.dtype):
+            out = pd.Series(np.where(miss, s.to_numpy(), out.to_numpy()), index=out.index)
+        else:
+            out = out.fillna(s)
+    return out
+
+def _full_name(fn: pd.Series, sn: pd.Series, web: pd.Series) -> pd.Series:
+    name = (fn.fillna("").astype(str).str.strip() + " " + sn.fillna("").astype(str).str.strip()).str.strip()
+    return name.where(name != "", web)
+
+def _eval(e: tuple, df: pd.DataFrame, memo: dict) -> pd.Series:
+    if e in memo:
+        return memo[e]
+    op = e[0]
+    if op == "col":
+        r = df[e[1]]
+    elif op == "na":
+        r = pd.Series(pd.NA, index=df.index, dtype="object")
+    elif op == "num":
+        r = pd.to_numeric(_eval(e[1], df, memo), errors="coerce")
+    elif op == "int":
+        r = pd.to_numeric(_eval(e[1], df, memo), errors="coerce").astype("Int64")
+    elif op == "div":
+        r = _eval(e[1], df, memo) / e[2]
+    elif op == "coalesce":
+        r = _coalesce_values([_eval(x, df, memo) for x in e[1]])
+    elif op == "fullname":
+        r = _full_name(*(_eval(x, df, memo) for x in e[1:]))
+    else:
+        raise ValueError(f"expression inconnue : {op}")
+    memo[e] = r
+    return r
+
+def execute_plan(plan: dict, df: pd.DataFrame) -> pd.DataFrame:
+    memo: dict = {}
+    return pd.DataFrame({c: _eval(e, df, memo) for c, e in zip(plan["columns"], plan["exprs"])}, index=df.index)
+
+def normalize(df: pd.DataFrame, kind: str) -> pd.DataFrame:
+    return execute_plan(compile_plan(kind, df.columns.tolist()), df)
 
 # ---- boucle principale --------------------------------------------------------
 
-def process_file(path: Path):
-    name = path.name.lower()
+def file_kind(name: str) -> str:
+    """Type de fichier (clé de RULES) d'après le nom."""
+    name = name.lower()
+    if name == "players_raw.csv":
+        return "players_raw"
+    if name == "cleaned_players.csv":
+        return "cleaned_players"
+    if re.fullmatch(r"gw\d+\.csv", name):
+        return "gw"
+    if name == "merged_gw.csv":
+        return "merged_gw"
+    if re.fullmatch(r"gw\d+_permatch\.csv", name):
+        return "permatch"
+    if name == "merged_gw_permatch.csv":
+        return "merged_permatch"
+    if name == "fixtures.csv":
+        return "fixtures"
+    if name == "teams.csv":
+        return "teams"
+    if name == "player_idlist.csv":
+        return "player_idlist"
+    return "generic"
+
+# ---- empreintes de schéma -------------------------------------------------------
+
+def schema_fingerprint(kind: str, columns: list[str], dtypes: list[str]) -> str:
+    payload = json.dumps([NORMALIZER_VERSION, kind, list(columns), list(dtypes)])
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+def header_schema(path: Path) -> tuple[str, list[str], str | None]:
+    """
+    Normalise l'entête + SAMPLE_ROWS lignes : (kind, colonnes, empreinte).
+    Empreinte None si la normalisation modifierait le fichier (colonnes ou valeurs de l'échantillon).
+    """
+    kind = file_kind(path.name)
+    head = pd.read_csv(path, nrows=SAMPLE_ROWS, encoding="utf-8")
+    cols = head.columns.tolist()
+    out = normalize(head, kind)
+    if out.columns.tolist() != cols:
+        return kind, cols, None
+    text = out.to_csv(index=False)
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        if f.read(len(text)) != text:
+            return kind, cols, None
+    return kind, cols, schema_fingerprint(kind, cols, [str(t) for t in out.dtypes])
+
+def load_state() -> dict:
+    if not STATE_FILE.exists():
+        return {}
+    try:
+        with open(STATE_FILE, "r", encoding="utf-8") as f:
+            state = json.load(f)
+    except Exception:
+        return {}
+    return state if state.get("version") == NORMALIZER_VERSION else {}
+
+def save_state(files: dict):
+    with open(STATE_FILE, "w", encoding="utf-8") as f:
+        json.dump({"version": NORMALIZER_VERSION, "files": files}, f, ensure_ascii=False, indent=1, sort_keys=True)
+
+def is_canonical(path: Path, files: dict) -> bool:
+    """Vrai si l'entête est canonique et correspond à l'empreinte enregistrée à la dernière écriture."""
+    try:
+        _, _, fp = header_schema(path)
+    except Exception:
+        return False
+    rec = files.get(path.relative_to(ROOT).as_posix())
+    return fp is not None and rec is not None and rec.get("fingerprint") == fp
+
+def process_file(path: Path) -> dict:
+    """
+    Lit, normalise et réécrit un fichier (exécutable dans un worker ; le snapshot est fait par l'appelant).
+    Renvoie {path, kind, written, fingerprint, error, timings}.
+    """
+    kind = file_kind(path.name)
+    rec = {"path": path, "kind": kind, "written": False, "fingerprint": None, "error": None, "timings": {}}
+    t0 = perf_counter()
     try:
         df = load_csv(path)
     except Exception as e:
-        print(f"[SKIP] {path} -> lecture impossible : {e}")
-        return
-
-    if name == "players_raw.csv":
-        kind = "players_raw";     df2 = normalize_players_raw(df)
-    elif name == "cleaned_players.csv":
-        kind = "cleaned_players"; df2 = normalize_cleaned_players(df)
-    elif re.fullmatch(r"gw\d+\.csv", name):
-        kind = "gw";              df2 = normalize_gw_like(df)
-    elif name == "merged_gw.csv":
-        kind = "merged_gw";       df2 = normalize_gw_like(df)
-    elif re.fullmatch(r"gw\d+_permatch\.csv", name):
-        kind = "permatch";        df2 = normalize_permatch(df)
-    elif name == "merged_gw_permatch.csv":
-        kind = "merged_permatch"; df2 = normalize_permatch(df)
-    elif name == "fixtures.csv":
-        kind = "fixtures";        df2 = normalize_fixtures(df)
-    elif name == "teams.csv":
-        kind = "teams";           df2 = normalize_teams(df)
-    elif name == "player_idlist.csv":
-        kind = "player_idlist";   df2 = normalize_player_idlist(df)
-    else:
-        kind = "generic";         df2 = normalize_gw_like(df)
-
-    write_current_and_snapshot(df2, current_path=path, name_for_snapshot=path.stem)
-    print(f"[OK] normalized {kind:>16} -> {path}")
+        rec["error"] = f"lecture impossible : {e}"
+        return rec
+    t1 = perf_counter()
+    df2 = normalize(df, kind)
+    t2 = perf_counter()
+    df2.to_csv(path, index=False, encoding="utf-8")
+    t3 = perf_counter()
+    rec["written"] = True
+    rec["timings"] = {"read": t1 - t0, "normalize": t2 - t1, "write": t3 - t2}
+    try:
+        rec["fingerprint"] = header_schema(path)[2]
+    except Exception:
+        pass
+    return rec
+
+def process_all(paths: list[Path], jobs: int = 1) -> list[dict]:
+    """process_file sur tous les fichiers (pool de processus si jobs > 1) ; résultats dans l'ordre de `paths`."""
+    if jobs <= 1 or len(paths) <= 1:
+        return [process_file(p) for p in paths]
+    # plus gros fichiers d'abord : meilleur équilibrage entre workers
+    order = sorted(range(len(paths)), key=lambda i: -paths[i].stat().st_size)
+    with ProcessPoolExecutor(max_workers=min(jobs, len(paths))) as ex:
+        done = list(ex.map(process_file, [paths[i] for i in order]))
+    out = [None] * len(paths)
+    for i, rec in zip(order, done):
+        out[i] = rec
+    return out
 
 def main():
+    ap = argparse.ArgumentParser(description="Normalize FPL CSV columns (skips files already canonical).")
+    ap.add_argument("--force", action="store_true", help="Ignore les empreintes et renormalise tout.")
+    ap.add_argument("--jobs", type=int, default=min(8, os.cpu_count() or 1), help="Processus en parallèle.")
+    args = ap.parse_args()
+
     candidates = [
         DATA / "players_raw.csv",
         DATA / "cleaned_players.csv",
@@ -307,9 +470,29 @@ def main():
         print("[INFO] aucun CSV trouvé à normaliser.")
         return
 
-    print(f"[INFO] normalisation de {len(candidates)} fichier(s).")
-    for p in sorted(candidates):
-        process_file(p)
+    state = {} if args.force else load_state()
+    files = dict(state.get("files", {}))
+    todo = [p for p in sorted(candidates) if not is_canonical(p, files)]
+    print(f"[INFO] normalisation de {len(todo)} fichier(s) ({len(candidates) - len(todo)} déjà canonique(s)), jobs={args.jobs}.")
+    t0 = perf_counter()
+    results = process_all(todo, args.jobs)
+    for rec in results:
+        p, rel = rec["path"], rec["path"].relative_to(ROOT).as_posix()
+        if rec["error"]:
+            print(f"[SKIP] {p} -> {rec['error']}")
+        else:
+            t = rec["timings"]
+            print(f"[OK] normalized {rec['kind']:>16} -> {p} "
+                  f"(lecture {t['read']:.2f}s, normalisation {t['normalize']:.2f}s, écriture {t['write']:.2f}s)")
+        if rec["fingerprint"] is None:
+            files.pop(rel, None)
+        else:
+            files[rel] = {"fingerprint": rec["fingerprint"]}
+
+    # Snapshots datés en un lot (copie des fichiers écrits)
+    snaps = snapshot_copies([rec["path"] for rec in results if rec["written"]])
+    save_state(files)
+    print(f"[INFO] {len(snaps)} snapshot(s) ; durée totale {perf_counter() - t0:.2f}s")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,219 @@
+# scripts/price_change_events.py
+"""
+Table des changements de prix observés, extraite de toute la série de snapshots players_raw.
+
+Une ligne par changement de now_cost d'un joueur et par nuit de mise à jour des prix :
+  id, web_name, price_date, window_start, window_end, old_cost, new_cost, delta, direction,
+  ownership, NTI, NTI_24h   (état au dernier snapshot AVANT le changement)
+
+- Diffs vectorisés sur le panel (id, timestamp) trié : shift par joueur, pas de boucle
+- price_date = date de la mise à jour de prix (~02:30 Zurich) la plus récente avant window_end ;
+  horodatages de snapshots en UTC naïf, convertis en heure Zurich (zoneinfo) pour le jour de prix
+- Un seul changement réel possible par joueur et par nuit : les changements d'un même
+  (id, price_date) sont regroupés (premier ancien prix -> dernier nouveau prix) et les allers-retours
+  nuls supprimés (snapshots de sources différentes / données en cache)
+- Incrémental : seuls les snapshots depuis la dernière mise à jour de prix déjà traitée sont
+  réexaminés ; l'historique relu (lookback_start) couvre la fenêtre NTI_24h de la ligne "précédente"
+  et le snapshot qui fonde son premier NTI_1h : résultat identique à --rebuild
+- Index JSON (par joueur : plage de lignes ; par date : lignes) + état du dernier snapshot traité
+
+API de requête (backtests, summaries, site) :
+  load_events(), player_history(id), changes_on(date), changes_between(start, end)
+
+Usage :
+  python scripts/price_change_events.py [--rebuild] [--jobs 8]
+"""
+
+from __future__ import annotations
+import argparse
+import json
+import os
+from bisect import bisect_right
+from datetime import datetime, timedelta
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+from utils_io import ensure_dirs, list_all_snapshots, load_snapshot_panel, LOCAL_TZ, local_to_utc, utc_to_local
+from rebuild_nti_log import NTI_ALIASES, nti_log_from_panel
+
+ROOT = Path(__file__).resolve().parents[1]
+DATA_DIR = ROOT / "data"
+SNAP_DIR = DATA_DIR / "snapshots"
+DELTAS_DIR = DATA_DIR / "deltas"
+EVENTS_FILE = DELTAS_DIR / "price_change_events.csv"
+INDEX_FILE = DELTAS_DIR / "price_change_events_index.json"
+
+PLAYERS_STEM = "players_raw"
+PANEL_COLS = ["web_name", "now_cost", "selected_by_percent", "transfers_in_event", "transfers_out_event"]
+EVENT_COLS = ["id", "web_name", "price_date", "window_start", "window_end", "old_cost", "new_cost",
+              "delta", "direction", "ownership", "NTI", "NTI_24h"]
+PRICE_UPDATE = timedelta(hours=2, minutes=30)  # heure Zurich des mises à jour de prix
+PRICE_TZ = "Europe/Zurich"  # enregistré dans l'index : un index d'avant la conversion est reconstruit
+NTI_WINDOW_H = 24  # fenêtre de NTI_24h (rebuild_nti_log.nti_24h)
+
+def price_day_start(ts: datetime) -> datetime:
+    """Début (UTC naïf) du "jour de prix" contenant ts (UTC naïf) : dernière mise à jour 02:30 Zurich <= ts."""
+    d = (pd.Timestamp(utc_to_local(ts)) - PRICE_UPDATE).normalize() + PRICE_UPDATE
+    return local_to_utc(d.to_pydatetime())
+
+def price_date(ts: pd.Series) -> pd.Series:
+    """Date ISO du jour de prix de chaque horodatage (UTC naïf) : date Zurich de (t - 02:30)."""
+    local = ts.dt.tz_localize("UTC").dt.tz_convert(LOCAL_TZ).dt.tz_localize(None)
+    return (local - PRICE_UPDATE).dt.date.astype(str)
+
+def lookback_start(snaps: list[tuple[datetime, Path]], after: datetime) -> datetime:
+    """
+    1er snapshot à relire pour une mise à jour incrémentale après `after` : le dernier snapshot
+    <= after (ligne "précédente" du 1er changement), moins NTI_WINDOW_H, puis un snapshot de plus
+    (base de son NTI_1h ; le 1er snapshot d'un panel a NTI_1h = 0 dans nti_log_from_panel).
+    """
+    times = [t for t, _ in snaps]
+    k = max(bisect_right(times, after) - 1, 0)
+    j = max(bisect_right(times, times[k] - timedelta(hours=NTI_WINDOW_H)) - 1, 0)
+    return times[j]
+
+def extract_events(panel: pd.DataFrame, after: datetime | None = None) -> pd.DataFrame:
+    """Changements de now_cost dans un panel trié (id, timestamp) ; `after` : window_end > after uniquement."""
+    if panel.empty:
+        return pd.DataFrame(columns=EVENT_COLS)
+    nti = nti_log_from_panel(panel)
+    nti["timestamp"] = nti["timestamp"].dt.tz_localize(None)
+    df = panel.merge(nti[["timestamp", "id", "NTI", "NTI_24h"]], on=["timestamp", "id"], how="left")
+
+    df["now_cost"] = pd.to_numeric(df["now_cost"], errors="coerce")
+    df = df[df["now_cost"].notna()].sort_values(["id", "timestamp"], kind="mergesort").reset_index(drop=True)
+    same = df["id"].eq(df["id"].shift(1)).to_numpy()
+    prev = df.shift(1)
+    changed = same & (df["now_cost"].to_numpy() != prev["now_cost"].to_numpy())
+    if after is not None:
+        changed &= (df["timestamp"] > pd.Timestamp(after)).to_numpy()
+
+    cur, prv = df[changed], prev[changed]
+    delta = (cur["now_cost"] - prv["now_cost"]).astype(int)
+    ev = pd.DataFrame({
+        "id": cur["id"].astype(int),
+        "web_name": cur["web_name"],
+        "price_date": price_date(cur["timestamp"]),
+        "window_start": prv["timestamp"],
+        "window_end": cur["timestamp"],
+        "old_cost": prv["now_cost"].astype(int),
+        "new_cost": cur["now_cost"].astype(int),
+        "delta": delta,
+        "direction": np.sign(delta).astype(int),
+        "ownership": pd.to_numeric(prv["selected_by_percent"], errors="coerce"),
+        "NTI": prv["NTI"],
+        "NTI_24h": prv["NTI_24h"],
+    })
+    return collapse_price_days(ev)
+
+def collapse_price_days(ev: pd.DataFrame) -> pd.DataFrame:
+    """Regroupe les changements d'un même (id, price_date) et supprime ceux dont l'effet net est nul."""
+    if ev.empty:
+        return ev[EVENT_COLS].reset_index(drop=True)
+    ev = ev.sort_values(["id", "window_end"], kind="mergesort")
+    g = ev.groupby(["id", "price_date"], sort=False)
+    first = ["web_name", "window_start", "old_cost", "ownership", "NTI", "NTI_24h"]
+    out = g[first].first().join(g[["window_end", "new_cost"]].last()).reset_index()
+    out["web_name"] = g["web_name"].last().to_numpy()
+    out["delta"] = (out["new_cost"] - out["old_cost"]).astype(int)
+    out["direction"] = np.sign(out["delta"]).astype(int)
+    out = out[out["delta"] != 0]
+    return out[EVENT_COLS].sort_values(["id", "window_end"], kind="mergesort").reset_index(drop=True)
+
+def build_index(events: pd.DataFrame) -> dict:
+    """Plages de lignes par joueur (table triée par id) et lignes par date de prix."""
+    by_player, by_date = {}, {}
+    if not events.empty:
+        ids = events["id"].to_numpy()
+        starts = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]])
+        stops = np.r_[starts[1:], len(ids)]
+        by_player = {str(ids[a]): [int(a), int(b)] for a, b in zip(starts, stops)}
+        by_date = {d: rows.tolist() for d, rows in events.groupby("price_date").indices.items()}
+    return {"by_player": by_player, "by_date": dict(sorted(by_date.items()))}
+
+def _read_index() -> dict:
+    if not INDEX_FILE.exists():
+        return {}
+    with open(INDEX_FILE, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def update_events(rebuild: bool = False, jobs: int = 1) -> tuple[pd.DataFrame, int]:
+    """Met à jour la table (incrémental sauf `rebuild`) ; renvoie (table, variation du nb d'événements)."""
+    snaps = list_all_snapshots(SNAP_DIR, PLAYERS_STEM)
+    if not snaps:
+        raise SystemExit("[WARN] No snapshot found yet.")
+    state = {} if rebuild or not EVENTS_FILE.exists() else _read_index()
+    if state.get("price_tz") != PRICE_TZ:
+        state = {}  # price_date calculées sur l'ancienne horloge (labels traités comme heure locale)
+    n_before = int(state.get("n_events", 0))
+    last = pd.Timestamp(state["last_snapshot"]).to_pydatetime() if state.get("last_snapshot") else None
+    latest = snaps[-1][0]
+    if last is not None and latest <= last:
+        return load_events(indexed=False), 0
+
+    # on repart du début du jour de prix du dernier snapshot traité (regroupement par nuit)
+    after = None if last is None else price_day_start(last)
+    since = None if after is None else lookback_start(snaps, after)
+    panel = load_snapshot_panel(SNAP_DIR, PLAYERS_STEM, PANEL_COLS, aliases=NTI_ALIASES, since=since, jobs=jobs)
+    new = extract_events(panel, after=after)
+
+    old = pd.DataFrame(columns=EVENT_COLS)
+    if after is not None:
+        old = load_events(indexed=False)
+        old = old[old["price_date"].astype(str) < price_date(pd.Series([after])).iloc[0]]
+    frames = [f for f in (old, new) if not f.empty]
+    events = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=EVENT_COLS)
+    if not events.empty:
+        events["window_end"] = pd.to_datetime(events["window_end"])
+        events["window_start"] = pd.to_datetime(events["window_start"])
+        events = (events.drop_duplicates(["id", "price_date"], keep="last")
+                        .sort_values(["id", "window_end"], kind="mergesort").reset_index(drop=True))
+
+    ensure_dirs(DELTAS_DIR)
+    events.to_csv(EVENTS_FILE, index=False, encoding="utf-8")
+    index = {"last_snapshot": latest.isoformat(), "price_tz": PRICE_TZ, "n_events": int(len(events)),
+             **build_index(events)}
+    with open(INDEX_FILE, "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False)
+    return events, len(events) - n_before
+
+# --- API de requête ---
+def load_events(indexed: bool = True) -> pd.DataFrame:
+    """Table des événements ; `indexed` : MultiIndex (id, price_date) trié pour les requêtes .loc."""
+    if not EVENTS_FILE.exists():
+        return pd.DataFrame(columns=EVENT_COLS)
+    ev = pd.read_csv(EVENTS_FILE, parse_dates=["window_start", "window_end"])
+    if indexed:
+        ev = ev.set_index(["id", "price_date"]).sort_index()
+    return ev
+
+def player_history(player_id: int, events: pd.DataFrame | None = None) -> pd.DataFrame:
+    ev = load_events() if events is None else events
+    if player_id not in ev.index.get_level_values("id"):
+        return ev.iloc[0:0]
+    return ev.loc[player_id]
+
+def changes_on(date: str, events: pd.DataFrame | None = None) -> pd.DataFrame:
+    ev = load_events() if events is None else events
+    return ev.xs(str(date), level="price_date", drop_level=False) if str(date) in ev.index.get_level_values("price_date") else ev.iloc[0:0]
+
+def changes_between(start: str, end: str, events: pd.DataFrame | None = None) -> pd.DataFrame:
+    """Événements dont price_date est dans [start, end] (dates ISO, bornes incluses)."""
+    ev = load_events() if events is None else events
+    d = ev.index.get_level_values("price_date")
+    return ev[(d >= str(start)) & (d <= str(end))]
+
+def main():
+    ap = argparse.ArgumentParser(description="Extract observed price changes into an indexed events table.")
+    ap.add_argument("--rebuild", action="store_true", help="Rescanne tous les snapshots.")
+    ap.add_argument("--jobs", type=int, default=min(8, os.cpu_count() or 1), help="Lectures parallèles.")
+    args = ap.parse_args()
+
+    events, n_new = update_events(rebuild=args.rebuild, jobs=args.jobs)
+    up = int((events["direction"] > 0).sum()) if not events.empty else 0
+    print(f"[INFO] {n_new} nouveaux changements ; total {len(events)} (+{up} / -{len(events) - up})")
+    print(f"[PASS] {EVENTS_FILE.name} written")
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 # scripts/price_change_forecast.py
 from __future__ import annotations
 from pathlib import Path
+import numpy as np
 import pandas as pd
 from utils_io import ensure_dirs, latest_two_snapshots, read_csv_safe, to_float_safe, always_write_csv
 
@@ -12,20 +13,41 @@ PLAYERS_STEM = "players_raw"
 
 DELTAS_DIR = DATA_DIR / "deltas"
 NTI_LOG = DELTAS_DIR / "nti_deltas.csv"
+VELOCITY_FILE = DELTAS_DIR / "transfer_velocity.csv"  # transfer_velocity.py (transferts nets / heure)
+
+# Seuils NTI_24h (hausse, baisse) par tranche d'ownership : (borne sup. exclusive, up, down)
+OWN_THRESHOLDS = [
+    (5,  300_000, 15_000),
+    (10, 325_000, 325_000),
+    (20, 625_000, 375_000),
+    (40, 775_000, 450_000),
+]
+TOP_THRESHOLDS = (900_000, 525_000)      # ownership >= 40
+UNKNOWN_THRESHOLDS = (600_000, 350_000)  # ownership inconnue
 
 def _thresholds(own: float | None) -> tuple[int,int]:
-    if own is None: return (600_000, 350_000)
-    if own < 5: return (300_000, 15_000)
-    if own < 10: return (325_000, 325_000)
-    if own < 20: return (625_000, 375_000)
-    if own < 40: return (775_000, 450_000)
-    return (900_000, 525_000)
-
-def _eta_window(ratio: float, nti1h: float) -> str:
-    # estimation grossière : plus le ratio est élevé et plus NTI_1h est fort, plus la fenêtre est courte
-    if ratio >= 1.5 or abs(nti1h) >= 150_000: return "0–6h"
-    if ratio >= 1.0 or abs(nti1h) >= 100_000: return "6–12h"
-    if ratio >= 0.7 or abs(nti1h) >= 60_000:  return "12–24h"
+    if own is None: return UNKNOWN_THRESHOLDS
+    for bound, up, down in OWN_THRESHOLDS:
+        if own < bound: return (up, down)
+    return TOP_THRESHOLDS
+
+def thresholds_array(own) -> tuple[np.ndarray, np.ndarray]:
+    """Version vectorisée de _thresholds : ownership (array, NaN = inconnue) -> (up, down)."""
+    own = np.asarray(own, dtype=float)
+    bounds = np.array([b for b, _, _ in OWN_THRESHOLDS], dtype=float)
+    ups = np.array([u for _, u, _ in OWN_THRESHOLDS] + [TOP_THRESHOLDS[0]], dtype=float)
+    downs = np.array([d for _, _, d in OWN_THRESHOLDS] + [TOP_THRESHOLDS[1]], dtype=float)
+    idx = np.searchsorted(bounds, np.nan_to_num(own, nan=0.0), side="right")
+    up, down = ups[idx], downs[idx]
+    unknown = np.isnan(own)
+    up[unknown], down[unknown] = UNKNOWN_THRESHOLDS
+    return up, down
+
+def _eta_window(ratio: float, rate_per_h: float) -> str:
+    # estimation grossière : plus le ratio est élevé et plus le flux horaire est fort, plus la fenêtre est courte
+    if ratio >= 1.5 or abs(rate_per_h) >= 150_000: return "0–6h"
+    if ratio >= 1.0 or abs(rate_per_h) >= 100_000: return "6–12h"
+    if ratio >= 0.7 or abs(rate_per_h) >= 60_000:  return "12–24h"
     if ratio >= 0.4:                           return "24–48h"
     return "48h+"
 
@@ -48,6 +70,14 @@ def main():
         df = pd.merge(df, last, on="id", how="left")
         df[["NTI","NTI_1h","NTI_24h"]] = df[["NTI","NTI_1h","NTI_24h"]].fillna(0)
 
+    # vitesse normalisée (transferts/h) : indépendante de l'écart entre snapshots
+    vel = read_csv_safe(VELOCITY_FILE)
+    if not vel.empty and {"id","NTI_per_h","NTI_accel"} <= set(vel.columns):
+        df = pd.merge(df, vel[["id","NTI_per_h","NTI_accel"]], on="id", how="left")
+    else:
+        df["NTI_per_h"] = np.nan
+        df["NTI_accel"] = np.nan
+
     # ownership + status
     df["ownership"] = df.get("selected_by_percent", "").apply(to_float_safe)
     df["status"] = df.get("status", "").fillna("")
@@ -58,9 +88,11 @@ def main():
         up_thr, down_thr = _thresholds(own)
         nti24 = float(r.get("NTI_24h", 0))
         nti1h = float(r.get("NTI_1h", 0))
+        # flux horaire : vitesse mesurée si dispo, sinon repli sur NTI_1h (écart brut entre snapshots)
+        rate = float(r["NTI_per_h"]) if pd.notna(r.get("NTI_per_h")) else nti1h
 
         # momentum (croissance/décroissance du NTI)
-        momentum = "up" if nti1h > 0 else ("down" if nti1h < 0 else "flat")
+        momentum = "up" if rate > 0 else ("down" if rate < 0 else "flat")
 
         # forecast + risques séparés
         forecast = "stable"; risk_up = 0.0; risk_down = 0.0; ratio = 0.0
@@ -91,18 +123,20 @@ def main():
             "ownership": own,
             "NTI_1h": nti1h,
             "NTI_24h": nti24,
+            "NTI_per_h": r.get("NTI_per_h"),
+            "NTI_accel": r.get("NTI_accel"),
             "momentum": momentum,
             "status": r.get("status",""),
             "price_freeze": price_freeze,
             "forecast": forecast,
             "risk_up": round(risk_up,3),
             "risk_down": round(risk_down,3),
-            "eta_window": _eta_window(max(risk_up, risk_down), nti1h),
+            "eta_window": _eta_window(max(risk_up, risk_down), rate),
         })
 
     out = pd.DataFrame(rows, columns=[
         "id","web_name","team","position","now_cost","ownership",
-        "NTI_1h","NTI_24h","momentum","status","price_freeze",
+        "NTI_1h","NTI_24h","NTI_per_h","NTI_accel","momentum","status","price_freeze",
         "forecast","risk_up","risk_down","eta_window"
     ])
 
@@ -0,0 +1,190 @@
+# scripts/price_change_mc.py
+"""
+Simulation Monte Carlo des changements de prix pour la prochaine fenêtre de mise à jour (~02:30 Zurich).
+
+Pour chaque joueur, à partir de l'état NTI courant et de la vitesse mesurée (transfer_velocity.py) :
+- retenu   = somme des NTI_1h du log déjà dans la fenêtre ]t_w - 24h, maintenant]
+- projeté  = retenu + vitesse simulée × min(H, 24h)    (H = heures jusqu'à la fenêtre t_w)
+- vitesse = moyenne × facteur marché + bruit individuel :
+    moyenne = NTI_per_h + dérive d'accélération bornée, bruit ~ Normale(0, écart-type mesuré),
+    facteur marché ~ lognormal commun à tous les joueurs d'une même simulation (soirée calme / agitée)
+- P(hausse) / P(baisse) = part des tirages au-delà des seuils de price_change_forecast (thresholds_array)
+- Nombre de hausses / baisses par simulation (distribution jointe, grâce au facteur commun)
+
+Tout est vectorisé (NumPy, float32, par blocs de joueurs) : ~700 joueurs × 10 000 tirages << 1 s.
+
+Sortie : data/price_change_mc.csv (à côté de price_change_forecast.csv)
+
+Usage :
+  python scripts/price_change_mc.py [--sims 10000] [--seed 42] [--window 02:30]
+"""
+
+from __future__ import annotations
+import argparse
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+from utils_io import ensure_dirs, list_all_snapshots, read_csv_safe, to_float_safe, local_to_utc, utc_to_local
+from price_change_forecast import thresholds_array
+
+ROOT = Path(__file__).resolve().parents[1]
+DATA_DIR = ROOT / "data"
+SNAP_DIR = DATA_DIR / "snapshots"
+DELTAS_DIR = DATA_DIR / "deltas"
+NTI_LOG = DELTAS_DIR / "nti_deltas.csv"
+VELOCITY_FILE = DELTAS_DIR / "transfer_velocity.csv"
+OUT_FILE = DATA_DIR / "price_change_mc.csv"
+
+PLAYERS_STEM = "players_raw"
+N_SIMS = 10_000
+PRICE_WINDOW = "02:30"      # heure locale (Zurich) des mises à jour de prix
+MIN_STD_PER_H = 50.0        # plancher d'incertitude (transferts/h)
+REL_STD = 0.25              # incertitude minimale relative à la vitesse
+MARKET_SIGMA = 0.3          # dispersion (log) du facteur d'activité commun
+CHUNK_CELLS = 2_000_000     # joueurs × tirages par bloc (mémoire bornée)
+
+def next_window(now: datetime, hhmm: str = PRICE_WINDOW) -> datetime:
+    """
+    Prochaine mise à jour hh:mm (heure Zurich) strictement après `now`.
+    Entrée et sortie en UTC naïf, comme les horodatages de snapshots ; comparaison faite en UTC
+    (l'écart UTC de la fenêtre suit l'heure d'été).
+    """
+    h, m = (int(x) for x in hhmm.split(":"))
+    t = utc_to_local(now).replace(hour=h, minute=m, second=0, microsecond=0)
+    if local_to_utc(t) <= now:
+        t += timedelta(days=1)
+    return local_to_utc(t)
+
+def retained_nti(log: pd.DataFrame, now: datetime, window_at: datetime) -> pd.Series:
+    """Somme des NTI_1h par joueur déjà comptés dans ]window_at - 24h, now] (toujours dans la fenêtre à t_w)."""
+    if log.empty:
+        return pd.Series(dtype=float)
+    ts = pd.to_datetime(log["timestamp"], utc=True).dt.tz_localize(None)  # UTC naïf, comme now / window_at
+    mask = (ts > window_at - timedelta(hours=24)) & (ts <= now)
+    return pd.to_numeric(log.loc[mask, "NTI_1h"], errors="coerce").groupby(log.loc[mask, "id"]).sum()
+
+def rate_params(vel: pd.DataFrame, horizon_h: np.ndarray | float) -> tuple[np.ndarray, np.ndarray]:
+    """Moyenne et écart-type de la vitesse (transferts/h) sur l'horizon, par joueur."""
+    v = vel["NTI_per_h"].fillna(0.0).to_numpy(dtype=float)
+    accel = vel["NTI_accel"].fillna(0.0).to_numpy(dtype=float) if "NTI_accel" in vel else np.zeros_like(v)
+    std = vel["NTI_per_h_std"].to_numpy(dtype=float) if "NTI_per_h_std" in vel else np.full_like(v, np.nan)
+    # l'écart-type est mesuré sur des intervalles de ~window_h : la moyenne sur l'horizon varie moins
+    window_h = float(vel["window_h"].dropna().iloc[0]) if "window_h" in vel and vel["window_h"].notna().any() else 6.0
+    std = std * np.sqrt(min(1.0, window_h / max(float(horizon_h), 1e-9)))
+    # dérive moyenne sur l'horizon (accel × H/2), bornée à |v| pour ne pas extrapoler un bruit
+    drift = np.clip(0.5 * accel * horizon_h, -np.abs(v), np.abs(v))
+    mu = v + drift
+    sigma = np.fmax(np.nan_to_num(std, nan=0.0), np.fmax(REL_STD * np.abs(mu), MIN_STD_PER_H))
+    return mu, sigma
+
+def simulate(retained: np.ndarray, mu: np.ndarray, sigma: np.ndarray, hours: float,
+             up_thr: np.ndarray, down_thr: np.ndarray, n_sims: int = N_SIMS,
+             seed: int | None = None) -> dict[str, np.ndarray]:
+    """
+    Tirages (joueurs × n_sims) du NTI_24h à la fenêtre ; renvoie p_up, p_down, quantiles p10/p50/p90
+    par joueur et le nombre de hausses / baisses par simulation (risers, fallers).
+    Calcul par blocs de joueurs pour borner la mémoire ; le facteur marché est tiré une fois pour tous.
+    """
+    rng = np.random.default_rng(seed)
+    n = len(retained)
+    h = np.float32(min(hours, 24.0))
+    market = np.exp(MARKET_SIGMA * rng.standard_normal(n_sims) - 0.5 * MARKET_SIGMA**2).astype(np.float32)
+    kth = [int(q * (n_sims - 1)) for q in (0.1, 0.5, 0.9)]
+    out = {k: np.empty(n) for k in ("p_up", "p_down", "proj_p10", "proj_p50", "proj_p90")}
+    out["risers"] = np.zeros(n_sims, dtype=np.int64)
+    out["fallers"] = np.zeros(n_sims, dtype=np.int64)
+    step = max(1, CHUNK_CELLS // max(n_sims, 1))
+    for a in range(0, n, step):
+        b = min(n, a + step)
+        z = rng.standard_normal((b - a, n_sims), dtype=np.float32)
+        proj = (retained[a:b, None].astype(np.float32)
+                + (mu[a:b, None].astype(np.float32) * market
+                   + sigma[a:b, None].astype(np.float32) * z) * h)
+        up = proj >= up_thr[a:b, None]
+        down = proj <= -down_thr[a:b, None]
+        out["p_up"][a:b] = up.mean(axis=1)
+        out["p_down"][a:b] = down.mean(axis=1)
+        out["risers"] += up.sum(axis=0)
+        out["fallers"] += down.sum(axis=0)
+        # quantiles empiriques (rang inférieur) : partition plutôt que tri complet
+        part = np.partition(proj, kth, axis=1)
+        out["proj_p10"][a:b], out["proj_p50"][a:b], out["proj_p90"][a:b] = part[:, kth].T
+    return out
+
+def main():
+    ap = argparse.ArgumentParser(description="Monte Carlo price change probabilities for the next price window.")
+    ap.add_argument("--sims", type=int, default=N_SIMS, help="Nombre de tirages par joueur.")
+    ap.add_argument("--seed", type=int, default=None, help="Graine (résultats reproductibles).")
+    ap.add_argument("--window", default=PRICE_WINDOW, help="Heure locale de la mise à jour des prix (HH:MM).")
+    args = ap.parse_args()
+
+    snaps = list_all_snapshots(SNAP_DIR, PLAYERS_STEM)
+    if not snaps:
+        raise SystemExit("[ERROR] No snapshots found.")
+    now, latest = snaps[-1]
+    df = pd.read_csv(latest)
+    window_at = next_window(now, args.window)
+    hours = (window_at - now).total_seconds() / 3600.0
+
+    # état NTI courant + part déjà acquise dans la fenêtre 24h de t_w
+    nti = read_csv_safe(NTI_LOG)
+    if nti.empty:
+        print("[WARN] NTI log missing — retained NTI set to 0.")
+        df["NTI_24h"] = 0.0
+        df["retained_24h"] = 0.0
+    else:
+        last = nti.sort_values(["id", "timestamp"]).groupby("id").tail(1).set_index("id")
+        df["NTI_24h"] = df["id"].map(last["NTI_24h"]).fillna(0.0)
+        df["retained_24h"] = df["id"].map(retained_nti(nti, now, window_at)).fillna(0.0)
+
+    vel = read_csv_safe(VELOCITY_FILE)
+    if vel.empty:
+        print("[WARN] transfer_velocity.csv missing — run transfer_velocity.py first (velocity = 0).")
+        vel = pd.DataFrame({"id": df["id"], "NTI_per_h": 0.0})
+    vel = df[["id"]].merge(vel.drop(columns=["web_name", "timestamp", "NTI"], errors="ignore"), on="id", how="left")
+
+    own = df.get("selected_by_percent", pd.Series(np.nan, index=df.index)).apply(to_float_safe).astype(float)
+    up_thr, down_thr = thresholds_array(own)
+    mu, sigma = rate_params(vel, min(hours, 24.0))
+
+    t0 = time.perf_counter()
+    sim = simulate(df["retained_24h"].to_numpy(dtype=float), mu, sigma, hours,
+                   up_thr, down_thr, n_sims=args.sims, seed=args.seed)
+    elapsed = time.perf_counter() - t0
+
+    out = pd.DataFrame({
+        "timestamp": now,
+        "window_at": window_at,
+        "hours_to_window": round(hours, 2),
+        "id": df["id"],
+        "web_name": df.get("web_name", ""),
+        "team": df.get("team", ""),
+        "now_cost": df.get("now_cost", 0),
+        "ownership": own,
+        "NTI_24h": df["NTI_24h"],
+        "retained_24h": df["retained_24h"],
+        "rate_mean": np.round(mu, 1),
+        "rate_std": np.round(sigma, 1),
+        "up_threshold": up_thr,
+        "down_threshold": down_thr,
+        "proj_p10": np.round(sim["proj_p10"]),
+        "proj_p50": np.round(sim["proj_p50"]),
+        "proj_p90": np.round(sim["proj_p90"]),
+        "p_up": np.round(sim["p_up"], 4),
+        "p_down": np.round(sim["p_down"], 4),
+        "n_sims": args.sims,
+    })
+
+    ensure_dirs(DATA_DIR)
+    out.to_csv(OUT_FILE, index=False, encoding="utf-8")
+    print(f"[INFO] {len(out)} joueurs × {args.sims} tirages en {elapsed:.3f}s, fenêtre {window_at:%Y-%m-%d %H:%M} UTC (+{hours:.1f}h)")
+    r10, r50, r90 = np.percentile(sim["risers"], [10, 50, 90])
+    f10, f50, f90 = np.percentile(sim["fallers"], [10, 50, 90])
+    print(f"[INFO] hausses attendues {r50:.0f} [{r10:.0f}–{r90:.0f}], baisses {f50:.0f} [{f10:.0f}–{f90:.0f}]")
+    print(f"[PASS] {OUT_FILE.name} written ({len(out)} rows)")
+
+if __name__ == "__main__":
+    main()
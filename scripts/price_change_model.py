@@ -0,0 +1,278 @@
+# scripts/price_change_model.py
+"""
+Modèle de "hazard" de variation de prix, appris sur l'historique des snapshots.
+
+Complète la prévision à règles fixes (price_change_forecast.py) :
+- Entraînement vectorisé sur tout le panel (joueur × snapshot) : deux régressions
+  logistiques (hausse / baisse dans les 24h) résolues par Newton (IRLS) en NumPy
+- Features : NTI_24h (rapporté aux seuils de price_change_forecast), NTI_1h, ownership,
+  status (flag), cost_change_event, temps depuis la dernière variation
+- Effet propre à chaque joueur : décalage logit (observé vs attendu, rétréci vers 0),
+  qui capte p.ex. les joueurs qui montent à NTI plus faible
+- Sorties par joueur : proba hausse/baisse 24h, hazard horaire, temps attendu avant variation
+
+Usage :
+  python scripts/price_change_model.py            # ré-entraîne si modèle absent/périmé, puis prédit
+  python scripts/price_change_model.py --train    # force l'entraînement
+  python scripts/price_change_model.py --no-predict
+"""
+
+from __future__ import annotations
+import argparse
+import json
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+from utils_io import ensure_dirs, list_all_snapshots, load_snapshot_panel
+from price_change_forecast import thresholds_array
+from transfer_velocity import load_deadlines, crosses_deadline
+
+ROOT = Path(__file__).resolve().parents[1]
+DATA_DIR = ROOT / "data"
+SNAP_DIR = DATA_DIR / "snapshots"
+MODEL_DIR = DATA_DIR / "models"
+MODEL_FILE = MODEL_DIR / "price_change_hazard.json"
+OUT_FILE = DATA_DIR / "price_change_hazard.csv"
+
+PLAYERS_STEM = "players_raw"
+PANEL_COLS = [
+    "web_name", "now_cost", "cost_change_event", "transfers_in_event",
+    "transfers_out_event", "selected_by_percent", "status",
+]
+PANEL_ALIASES = {
+    "transfers_in_between_gws_current": "transfers_in_event",
+    "transfers_out_between_gws_current": "transfers_out_event",
+}
+
+HORIZON_H = 24.0            # cible : variation dans les 24h
+MAX_SINCE_CHANGE_H = 24 * 14
+OFFSET_PRIOR = 2.0          # rétrécissement des décalages joueur (pseudo-événements)
+L2 = 1.0
+FEATURES = [
+    "nti24_up", "nti24_down", "nti1h", "log_own",
+    "flagged", "cost_change_event", "log_h_since_change",
+]
+
+# ---------- Panel & features ----------
+
+def load_panel(since: datetime | None = None) -> pd.DataFrame:
+    panel = load_snapshot_panel(SNAP_DIR, PLAYERS_STEM, PANEL_COLS, aliases=PANEL_ALIASES, since=since)
+    for c in ["now_cost", "cost_change_event", "transfers_in_event", "transfers_out_event", "selected_by_percent"]:
+        panel[c] = pd.to_numeric(panel[c], errors="coerce")
+    return panel
+
+def add_nti(panel: pd.DataFrame, deadlines: np.ndarray | None = None) -> pd.DataFrame:
+    """
+    NTI, NTI_1h (écart entre snapshots consécutifs) et NTI_24h glissant. Même règle que
+    transfer_velocity : une baisse de transfers_in est une remise à zéro seulement si l'intervalle
+    traverse une deadline (NTI_1h = NTI courant) ; ailleurs, snapshot incohérent -> NTI_1h = 0.
+    """
+    df = panel
+    tin = df["transfers_in_event"].fillna(0)
+    tout = df["transfers_out_event"].fillna(0)
+    df["NTI"] = tin - tout
+    g = df.groupby("id", sort=False)
+    prev_in = g["transfers_in_event"].shift(1)
+    deadlines = load_deadlines() if deadlines is None else deadlines
+    boundary = crosses_deadline(g["timestamp"].shift(1), df["timestamp"], deadlines)
+    drop = (prev_in.notna() & (tin < prev_in)).to_numpy()
+    d = df["NTI"] - g["NTI"].shift(1)
+    d = d.where(~(drop & boundary), df["NTI"])  # compteurs *_event remis à zéro (nouvelle GW)
+    df["NTI_1h"] = d.where(~(drop & ~boundary), 0.0).fillna(0.0)
+    df["NTI_24h"] = (
+        df.set_index("timestamp").groupby("id", sort=False)["NTI_1h"]
+        .rolling(f"{int(HORIZON_H)}h").sum().to_numpy()
+    )
+    return df
+
+def add_change_timing(df: pd.DataFrame) -> pd.DataFrame:
+    """Marque les variations de now_cost et calcule le temps depuis la dernière / jusqu'à la prochaine."""
+    g = df.groupby("id", sort=False)
+    dcost = df["now_cost"] - g["now_cost"].shift(1)
+    df["change_dir"] = np.sign(dcost.fillna(0)).astype(int)
+    changed = df["change_dir"] != 0
+
+    ts = df["timestamp"]
+    last_change = ts.where(changed).groupby(df["id"], sort=False).ffill()
+    first_seen = g["timestamp"].transform("min")
+    since = (ts - last_change.fillna(first_seen)).dt.total_seconds() / 3600.0
+    df["h_since_change"] = since.clip(0, MAX_SINCE_CHANGE_H)
+
+    # prochaine variation strictement après la ligne courante
+    next_ts = ts.where(changed).groupby(df["id"], sort=False).shift(-1)
+    next_ts = next_ts.groupby(df["id"], sort=False).bfill()
+    next_dir = df["change_dir"].where(changed).groupby(df["id"], sort=False).shift(-1)
+    next_dir = next_dir.groupby(df["id"], sort=False).bfill()
+    df["h_to_change"] = (next_ts - ts).dt.total_seconds() / 3600.0
+    df["next_dir"] = next_dir
+    return df
+
+def feature_matrix(df: pd.DataFrame) -> np.ndarray:
+    own = pd.to_numeric(df["selected_by_percent"], errors="coerce").to_numpy(dtype=float)
+    up_thr, down_thr = thresholds_array(own)
+    nti24 = df["NTI_24h"].to_numpy(dtype=float)
+    st = df["status"].fillna("a").astype(str).str.lower().to_numpy()
+    cols = {
+        "nti24_up": np.clip(nti24 / up_thr, -5, 5),
+        "nti24_down": np.clip(-nti24 / down_thr, -5, 5),
+        "nti1h": np.clip(df["NTI_1h"].to_numpy(dtype=float) / 100_000, -5, 5),
+        "log_own": np.log1p(np.nan_to_num(own, nan=0.0)),
+        "flagged": (st != "a").astype(float),
+        "cost_change_event": np.nan_to_num(df["cost_change_event"].to_numpy(dtype=float)),
+        "log_h_since_change": np.log1p(df["h_since_change"].to_numpy(dtype=float)),
+    }
+    return np.column_stack([cols[f] for f in FEATURES])
+
+# ---------- Régression logistique (Newton / IRLS) ----------
+
+def _sigmoid(z: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-np.clip(z, -35, 35)))
+
+def fit_logistic(X: np.ndarray, y: np.ndarray, l2: float = L2, max_iter: int = 50) -> np.ndarray:
+    """X inclut la colonne d'intercept en tête (non pénalisée)."""
+    w = np.zeros(X.shape[1])
+    pen = np.full(X.shape[1], l2); pen[0] = 0.0
+    for _ in range(max_iter):
+        p = _sigmoid(X @ w)
+        grad = X.T @ (p - y) + pen * w
+        hess = (X.T * (p * (1 - p))) @ X + np.diag(pen + 1e-9)
+        step = np.linalg.solve(hess, grad)
+        w -= step
+        if np.max(np.abs(step)) < 1e-6:
+            break
+    return w
+
+def player_offsets(ids: np.ndarray, y: np.ndarray, p: np.ndarray) -> dict[int, float]:
+    """Décalage logit par joueur : log((observé + k) / (attendu + k)), calculé par bincount."""
+    uniq, inv = np.unique(ids, return_inverse=True)
+    obs = np.bincount(inv, weights=y)
+    exp = np.bincount(inv, weights=p)
+    off = np.log((obs + OFFSET_PRIOR) / (exp + OFFSET_PRIOR))
+    return {int(i): round(float(o), 4) for i, o in zip(uniq, off) if abs(o) > 1e-4}
+
+# ---------- Entraînement ----------
+
+def train() -> dict:
+    panel = load_panel()
+    if panel.empty:
+        raise SystemExit("[ERROR] No snapshots found.")
+    df = add_change_timing(add_nti(panel))
+
+    # lignes dont l'horizon est observable (sinon censurées)
+    t_end = df["timestamp"].max()
+    horizon_seen = (t_end - df["timestamp"]).dt.total_seconds() / 3600.0 >= HORIZON_H
+    within = df["h_to_change"].le(HORIZON_H)
+    train_df = df[horizon_seen | within]
+    within = within[train_df.index]
+
+    X = feature_matrix(train_df)
+    mean, std = X.mean(axis=0), X.std(axis=0)
+    std[std == 0] = 1.0
+    Xs = np.column_stack([np.ones(len(X)), (X - mean) / std])
+
+    ids = train_df["id"].to_numpy()
+    model = {
+        "trained_at_utc": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "data_until": t_end.isoformat(),
+        "horizon_h": HORIZON_H,
+        "features": FEATURES,
+        "mean": mean.round(6).tolist(),
+        "std": std.round(6).tolist(),
+        "n_rows": int(len(train_df)),
+    }
+    for side, direction in (("rise", 1), ("fall", -1)):
+        y = (within & train_df["next_dir"].eq(direction)).to_numpy(dtype=float)
+        w = fit_logistic(Xs, y)
+        model[f"coef_{side}"] = w.round(6).tolist()
+        model[f"offsets_{side}"] = player_offsets(ids, y, _sigmoid(Xs @ w))
+        model[f"n_{side}"] = int(y.sum())
+
+    # dernière variation et première apparition par joueur : à l'inférence (fenêtre courte),
+    # h_since_change repart de la même référence qu'à l'entraînement
+    last = df[df["change_dir"] != 0].groupby("id")["timestamp"].max()
+    model["last_change"] = {int(i): t.isoformat() for i, t in last.items()}
+    first = df.groupby("id")["timestamp"].min()
+    model["first_seen"] = {int(i): t.isoformat() for i, t in first.items()}
+
+    ensure_dirs(MODEL_DIR)
+    MODEL_FILE.write_text(json.dumps(model, indent=1), encoding="utf-8")
+    print(f"[PASS] Hazard model trained on {model['n_rows']:,} rows "
+          f"(rises={model['n_rise']}, falls={model['n_fall']}) -> {MODEL_FILE.name}")
+    return model
+
+def load_model() -> dict | None:
+    if not MODEL_FILE.exists():
+        return None
+    return json.loads(MODEL_FILE.read_text(encoding="utf-8"))
+
+# ---------- Inférence ----------
+
+def predict(model: dict) -> pd.DataFrame:
+    """Prédit sur le dernier snapshot ; ne lit que les 48 dernières heures de snapshots."""
+    snaps = list_all_snapshots(SNAP_DIR, PLAYERS_STEM)
+    if not snaps:
+        raise SystemExit("[ERROR] No snapshots found.")
+    t_last = snaps[-1][0]
+    panel = load_panel(since=t_last - timedelta(hours=2 * HORIZON_H))
+    df = add_change_timing(add_nti(panel))
+
+    # temps depuis la dernière variation : complété par l'historique du modèle (dernière variation,
+    # sinon première apparition), comme à l'entraînement sur tout l'historique
+    known = pd.to_datetime(df["id"].map({int(k): v for k, v in model.get("last_change", {}).items()}))
+    first = pd.to_datetime(df["id"].map({int(k): v for k, v in model.get("first_seen", {}).items()}))
+    known = known.fillna(first)
+    no_change_in_window = ~df["change_dir"].ne(0).groupby(df["id"]).transform("any")
+    h_known = (df["timestamp"] - known).dt.total_seconds() / 3600.0
+    fill = no_change_in_window & h_known.notna()
+    df.loc[fill, "h_since_change"] = h_known[fill].clip(0, MAX_SINCE_CHANGE_H)
+
+    cur = df.groupby("id", sort=False).tail(1).reset_index(drop=True)
+    X = feature_matrix(cur)
+    Xs = np.column_stack([np.ones(len(X)), (X - np.array(model["mean"])) / np.array(model["std"])])
+
+    out = pd.DataFrame({
+        "id": cur["id"],
+        "web_name": cur["web_name"],
+        "now_cost": cur["now_cost"],
+        "ownership": cur["selected_by_percent"],
+        "NTI_1h": cur["NTI_1h"],
+        "NTI_24h": cur["NTI_24h"],
+        "h_since_change": cur["h_since_change"].round(1),
+    })
+    horizon = float(model.get("horizon_h", HORIZON_H))
+    for side in ("rise", "fall"):
+        off = cur["id"].map({int(k): v for k, v in model[f"offsets_{side}"].items()}).fillna(0.0)
+        p = _sigmoid(Xs @ np.array(model[f"coef_{side}"]) + off.to_numpy())
+        hazard = -np.log1p(-np.clip(p, 0, 1 - 1e-9)) / horizon  # hazard horaire constant
+        out[f"p_{side}_{int(horizon)}h"] = p.round(4)
+        out[f"hazard_{side}_per_h"] = hazard.round(6)
+        out[f"eta_{side}_h"] = np.minimum(1.0 / np.maximum(hazard, 1e-9), MAX_SINCE_CHANGE_H).round(1)
+    out.insert(0, "snapshot_time", pd.Timestamp(t_last).isoformat())
+    return out
+
+def main():
+    ap = argparse.ArgumentParser(description="Hazard model of FPL price changes (train + predict).")
+    ap.add_argument("--train", action="store_true", help="Force le ré-entraînement.")
+    ap.add_argument("--max-age-h", type=float, default=24.0, help="Âge max du modèle avant ré-entraînement.")
+    ap.add_argument("--no-predict", action="store_true", help="Entraîne seulement.")
+    args = ap.parse_args()
+
+    model = load_model()
+    stale = model is None
+    if model is not None:
+        trained = datetime.strptime(model["trained_at_utc"], "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=timezone.utc)
+        stale = datetime.now(timezone.utc) - trained > timedelta(hours=args.max_age_h)
+    if args.train or stale:
+        model = train()
+    if args.no_predict:
+        return
+
+    out = predict(model)
+    ensure_dirs(DATA_DIR)
+    out.to_csv(OUT_FILE, index=False, encoding="utf-8")
+    print(f"[PASS] {OUT_FILE.name} written ({len(out)} rows)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+# scripts/quantile_sketch.py
+"""
+Sketches de quantiles fusionnables (t-digest) pour la calibration par tranche d'ownership.
+
+Un digest est un dict JSON : centroïdes (means, weights) + count, sum, min, max, compression.
+- tdigest_add : ajoute un lot de valeurs (fusion + recompression vectorisées, échelle k1 en arcsin :
+  centroïdes fins aux extrémités, donc quantiles de queue précis)
+- tdigest_merge : fusion de deux digests (même compression)
+- tdigest_quantile : interpolation entre centres de centroïdes ; exact tant que les centroïdes sont
+  des singletons (même convention que pandas Series.quantile)
+Erreur de rang ~ O(1/compression) : `compression` règle le compromis taille / précision
+(~compression centroïdes max par digest, indépendant du nombre de lignes).
+
+Sketches de calibration : data/sketches/forecast_calibration.json
+  {metric: {tranche: digest}} pour forecast_delta et NTI_24h, mis à jour par
+  append_price_change_forecast.py à chaque ajout ; lus par build_summaries (thresholds_calibration).
+
+Usage (reconstruction complète depuis l'historique) :
+  python scripts/quantile_sketch.py --rebuild [--compression 200]
+"""
+
+from __future__ import annotations
+import argparse
+import json
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+DATA_DIR = ROOT / "data"
+HIST_FILE = DATA_DIR / "price_change_forecast_history.csv"
+SKETCH_DIR = DATA_DIR / "sketches"
+CALIBRATION_SKETCH = SKETCH_DIR / "forecast_calibration.json"
+
+COMPRESSION = 200
+OWN_BINS = [-0.01, 5, 10, 20, 40, 60, 100]
+OWN_LABELS = ["0-5", "5-10", "10-20", "20-40", "40-60", "60-100"]
+METRICS = ["forecast_delta", "NTI_24h"]
+CHUNK_ROWS = 200_000
+
+# --- t-digest ---
+def tdigest_new(compression: float = COMPRESSION) -> dict:
+    return {"compression": float(compression), "means": [], "weights": [],
+            "count": 0.0, "sum": 0.0, "min": None, "max": None}
+
+def _compress(means: np.ndarray, weights: np.ndarray, compression: float) -> tuple[np.ndarray, np.ndarray]:
+    """Regroupe des centroïdes triés : un cluster par intervalle unitaire de l'échelle k1(q)."""
+    if len(means) == 0:
+        return means, weights
+    order = np.argsort(means, kind="mergesort")
+    means, weights = means[order], weights[order]
+    total = weights.sum()
+    q_mid = (np.cumsum(weights) - weights / 2.0) / total
+    k = compression / (2.0 * np.pi) * np.arcsin(2.0 * q_mid - 1.0)
+    cluster = np.floor(k - k.min()).astype(np.int64)
+    starts = np.flatnonzero(np.r_[True, cluster[1:] != cluster[:-1]])
+    w = np.add.reduceat(weights, starts)
+    m = np.add.reduceat(means * weights, starts) / w
+    return m, w
+
+def tdigest_add(d: dict, values) -> dict:
+    """Ajoute un lot de valeurs (NaN ignorés) ; renvoie le digest mis à jour."""
+    x = pd.to_numeric(pd.Series(values), errors="coerce").to_numpy(dtype=float)
+    x = x[~np.isnan(x)]
+    if len(x) == 0:
+        return d
+    means = np.concatenate([np.asarray(d["means"], dtype=float), x])
+    weights = np.concatenate([np.asarray(d["weights"], dtype=float), np.ones(len(x))])
+    m, w = _compress(means, weights, d["compression"])
+    d["means"], d["weights"] = m.tolist(), w.tolist()
+    d["count"] += float(len(x))
+    d["sum"] += float(x.sum())
+    d["min"] = float(x.min()) if d["min"] is None else min(d["min"], float(x.min()))
+    d["max"] = float(x.max()) if d["max"] is None else max(d["max"], float(x.max()))
+    return d
+
+def tdigest_merge(a: dict, b: dict) -> dict:
+    out = tdigest_new(max(a["compression"], b["compression"]))
+    means = np.asarray(a["means"] + b["means"], dtype=float)
+    weights = np.asarray(a["weights"] + b["weights"], dtype=float)
+    m, w = _compress(means, weights, out["compression"])
+    out.update(means=m.tolist(), weights=w.tolist(), count=a["count"] + b["count"], sum=a["sum"] + b["sum"])
+    mins = [v for v in (a["min"], b["min"]) if v is not None]
+    maxs = [v for v in (a["max"], b["max"]) if v is not None]
+    out["min"], out["max"] = (min(mins) if mins else None), (max(maxs) if maxs else None)
+    return out
+
+def tdigest_quantile(d: dict, q: float) -> float:
+    """Quantile q (0..1) ; NaN si le digest est vide."""
+    if not d["count"]:
+        return float("nan")
+    m = np.asarray(d["means"], dtype=float)
+    w = np.asarray(d["weights"], dtype=float)
+    centers = np.cumsum(w) - w / 2.0               # rang (continu) du centre de chaque centroïde
+    r = q * (d["count"] - 1) + 0.5                 # même convention que la position pandas q*(n-1)
+    xs = np.r_[0.5, centers, d["count"] - 0.5]
+    ys = np.r_[d["min"], m, d["max"]]
+    return float(np.interp(r, xs, ys))
+
+def tdigest_mean(d: dict) -> float:
+    return d["sum"] / d["count"] if d["count"] else float("nan")
+
+# --- Sketches de calibration par tranche d'ownership ---
+def _calibration_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Colonnes utiles avec alias : ownership <- selected_by_percent, forecast_delta <- forecast (+0.1/-0.1/stable)."""
+    own = df["selected_by_percent"] if "selected_by_percent" in df.columns else df.get("ownership")
+    if "forecast_delta" in df.columns:
+        delta = pd.to_numeric(df["forecast_delta"], errors="coerce")
+    elif "forecast" in df.columns:
+        f = df["forecast"].astype(str).str.strip().str.lower()
+        delta = pd.to_numeric(f.replace({"stable": "0"}), errors="coerce")
+    else:
+        delta = pd.Series(np.nan, index=df.index)
+    out = pd.DataFrame({
+        "ownership": pd.to_numeric(own, errors="coerce") if own is not None else np.nan,
+        "forecast_delta": delta,
+        "NTI_24h": pd.to_numeric(df["NTI_24h"], errors="coerce") if "NTI_24h" in df.columns else np.nan,
+    }, index=df.index)
+    out["bucket"] = pd.cut(out["ownership"].astype(float), bins=OWN_BINS, labels=OWN_LABELS)
+    return out
+
+def new_calibration(compression: float = COMPRESSION) -> dict:
+    return {"version": 1, "compression": float(compression), "rows": 0, "last_snapshot_time": None,
+            "metrics": {m: {b: tdigest_new(compression) for b in OWN_LABELS} for m in METRICS}}
+
+def add_calibration_rows(sk: dict, df: pd.DataFrame) -> dict:
+    """Ajoute des lignes de forecast (une tranche = un lot par digest)."""
+    if df.empty:
+        return sk
+    cf = _calibration_frame(df)
+    for metric in METRICS:
+        for bucket, part in cf.groupby("bucket", observed=True)[metric]:
+            d = sk["metrics"][metric][str(bucket)]
+            tdigest_add(d, part.to_numpy())
+    sk["rows"] += int(len(df))
+    if "snapshot_time" in df.columns:
+        last = str(df["snapshot_time"].astype(str).max())
+        sk["last_snapshot_time"] = max(filter(None, [sk["last_snapshot_time"], last]))
+    return sk
+
+def load_calibration(path: Path = CALIBRATION_SKETCH) -> dict | None:
+    if not Path(path).exists():
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def save_calibration(sk: dict, path: Path = CALIBRATION_SKETCH) -> None:
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(sk, f, ensure_ascii=False)
+
+def rebuild_calibration(hist_file: Path = HIST_FILE, compression: float = COMPRESSION) -> dict:
+    """Reconstruit les sketches depuis tout l'historique, par blocs (mémoire bornée)."""
+    sk = new_calibration(compression)
+    if not Path(hist_file).exists():
+        return sk
+    cols = {"snapshot_time", "selected_by_percent", "ownership", "forecast_delta", "forecast", "NTI_24h"}
+    for chunk in pd.read_csv(hist_file, usecols=lambda c: c in cols, chunksize=CHUNK_ROWS):
+        add_calibration_rows(sk, chunk)
+    return sk
+
+def update_calibration(new_rows: pd.DataFrame, hist_file: Path = HIST_FILE) -> dict:
+    """
+    Mise à jour incrémentale (appelée après l'append de l'historique) :
+    - sketches absents -> reconstruction depuis l'historique (qui contient déjà new_rows)
+    - sinon ajout des seules lignes plus récentes que last_snapshot_time
+    """
+    sk = load_calibration()
+    if sk is None:
+        sk = rebuild_calibration(hist_file)
+    else:
+        last = sk.get("last_snapshot_time")
+        if last is not None and "snapshot_time" in new_rows.columns:
+            new_rows = new_rows[new_rows["snapshot_time"].astype(str) > last]
+        add_calibration_rows(sk, new_rows)
+    save_calibration(sk)
+    return sk
+
+def calibration_table(sk: dict, metric: str, quantiles: dict[str, float]) -> pd.DataFrame:
+    """Une ligne par tranche : n, mean et quantiles demandés, lus dans les digests."""
+    rows = []
+    for bucket in OWN_LABELS:
+        d = sk["metrics"][metric][bucket]
+        row = {"own_bucket": bucket, "n": int(d["count"]), "mean": tdigest_mean(d)}
+        row.update({name: tdigest_quantile(d, q) for name, q in quantiles.items()})
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+def main():
+    ap = argparse.ArgumentParser(description="Rebuild ownership-bucket quantile sketches from the forecast history.")
+    ap.add_argument("--rebuild", action="store_true", help="Reconstruit depuis price_change_forecast_history.csv.")
+    ap.add_argument("--compression", type=float, default=COMPRESSION, help="Compression t-digest (précision).")
+    args = ap.parse_args()
+
+    sk = rebuild_calibration(compression=args.compression) if args.rebuild else load_calibration()
+    if sk is None:
+        raise SystemExit("[WARN] No sketch yet — run with --rebuild.")
+    if args.rebuild:
+        save_calibration(sk)
+    print(calibration_table(sk, "NTI_24h", {"p50": 0.5, "p90": 0.9, "p99": 0.99}).to_string(index=False))
+    print(f"[PASS] {CALIBRATION_SKETCH.name} ({sk['rows']} rows, compression {sk['compression']:.0f})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+# scripts/rebuild_nti_log.py
+"""
+Reconstruit data/deltas/nti_deltas.csv en une passe depuis TOUS les snapshots players_raw.
+
+calc_nti_deltas.py n'ajoute qu'une ligne par run (diff des deux derniers snapshots) :
+si le log est perdu/corrompu ou change de schéma, ce script le régénère à l'identique.
+
+- Lecture parallèle des snapshots, colonnes utiles uniquement (id, web_name, transferts)
+- Horodatages ramenés en UTC, snapshots au contenu déjà vu écartés (load_snapshot_panel) :
+  pas de paire identique (NTI_1h = 0) ni d'état antérieur rejoué après un plus récent
+- Matrice joueur × timestamp, NTI_1h = diff avec le snapshot précédent (absent -> 0)
+- NTI_24h = somme glissante de NTI_1h sur ]t-24h, t] (cumsum + searchsorted, sans boucle)
+- Sortie triée (id, timestamp) : deux reconstructions donnent le même fichier
+
+Usage :
+  python scripts/rebuild_nti_log.py [--jobs 8] [--out data/deltas/nti_deltas.csv] [--dry-run]
+"""
+
+from __future__ import annotations
+import argparse
+import os
+import time
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+from utils_io import ensure_dirs, load_snapshot_panel
+
+ROOT = Path(__file__).resolve().parents[1]
+DATA_DIR = ROOT / "data"
+SNAP_DIR = DATA_DIR / "snapshots"
+DELTAS_DIR = DATA_DIR / "deltas"
+NTI_LOG = DELTAS_DIR / "nti_deltas.csv"
+
+PLAYERS_STEM = "players_raw"
+NTI_COLS = ["web_name", "transfers_in_event", "transfers_out_event"]
+NTI_ALIASES = {
+    "transfers_in_between_gws_current": "transfers_in_event",
+    "transfers_out_between_gws_current": "transfers_out_event",
+}
+LOG_COLS = ["timestamp", "id", "web_name", "NTI", "NTI_1h", "NTI_24h"]
+
+def nti_24h(ids, timestamps, nti_1h, window_h: float = 24.0) -> np.ndarray:
+    """
+    Somme de NTI_1h sur ]t - window, t] par joueur (lignes de même timestamp incluses).
+    Entrées déjà triées par (id, timestamp).
+    """
+    ids = np.asarray(ids, dtype=np.int64)
+    vals = np.nan_to_num(np.asarray(nti_1h, dtype=float))
+    if len(vals) == 0:
+        return vals
+    ts = pd.to_datetime(pd.Series(timestamps).reset_index(drop=True))
+    # clé composite triée : id * BIG + secondes relatives
+    rel = (ts - ts.min()).dt.total_seconds().to_numpy().astype(np.int64)
+    big = np.int64(rel.max() + int(window_h * 3600) + 1)
+    key = ids * big + rel
+    csum = np.concatenate([[0.0], np.cumsum(vals)])
+    right = np.searchsorted(key, key, side="right")
+    left = np.searchsorted(key, key - int(window_h * 3600), side="right")
+    return csum[right] - csum[left]
+
+def nti_log_from_panel(panel: pd.DataFrame) -> pd.DataFrame:
+    """
+    Même sémantique que calc_nti_deltas, appliquée à toute la série d'un coup. Seule différence :
+    1er snapshot -> NTI_1h = 0 et donc NTI_24h = 0, alors que le log initial de calc_nti_deltas
+    (un seul snapshot) porte NTI_24h = NTI ; dès son run suivant, calc_nti_deltas recalcule tous
+    les NTI_24h depuis NTI_1h et rejoint ce résultat.
+    """
+    tin = pd.to_numeric(panel["transfers_in_event"], errors="coerce").fillna(0)
+    tout = pd.to_numeric(panel["transfers_out_event"], errors="coerce").fillna(0)
+    nti = (tin - tout).to_numpy(dtype=float)
+
+    t_codes, times = pd.factorize(panel["timestamp"], sort=True)
+    p_codes, _ = pd.factorize(panel["id"], sort=True)
+    grid = np.full((p_codes.max() + 1, len(times)), np.nan)
+    grid[p_codes, t_codes] = nti
+
+    # diff avec le snapshot global précédent ; joueur absent -> 0 ; premier snapshot -> NTI_1h = 0
+    prev = np.zeros_like(grid)
+    prev[:, 1:] = np.nan_to_num(grid[:, :-1])
+    d1 = grid - prev
+    d1[:, 0] = 0.0
+
+    log = pd.DataFrame({
+        "timestamp": pd.to_datetime(panel["timestamp"]).dt.tz_localize("UTC"),
+        "id": panel["id"].to_numpy(),
+        "web_name": panel["web_name"].to_numpy(),
+        "NTI": nti,
+        "NTI_1h": d1[p_codes, t_codes],
+    })
+    log = log.sort_values(["id", "timestamp"], kind="mergesort").reset_index(drop=True)
+    log["NTI_24h"] = nti_24h(log["id"], log["timestamp"], log["NTI_1h"])
+    return log[LOG_COLS]
+
+def main():
+    ap = argparse.ArgumentParser(description="Rebuild the full NTI log from every players_raw snapshot.")
+    ap.add_argument("--jobs", type=int, default=min(8, os.cpu_count() or 1), help="Lectures parallèles.")
+    ap.add_argument("--out", default=str(NTI_LOG), help="Fichier de sortie (défaut: data/deltas/nti_deltas.csv).")
+    ap.add_argument("--dry-run", action="store_true", help="Calcule sans écrire.")
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    panel = load_snapshot_panel(SNAP_DIR, PLAYERS_STEM, NTI_COLS, aliases=NTI_ALIASES, jobs=args.jobs)
+    if panel.empty:
+        raise SystemExit("[WARN] No snapshot found yet.")
+    t1 = time.perf_counter()
+    log = nti_log_from_panel(panel)
+    t2 = time.perf_counter()
+
+    n_ts = log["timestamp"].nunique()
+    print(f"[INFO] {n_ts} snapshots, {log['id'].nunique()} joueurs, {len(log):,} lignes "
+          f"(lecture {t1 - t0:.2f}s, calcul {t2 - t1:.2f}s)")
+    if args.dry_run:
+        print("[DRY] nothing written.")
+        return
+    out = Path(args.out)
+    ensure_dirs(out.parent)
+    log.to_csv(out, index=False)
+    print(f"[PASS] NTI log rebuilt -> {out}")
+
+if __name__ == "__main__":
+    main()
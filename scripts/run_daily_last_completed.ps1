@@ -79,8 +79,8 @@ RunPyNoArgs "scripts\snapshot_fixtures_and_diff.py"
 RunPyNoArgs "scripts\build_cleaned_players.py"
 
 # 2) GW N par joueur + par match (ARG EXPLICITE)
-RunPyGw "scripts\build_one_gw_csv.py" $gw
-RunPyGw "scripts\build_one_gw_permatch_csv.py" $gw
+# gw{N}.csv + gw{N}_permatch.csv depuis un seul payload live
+RunPyGw "scripts\gw_build.py" $gw
 
 # 3) merged_gw.csv
 RunPyNoArgs "scripts\build_merged_gw.py"
@@ -7,12 +7,14 @@ Vérifie :
 - Présence des fichiers clés
 - Cohérence de price_change_forecast.csv
 - Contrôles de normalisation (colonnes clés + snapshots)
+- Features de forme (build_form_features) identiques à pandas rolling / ewm sur une saison synthétique
 - Résumé global PASS/FAIL/WARN
 """
 
 from __future__ import annotations
 import argparse
 from pathlib import Path
+import numpy as np
 import pandas as pd
 import requests
 import sys
@@ -122,6 +124,31 @@ def check_normalization() -> bool:
         ok = False
     return ok
 
+def check_form_features(n_players: int = 700, n_matches: int = 41, tol: float = 1e-6) -> bool:
+    """compute_features vs groupby().rolling / ewm(adjust=True) sur une saison synthétique (double GW incluse)."""
+    from build_form_features import compute_features, METRICS, WINDOWS
+    rng = np.random.default_rng(0)
+    rows = pd.DataFrame({"player_id": np.repeat(np.arange(n_players), n_matches),
+                         "gw": np.tile(np.arange(n_matches), n_players)})
+    for m in METRICS:
+        v = rng.exponential(0.2, len(rows)) if m in ("xg", "xa", "xgi") else rng.gamma(2.0, 3.0, len(rows))
+        v[rng.random(len(rows)) < 0.15] = np.nan
+        rows[m] = v
+    feats, _ = compute_features(rows)
+    g = rows.groupby("player_id")
+    worst = 0.0
+    for m in METRICS:
+        for k in WINDOWS:
+            ref_roll = g[m].transform(lambda s: s.rolling(k, min_periods=1).mean())
+            ref_ewm = g[m].transform(lambda s: s.ewm(span=k, adjust=True).mean())
+            worst = max(worst, float(np.nanmax(np.abs(ref_roll - feats[f"{m}_roll{k}"]))),
+                        float(np.nanmax(np.abs(ref_ewm - feats[f"{m}_ewm{k}"]))))
+    if worst > tol:
+        log("FAIL", f"form features ≠ pandas ({n_players} joueurs × {n_matches} matchs) : écart max {worst:.3g}")
+        return False
+    log("PASS", f"form features = pandas rolling/ewm ({n_players} joueurs × {n_matches} matchs, écart max {worst:.1e})")
+    return True
+
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--with-api-check", action="store_true", default=False)
@@ -153,6 +180,9 @@ def main():
     # Contrôles de normalisation
     overall_ok &= check_normalization()
 
+    # Features de forme (contrôle numérique, sans données)
+    overall_ok &= check_form_features()
+
     # Résumé final
     print("\n=== GLOBAL SUMMARY ===")
     print(f"PASS : {COUNTS['PASS']}")
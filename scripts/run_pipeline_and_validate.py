@@ -36,8 +36,10 @@ def main():
             run([PY, str(SCRIPTS / "snapshot_players_raw.py")])
         if args.deltas:
             run([PY, str(SCRIPTS / "calc_nti_deltas.py")])
+            run([PY, str(SCRIPTS / "transfer_velocity.py")])
         # Forecast toujours après snapshot+deltas
         run([PY, str(SCRIPTS / "price_change_forecast.py")])
+        run([PY, str(SCRIPTS / "price_change_mc.py")])
         # Pas de validation globale ici → gérée par run_snapshot.ps1
         return
 
@@ -62,12 +64,14 @@ def main():
 
     # 5) NTI deltas
     run([PY, str(SCRIPTS / "calc_nti_deltas.py")])
+    run([PY, str(SCRIPTS / "transfer_velocity.py")])
 
     # 6) Deadlines
     run([PY, str(SCRIPTS / "update_deadlines.py")])
 
     # 7) Price Change Forecast
     run([PY, str(SCRIPTS / "price_change_forecast.py")])
+    run([PY, str(SCRIPTS / "price_change_mc.py")])
 
     # 8) Validation globale
     run([PY, str(SCRIPTS / "run_global_test.py"), "--with-api-check", "--with-fixtures-diff"])
@@ -1,16 +1,22 @@
 # scripts/snapshot_fixtures_and_diff.py
 # 1) télécharge les fixtures actuels
-# 2) écrit un snapshot CSV data/fixtures_snapshots/fixtures_<ts>.csv
-# 3) compare au snapshot précédent et produit:
+# 2) les intègre au journal SCD type 2 data/fixtures_scd.csv (fixtures_scd) : seules les
+#    reprogrammations / ajouts / suppressions créent des lignes (plus de snapshot complet à chaque run ;
+#    --keep-snapshot pour écrire encore data/fixtures_snapshots/fixtures_<ts>.csv)
+# 3) si changements par rapport aux versions courantes du journal :
 #    - un CSV des différences data/fixtures_diffs/diff_<prev>_to_<curr>.csv
-#    - un ALERT texte data/ALERT_fixtures_diff_<ts>.txt si changements
+#    - un ALERT texte data/ALERT_fixtures_diff_<ts>.txt
+#    (<prev>/<curr>/<ts> : horodatages UTC YYYYMMDD-HHMMSS des états du journal SCD, pas des snapshots)
 
-import os, glob
+import argparse
 from pathlib import Path
 from datetime import datetime, timezone
 import requests
 import pandas as pd
 
+from fixtures_scd import (load_log, load_state, save_log, apply_snapshot, update_from_snapshots,
+                          iso_utc, SCD_FILE)
+
 UA = {"User-Agent": "Mozilla/5.0 (FPL-FixturesDiff/1.0)"}
 BOOTSTRAP = "https://fantasy.premierleague.com/api/bootstrap-static/"
 FIXTURES  = "https://fantasy.premierleague.com/api/fixtures/"
@@ -56,52 +62,15 @@ def write_snapshot(df):
     df.to_csv(fp, index=False, encoding="utf-8")
     return fp
 
-def find_last_two_snapshots():
-    files = sorted(glob.glob(str(SNAP_DIR / "fixtures_*.csv")))
-    if len(files) < 2:
-        return None, None
-    return Path(files[-2]), Path(files[-1])
-
-def compare_snapshots(prev_fp, curr_fp):
-    prev = pd.read_csv(prev_fp)
-    curr = pd.read_csv(curr_fp)
-
-    key = "id"
-    prev_ids = set(prev[key].dropna().astype(int))
-    curr_ids = set(curr[key].dropna().astype(int))
-
-    added_ids   = sorted(curr_ids - prev_ids)
-    removed_ids = sorted(prev_ids - curr_ids)
-
-    # align on common ids
-    common_ids = sorted(prev_ids & curr_ids)
-    p = prev.set_index(key).loc[common_ids]
-    c = curr.set_index(key).loc[common_ids]
-
-    # compare selected columns
-    cols = ["event","kickoff_time","team_h","team_a","team_h_name","team_a_name","provisional_start_time"]
-    diffs = []
-    for fid in common_ids:
-        changed = []
-        row = {"id": fid}
-        for col in cols:
-            pv = p.at[fid, col] if col in p.columns else None
-            cv = c.at[fid, col] if col in c.columns else None
-            if str(pv) != str(cv):
-                changed.append(col)
-                row[col+"_prev"] = pv
-                row[col+"_curr"] = cv
-        if changed:
-            row["changed_fields"] = ",".join(changed)
-            diffs.append(row)
-
-    df_diff = pd.DataFrame(diffs, columns=["id"] + [f"{col}_prev" for col in cols] + [f"{col}_curr" for col in cols] + ["changed_fields"])
-    return added_ids, removed_ids, df_diff
-
-def write_diff_outputs(prev_fp, curr_fp, added, removed, df_diff):
+def scd_stamp(ts: str) -> str:
+    """Horodatage ISO du journal SCD -> YYYYMMDD-HHMMSS (UTC) pour les noms de fichiers."""
+    return pd.Timestamp(ts).strftime("%Y%m%d-%H%M%S")
+
+def write_diff_outputs(prev_ts, curr_ts, added, removed, df_diff):
+    """Diff CSV + ALERT entre deux états du journal SCD (horodatages ISO UTC de fixtures_scd)."""
     DIFF_DIR.mkdir(parents=True, exist_ok=True)
-    ts_prev = prev_fp.stem.replace("fixtures_", "")
-    ts_curr = curr_fp.stem.replace("fixtures_", "")
+    ts_prev = scd_stamp(prev_ts)
+    ts_curr = scd_stamp(curr_ts)
     out_csv = DIFF_DIR / f"diff_{ts_prev}_to_{ts_curr}.csv"
 
     # écrire CSV des changements (si vide, écrire un CSV vide avec en-tête)
@@ -112,8 +81,8 @@ def write_diff_outputs(prev_fp, curr_fp, added, removed, df_diff):
         alert = DATA / f"ALERT_fixtures_diff_{ts_curr}.txt"
         lines = []
         lines.append("Fixtures diff summary")
-        lines.append(f"Prev snapshot: {prev_fp.name}")
-        lines.append(f"Curr snapshot: {curr_fp.name}")
+        lines.append(f"Prev SCD state: {prev_ts}")
+        lines.append(f"Curr SCD state: {curr_ts}")
         lines.append(f"Added fixtures: {len(added)}")
         lines.append(f"Removed fixtures: {len(removed)}")
         lines.append(f"Changed fixtures: {len(df_diff)}")
@@ -129,22 +98,42 @@ def write_diff_outputs(prev_fp, curr_fp, added, removed, df_diff):
         alert.write_text("\n".join(lines), encoding="utf-8")
         print(f"ALERT written: {alert}")
     else:
-        print("No fixture changes vs previous snapshot.")
+        print("No fixture changes vs previous state.")
 
     print(f"Diff CSV: {out_csv}")
 
 def main():
+    ap = argparse.ArgumentParser(description="Fetch fixtures, update the SCD change log and report changes.")
+    ap.add_argument("--keep-snapshot", action="store_true", help="Écrit aussi le snapshot CSV complet.")
+    args = ap.parse_args()
+
     df = load_fixtures_df()
-    snap_fp = write_snapshot(df)
-    print(f"Snapshot written: {snap_fp}")
+    now = datetime.now(timezone.utc)
+    if args.keep_snapshot:
+        snap_fp = write_snapshot(df)
+        print(f"Snapshot written: {snap_fp}")
+
+    # Journal absent : amorçage depuis les anciens snapshots complets (historique conservé)
+    if not SCD_FILE.exists():
+        update_from_snapshots(rebuild=True)
+    log = load_log()
+    prev_ts = load_state().get("last_snapshot")
+    curr_ts = iso_utc(now)
+    if prev_ts is not None and curr_ts <= prev_ts:
+        print("Fixtures already integrated at this timestamp.")
+        return
 
-    prev_fp, curr_fp = find_last_two_snapshots()
-    if not prev_fp or not curr_fp:
-        print("Need at least 2 snapshots to compute diff. Run again later.")
+    log, d = apply_snapshot(log, df, curr_ts)
+    save_log(log, curr_ts)
+    print(f"SCD log updated: {SCD_FILE} ({len(log)} versions)")
+    if prev_ts is None:
+        print("SCD log initialised — no previous state to diff against.")
+        return
+    if not (d["added"] or d["removed"] or not d["changed"].empty):
+        print("No fixture changes vs previous state.")
         return
 
-    added, removed, df_diff = compare_snapshots(prev_fp, curr_fp)
-    write_diff_outputs(prev_fp, curr_fp, added, removed, df_diff)
+    write_diff_outputs(prev_ts, curr_ts, d["added"], d["removed"], d["changed"])
 
 if __name__ == "__main__":
     main()
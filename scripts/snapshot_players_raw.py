@@ -2,7 +2,7 @@
 from __future__ import annotations
 from pathlib import Path
 import pandas as pd
-from utils_io import ensure_dirs, always_write_csv, now_local
+from utils_io import ensure_dirs, always_write_csv, now_utc
 
 DATA_DIR = Path("data")
 SNAP_DIR = DATA_DIR / "snapshots"
@@ -33,8 +33,8 @@ def main():
     keep = [c for c in REQUIRED_COLS if c in df.columns]
     df = df[keep].copy()
 
-    # Always-Write snapshot + petit "courant" pour consultation rapide
-    ts = now_local()
+    # Always-Write snapshot + petit "courant" pour consultation rapide (nom horodaté en UTC)
+    ts = now_utc()
     always_write_csv(
         df=df,
         current_path=DATA_DIR / "players_raw_snapshot_current.csv",
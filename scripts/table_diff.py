@@ -0,0 +1,115 @@
+# scripts/table_diff.py
+"""
+Moteur de diff colonnaire entre deux versions d'une table, par clé primaire.
+
+- Clés : ajoutées / supprimées par différence d'ensembles triés (np.setdiff1d / np.intersect1d)
+- Lignes communes alignées sur la clé (reindex), puis comparaison en bloc colonne par colonne
+  sur la représentation texte (même règle que str(prev) != str(curr) : 1.0 != 1, nan == nan)
+- Masque lignes × colonnes -> lignes modifiées, champs modifiés (changed_fields), valeurs _prev/_curr
+  uniquement pour les champs modifiés (NaN sinon)
+- Clé en double : la dernière occurrence est retenue
+
+Utilisé par fixtures_scd.apply_snapshot (diff_tables) ; réutilisable pour les snapshots players_raw
+ou une série de snapshots (diff_series : chaque fichier lu une seule fois).
+
+Usage :
+  python scripts/table_diff.py data/snapshots/players_raw_A.csv data/snapshots/players_raw_B.csv \
+      --key id --cols now_cost status news [--out diff.csv]
+"""
+
+from __future__ import annotations
+import argparse
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+def _keys(df: pd.DataFrame, key: str) -> pd.Series:
+    k = df[key].dropna()
+    return k.astype("int64") if pd.api.types.is_numeric_dtype(k) else k
+
+def _by_key(df: pd.DataFrame, key: str) -> pd.DataFrame:
+    k = _keys(df, key)
+    out = df.loc[k.index].copy()
+    out.index = pd.Index(k.to_numpy(), name=key)
+    return out[~out.index.duplicated(keep="last")]
+
+def _text(df: pd.DataFrame, col: str) -> np.ndarray:
+    """Représentation texte d'une colonne (colonne absente -> "None", comme str(None))."""
+    if col not in df.columns:
+        return np.full(len(df), "None", dtype=object)
+    return df[col].astype(str).to_numpy(dtype=object)
+
+def _values(df: pd.DataFrame, col: str) -> np.ndarray:
+    if col not in df.columns:
+        return np.full(len(df), None, dtype=object)
+    return df[col].to_numpy(dtype=object)
+
+def diff_tables(prev: pd.DataFrame, curr: pd.DataFrame, key: str, cols: list[str]) -> dict:
+    """
+    Diff de deux tables sur `key` pour les colonnes `cols`.
+    Renvoie {"added": [clés], "removed": [clés], "changed": DataFrame, "mask": ndarray (communes × cols),
+             "common": ndarray des clés communes}.
+    `changed` : key, <col>_prev..., <col>_curr..., changed_fields (une ligne par clé modifiée).
+    """
+    p, c = _by_key(prev, key), _by_key(curr, key)
+    pk, ck = np.unique(p.index.to_numpy()), np.unique(c.index.to_numpy())
+    added = np.setdiff1d(ck, pk).tolist()
+    removed = np.setdiff1d(pk, ck).tolist()
+    common = np.intersect1d(pk, ck)
+    p, c = p.reindex(common), c.reindex(common)
+
+    mask = np.zeros((len(common), len(cols)), dtype=bool)
+    for j, col in enumerate(cols):
+        mask[:, j] = _text(p, col) != _text(c, col)
+    rows = mask.any(axis=1)
+
+    out_cols = [key] + [f"{col}_prev" for col in cols] + [f"{col}_curr" for col in cols] + ["changed_fields"]
+    if not rows.any():
+        return {"added": added, "removed": removed, "changed": pd.DataFrame(columns=out_cols),
+                "mask": mask, "common": common}
+
+    m = mask[rows]
+    data = {key: common[rows]}
+    for side, df in (("prev", p), ("curr", c)):
+        for j, col in enumerate(cols):
+            data[f"{col}_{side}"] = np.where(m[:, j], _values(df, col)[rows], np.nan)
+    # changed_fields : concaténation vectorisée colonne par colonne ("event,kickoff_time")
+    fields = np.full(int(rows.sum()), "", dtype=object)
+    for j, col in enumerate(cols):
+        sep = np.where(fields != "", ",", "")
+        fields = np.where(m[:, j], fields + sep + col, fields)
+    data["changed_fields"] = fields
+    changed = pd.DataFrame(data, columns=out_cols).infer_objects()
+    return {"added": added, "removed": removed, "changed": changed, "mask": mask, "common": common}
+
+def diff_files(prev_fp: str | Path, curr_fp: str | Path, key: str, cols: list[str]) -> dict:
+    return diff_tables(pd.read_csv(prev_fp), pd.read_csv(curr_fp), key, cols)
+
+def diff_series(paths: list[str | Path], key: str, cols: list[str]):
+    """Diffs des paires consécutives (prev, curr, diff) d'une série de snapshots ; chaque fichier lu une fois."""
+    prev_fp, prev = None, None
+    for fp in paths:
+        curr = pd.read_csv(fp)
+        if prev is not None:
+            yield Path(prev_fp), Path(fp), diff_tables(prev, curr, key, cols)
+        prev_fp, prev = fp, curr
+
+def main():
+    ap = argparse.ArgumentParser(description="Columnar diff of two CSV snapshots keyed on a primary key.")
+    ap.add_argument("prev")
+    ap.add_argument("curr")
+    ap.add_argument("--key", default="id")
+    ap.add_argument("--cols", nargs="+", required=True, help="Colonnes comparées.")
+    ap.add_argument("--out", help="CSV des lignes modifiées.")
+    args = ap.parse_args()
+
+    d = diff_files(args.prev, args.curr, args.key, args.cols)
+    print(f"[INFO] added {len(d['added'])}, removed {len(d['removed'])}, changed {len(d['changed'])}")
+    if not d["changed"].empty:
+        print(d["changed"].groupby("changed_fields").size().sort_values(ascending=False).head(10).to_string())
+    if args.out:
+        d["changed"].to_csv(args.out, index=False, encoding="utf-8")
+        print(f"[PASS] {args.out} written")
+
+if __name__ == "__main__":
+    main()
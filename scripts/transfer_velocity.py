@@ -0,0 +1,175 @@
+# scripts/transfer_velocity.py
+"""
+Vitesse (transferts nets / heure) et accélération par joueur, normalisées dans le temps.
+
+Les snapshots arrivent à intervalles irréguliers (cron 07/13/19h, pré-deadline, runs manuels) :
+NTI_1h de calc_nti_deltas est "dernier - précédent", quel que soit l'écart. Ici :
+- Matrice joueur × timestamp des NTI (transfers_in_event - transfers_out_event)
+- Différences finies divisées par l'écart réel (heures) ; remise à zéro des compteurs
+  *_event gérée uniquement sur un intervalle qui traverse une deadline (data/deadlines.csv,
+  l'intervalle repart de 0) ; une baisse hors deadline est une anomalie -> intervalle ignoré
+- Vitesse sur fenêtre glissante (somme des ΔNTI / somme des Δt sur les intervalles de la fenêtre,
+  au moins le dernier intervalle), vitesse du dernier intervalle, accélération (fenêtre vs précédente)
+- Dispersion des vitesses par intervalle sur tout l'historique lu (écart-type pondéré par Δt),
+  utilisée par price_change_mc.py
+
+Sortie : data/deltas/transfer_velocity.csv (lue par price_change_forecast.py)
+
+Usage :
+  python scripts/transfer_velocity.py [--window-h 6] [--lookback-h 72]
+"""
+
+from __future__ import annotations
+import argparse
+from datetime import timedelta
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+from utils_io import ensure_dirs, list_all_snapshots, load_snapshot_panel
+from rebuild_nti_log import NTI_ALIASES
+
+ROOT = Path(__file__).resolve().parents[1]
+DATA_DIR = ROOT / "data"
+SNAP_DIR = DATA_DIR / "snapshots"
+DELTAS_DIR = DATA_DIR / "deltas"
+VELOCITY_FILE = DELTAS_DIR / "transfer_velocity.csv"
+DEADLINES_CSV = DATA_DIR / "deadlines.csv"
+
+PLAYERS_STEM = "players_raw"
+WINDOW_H = 6.0
+LOOKBACK_H = 72.0
+
+def load_deadlines() -> np.ndarray:
+    """Deadlines des GW (datetime64, UTC naïf), vide si deadlines.csv absent."""
+    if not DEADLINES_CSV.exists():
+        return np.array([], dtype="datetime64[s]")
+    d = pd.to_datetime(pd.read_csv(DEADLINES_CSV)["deadline_time"], utc=True, errors="coerce").dropna()
+    return np.sort(d.dt.tz_localize(None).to_numpy().astype("datetime64[s]"))
+
+def crosses_deadline(t0, t1, deadlines: np.ndarray) -> np.ndarray:
+    """Pour chaque intervalle ]t0, t1] (UTC naïf, NaT -> False) : True s'il contient une deadline."""
+    a = pd.DatetimeIndex(t0).to_numpy().astype("datetime64[s]")
+    b = pd.DatetimeIndex(t1).to_numpy().astype("datetime64[s]")
+    k0 = np.searchsorted(deadlines, a, side="right")
+    k1 = np.searchsorted(deadlines, b, side="right")
+    return (k0 != k1) & ~np.isnat(a) & ~np.isnat(b)
+
+def gw_boundaries(times, deadlines: np.ndarray) -> np.ndarray:
+    """Pour chaque intervalle [t-1, t] : True s'il contient une deadline (compteurs *_event remis à zéro)."""
+    t = pd.DatetimeIndex(times)
+    return crosses_deadline(t[:-1], t[1:], deadlines)
+
+def nti_grid(panel: pd.DataFrame) -> tuple[np.ndarray, pd.Index, np.ndarray, np.ndarray, np.ndarray]:
+    """Panel long -> (ids, timestamps, heures depuis le 1er snapshot, NTI[joueur, t], transfers_in[joueur, t])."""
+    t_codes, times = pd.factorize(panel["timestamp"], sort=True)
+    p_codes, ids = pd.factorize(panel["id"], sort=True)
+    shape = (len(ids), len(times))
+    tin = pd.to_numeric(panel["transfers_in_event"], errors="coerce").to_numpy(dtype=float)
+    tout = pd.to_numeric(panel["transfers_out_event"], errors="coerce").to_numpy(dtype=float)
+    N = np.full(shape, np.nan); N[p_codes, t_codes] = tin - tout
+    TIN = np.full(shape, np.nan); TIN[p_codes, t_codes] = tin
+    hours = (pd.DatetimeIndex(times) - times[0]).total_seconds().to_numpy() / 3600.0
+    return np.asarray(ids), times, hours, N, TIN
+
+def interval_deltas(hours: np.ndarray, N: np.ndarray, TIN: np.ndarray, boundary: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    ΔNTI et Δt (heures) par intervalle [t-1, t] : matrices (joueurs × T-1), NaN si non observé.
+    Remise à zéro (transfers_in décroît sur un intervalle qui traverse une deadline) : ΔNTI = NTI
+    courant (transferts depuis la deadline). Baisse hors deadline : NaN (snapshot incohérent).
+    """
+    dN = N[:, 1:] - N[:, :-1]
+    drop = TIN[:, 1:] < TIN[:, :-1]
+    dN = np.where(drop & boundary[None, :], N[:, 1:], dN)
+    dN = np.where(drop & ~boundary[None, :], np.nan, dN)
+    dt = np.broadcast_to(np.diff(hours), dN.shape).astype(float)
+    dt = np.where(np.isnan(dN), np.nan, dt)
+    return dN, dt
+
+def window_rate(dN: np.ndarray, dt: np.ndarray, ends: np.ndarray, start_h: float, stop_h: float) -> tuple[np.ndarray, np.ndarray]:
+    """Vitesse moyenne sur les intervalles finissant dans ]start_h, stop_h] : (ΣΔNTI / ΣΔt, ΣΔt)."""
+    sel = (ends > start_h) & (ends <= stop_h)
+    if not sel.any():
+        # aucun intervalle dans la fenêtre (snapshots espacés) : dernier intervalle avant stop_h
+        k = np.searchsorted(ends, stop_h, side="right") - 1
+        sel = np.zeros_like(ends, dtype=bool)
+        if k >= 0:
+            sel[k] = True
+    num = np.nansum(np.where(sel, dN, np.nan), axis=1)
+    span = np.nansum(np.where(sel, dt, np.nan), axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rate = np.where(span > 0, num / span, np.nan)
+    return rate, span
+
+def compute_velocity(panel: pd.DataFrame, window_h: float = WINDOW_H, deadlines: np.ndarray | None = None) -> pd.DataFrame:
+    ids, times, hours, N, TIN = nti_grid(panel)
+    if len(hours) < 2:
+        return pd.DataFrame(columns=["id", "NTI", "NTI_per_h", "NTI_per_h_last", "NTI_per_h_std", "NTI_accel", "span_h"])
+    deadlines = load_deadlines() if deadlines is None else deadlines
+    dN, dt = interval_deltas(hours, N, TIN, gw_boundaries(times, deadlines))
+    ends = hours[1:]
+    t_last = hours[-1]
+
+    v_win, span = window_rate(dN, dt, ends, t_last - window_h, t_last)
+    prev_stop = t_last - max(window_h, float(np.nanmax(span, initial=0.0)))
+    v_prev, span_prev = window_rate(dN, dt, ends, prev_stop - window_h, prev_stop)
+
+    # vitesse du dernier intervalle observé par joueur
+    rates = dN / dt
+    valid = ~np.isnan(rates)
+    last_k = np.where(valid.any(axis=1), valid.shape[1] - 1 - np.argmax(valid[:, ::-1], axis=1), -1)
+    v_last = np.where(last_k >= 0, rates[np.arange(len(ids)), np.maximum(last_k, 0)], np.nan)
+
+    # dispersion : écart-type des vitesses par intervalle, pondéré par Δt
+    w = np.where(valid, dt, 0.0)
+    r0 = np.where(valid, rates, 0.0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        w_sum = w.sum(axis=1)
+        mean = (w * r0).sum(axis=1) / w_sum
+        std = np.sqrt((w * (r0 - mean[:, None]) ** 2).sum(axis=1) / w_sum)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        gap = 0.5 * (span + span_prev)
+        accel = np.where(gap > 0, (v_win - v_prev) / gap, np.nan)
+
+    return pd.DataFrame({
+        "id": ids,
+        "NTI": N[:, -1],
+        "NTI_per_h": np.round(v_win, 1),
+        "NTI_per_h_last": np.round(v_last, 1),
+        "NTI_per_h_std": np.round(std, 1),
+        "NTI_accel": np.round(accel, 2),
+        "span_h": np.round(span, 2),
+    })
+
+def load_recent_panel(lookback_h: float = LOOKBACK_H) -> pd.DataFrame:
+    snaps = list_all_snapshots(SNAP_DIR, PLAYERS_STEM)
+    if not snaps:
+        return pd.DataFrame()
+    since = snaps[-1][0] - timedelta(hours=lookback_h)
+    return load_snapshot_panel(
+        SNAP_DIR, PLAYERS_STEM, ["web_name", "transfers_in_event", "transfers_out_event"],
+        aliases=NTI_ALIASES, since=since,
+    )
+
+def main():
+    ap = argparse.ArgumentParser(description="Transfer velocity (per hour) and acceleration per player.")
+    ap.add_argument("--window-h", type=float, default=WINDOW_H, help="Fenêtre glissante (heures).")
+    ap.add_argument("--lookback-h", type=float, default=LOOKBACK_H, help="Historique de snapshots lu (heures).")
+    args = ap.parse_args()
+
+    panel = load_recent_panel(args.lookback_h)
+    if panel.empty:
+        raise SystemExit("[WARN] No snapshot found yet.")
+    vel = compute_velocity(panel, args.window_h)
+    last = panel.groupby("id", sort=True).tail(1).set_index("id")
+    vel.insert(1, "web_name", vel["id"].map(last["web_name"]))
+    vel.insert(0, "timestamp", panel["timestamp"].max())
+    vel["window_h"] = args.window_h
+
+    ensure_dirs(DELTAS_DIR)
+    vel.to_csv(VELOCITY_FILE, index=False)
+    print(f"[PASS] transfer_velocity.csv written ({len(vel)} rows, {panel['timestamp'].nunique()} snapshots)")
+
+if __name__ == "__main__":
+    main()
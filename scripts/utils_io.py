@@ -2,29 +2,47 @@
 """
 Utilitaires I/O du projet FPL avec logique Always-Write.
 Contient:
-- ensure_dirs, timestamp, now_local
+- ensure_dirs, timestamp, now_local (heure murale Zurich), now_utc, local_to_utc / utc_to_local
 - always_write_csv (fichier courant + snapshot horodaté)
-- write_current_and_snapshot (compat anciens scripts)
+- write_current_and_snapshot (compat anciens scripts), snapshot_copies (snapshots d'un lot de fichiers)
 - list_snapshots, latest_two_snapshots
+- list_all_snapshots, load_snapshot_panel (tous formats de snapshots, ramenés en UTC)
+- snapshot_fingerprint (empreinte du contenu d'un snapshot players_raw)
 - read_csv_safe, to_float_safe
+- read_csv_tail (fin d'un CSV append-only, fenêtre temporelle)
 """
 
 from __future__ import annotations
 from pathlib import Path
-from datetime import datetime
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
+import hashlib
 import re
 import pandas as pd
 
 # --- Horodatage / timezone ---
+LOCAL_TZ = ZoneInfo("Europe/Zurich")
+
 def now_local() -> datetime:
-    # Laisse Windows/OS gérer le fuseau local (Zurich) côté planifications;
-    # pour les noms de fichiers on n'a pas besoin de tz-aware ici.
-    return datetime.now()
+    # Heure murale Zurich (naïve), quelle que soit l'horloge de la machine (UTC sur GitHub,
+    # Zurich sur les runners Windows) : les noms *_YYYYMMDD_HHMMSS restent dans un seul fuseau.
+    return datetime.now(LOCAL_TZ).replace(tzinfo=None)
+
+def now_utc() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+def local_to_utc(dt: datetime) -> datetime:
+    """Heure murale Zurich (naïve) -> UTC naïf, le fuseau des horodatages de snapshots."""
+    return dt.replace(tzinfo=LOCAL_TZ).astimezone(timezone.utc).replace(tzinfo=None)
+
+def utc_to_local(dt: datetime) -> datetime:
+    """UTC naïf -> heure murale Zurich (naïve)."""
+    return dt.replace(tzinfo=timezone.utc).astimezone(LOCAL_TZ).replace(tzinfo=None)
 
 def timestamp_iso_for_filename(dt: datetime | None = None) -> str:
     if dt is None:
-        dt = now_local()
-    # nom de fichier safe Windows: 2025-08-22T11-00
+        dt = now_utc()
+    # nom de fichier safe Windows, en UTC : 2025-08-22T11-00
     return dt.strftime("%Y-%m-%dT%H-%M")
 
 # --- FS helpers ---
@@ -40,7 +58,7 @@ def always_write_csv(
     base_filename: str,
     ts: datetime | None = None,
 ) -> Path:
-    """Écrit le fichier courant (overwrite) + un snapshot horodaté; retourne le chemin du snapshot."""
+    """Écrit le fichier courant (overwrite) + un snapshot horodaté (UTC); retourne le chemin du snapshot."""
     ensure_dirs(Path(current_path).parent, snapshots_dir)
     df.to_csv(current_path, index=False, encoding="utf-8")
     stamp = timestamp_iso_for_filename(ts)
@@ -63,6 +81,20 @@ def write_current_and_snapshot(df: pd.DataFrame, current_path: Path, name_for_sn
     df.to_csv(snap_path, index=False, encoding="utf-8")
     print(f"[WRITE] {current_path.name} réécrit + snapshot {snap_name}")
 
+def snapshot_copies(paths: list[Path], ts: datetime | None = None) -> list[Path]:
+    """
+    Snapshots datés (même nommage que write_current_and_snapshot) de fichiers déjà écrits :
+    copie d'octets, sans re-sérialiser le DataFrame ; un seul horodatage pour tout le lot.
+    """
+    import shutil
+    stamp = (ts or now_local()).strftime("%Y%m%d_%H%M%S")
+    out = []
+    for p in paths:
+        snap_path = SNAPSHOTS / f"{Path(p).stem}_{stamp}.csv"
+        shutil.copyfile(p, snap_path)
+        out.append(snap_path)
+    return out
+
 # --- Parcours des snapshots ---
 def list_snapshots(snapshots_dir: str | Path, stem: str) -> list[Path]:
     p = Path(snapshots_dir)
@@ -81,6 +113,121 @@ def latest_two_snapshots(snapshots_dir: str | Path, stem: str) -> tuple[Path | N
         return files[-1], None
     return files[-1], files[-2]
 
+# --- Séries de snapshots (tous formats d'horodatage) ---
+# Les snapshots players_raw existent sous plusieurs conventions de nom selon le script producteur,
+# chacune dans le fuseau de son producteur :
+#   players_raw_2025-08-22T20-36.csv  UTC     (snapshot_players_raw / always_write_csv)
+#   players_raw_20250821-213907.csv   UTC     (anciens fetch, write_gw_and_snapshot)
+#   players_raw_20250918_0736.csv     Zurich  (update_players_raw_history)
+#   players_raw_20250822_204606.csv   Zurich  (write_current_and_snapshot / snapshot_copies)
+SNAPSHOT_TS_FORMATS = {
+    r"\d{4}-\d{2}-\d{2}T\d{2}-\d{2}": ("%Y-%m-%dT%H-%M", timezone.utc),
+    r"\d{8}-\d{6}": ("%Y%m%d-%H%M%S", timezone.utc),
+    r"\d{8}_\d{4}": ("%Y%m%d_%H%M", LOCAL_TZ),
+    r"\d{8}_\d{6}": ("%Y%m%d_%H%M%S", LOCAL_TZ),
+}
+FINGERPRINT_COLS = ["transfers_in_event", "transfers_out_event", "now_cost"]
+
+def snapshot_timestamp(path: str | Path, stem: str) -> datetime | None:
+    """Horodatage (naïf, UTC) encodé dans le nom d'un snapshot, None si format inconnu."""
+    name = Path(path).name
+    for patt, (fmt, tz) in SNAPSHOT_TS_FORMATS.items():
+        m = re.fullmatch(rf"{re.escape(stem)}_({patt})\.csv", name)
+        if m:
+            ts = datetime.strptime(m.group(1), fmt).replace(tzinfo=tz)
+            return ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return None
+
+def list_all_snapshots(snapshots_dir: str | Path, stem: str) -> list[tuple[datetime, Path]]:
+    """
+    Tous les snapshots `stem_<ts>.csv` quel que soit le format, triés sur l'horodatage UTC ;
+    un seul fichier par horodatage (deux producteurs lancés ensemble -> même minute UTC).
+    """
+    p = Path(snapshots_dir)
+    if not p.exists():
+        return []
+    out = {}
+    for f in sorted(p.glob(f"{stem}_*.csv")):
+        ts = snapshot_timestamp(f, stem)
+        if ts is not None:
+            out.setdefault(ts, f)
+    return sorted(out.items())
+
+def snapshot_fingerprint(df: pd.DataFrame) -> str | None:
+    """
+    Empreinte des compteurs d'un snapshot (id + FINGERPRINT_COLS présentes) : deux fichiers de
+    producteurs différents contenant le même état de l'API ont la même empreinte.
+    None si aucune de ces colonnes n'est présente.
+    """
+    cols = [c for c in FINGERPRINT_COLS if c in df.columns]
+    if "id" not in df.columns or not cols:
+        return None
+    sub = df[["id", *cols]].apply(pd.to_numeric, errors="coerce").astype(float)
+    sub = sub.dropna(subset=["id"]).sort_values("id", kind="mergesort")
+    return hashlib.sha1(pd.util.hash_pandas_object(sub, index=False).to_numpy().tobytes()).hexdigest()
+
+def _read_snapshot_cols(ts: datetime, path: Path, wanted: set[str], aliases: dict[str, str]) -> pd.DataFrame | None:
+    df = pd.read_csv(path, usecols=lambda c: c.strip().lower() in wanted)
+    df.columns = [c.strip().lower() for c in df.columns]
+    for src, dst in aliases.items():
+        if src in df.columns and dst not in df.columns:
+            df = df.rename(columns={src: dst})
+    if "id" not in df.columns or df.empty:
+        return None
+    df = df.loc[:, ~df.columns.duplicated()]
+    df.insert(0, "timestamp", pd.Timestamp(ts))
+    return df
+
+def load_snapshot_panel(
+    snapshots_dir: str | Path,
+    stem: str,
+    columns: list[str],
+    aliases: dict[str, str] | None = None,
+    since: datetime | None = None,
+    jobs: int = 1,
+    dedupe: bool = True,
+) -> pd.DataFrame:
+    """
+    Empile tous les snapshots `stem` en un panel long (timestamp UTC, id, colonnes demandées).
+    - Lecture limitée aux colonnes utiles (usecols)
+    - `aliases` : {nom_source: nom_canonique} pour les anciens schémas
+    - `since` : ignore les fichiers plus anciens (filtré sur le nom, sans lecture)
+    - `jobs` > 1 : lectures en parallèle (threads ; l'ordre des fichiers est conservé)
+    - `dedupe` : un snapshot dont l'empreinte (snapshot_fingerprint) a déjà été vue est écarté
+      (même état de l'API capturé par deux producteurs, ou players_raw.csv périmé re-snapshoté :
+      les compteurs de transferts ne reviennent jamais à un état antérieur identique)
+    - Un seul enregistrement par (timestamp, id) ; tri (id, timestamp)
+    """
+    aliases = aliases or {}
+    wanted = {"id", *columns, *aliases.keys(), *(FINGERPRINT_COLS if dedupe else [])}
+    files = [(ts, f) for ts, f in list_all_snapshots(snapshots_dir, stem) if since is None or ts >= since]
+    if jobs > 1 and len(files) > 1:
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=jobs) as ex:
+            frames = list(ex.map(lambda tf: _read_snapshot_cols(tf[0], tf[1], wanted, aliases), files))
+    else:
+        frames = [_read_snapshot_cols(ts, f, wanted, aliases) for ts, f in files]
+    frames = [df for df in frames if df is not None]
+    if dedupe:
+        kept, seen = [], set()
+        for df in frames:
+            fp = snapshot_fingerprint(df)
+            if fp is None or fp not in seen:
+                kept.append(df)
+                seen.add(fp)
+        frames = kept
+    if not frames:
+        return pd.DataFrame(columns=["timestamp", "id", *columns])
+    panel = pd.concat(frames, ignore_index=True, sort=False)
+    for c in columns:
+        if c not in panel.columns:
+            panel[c] = pd.NA
+    panel["id"] = pd.to_numeric(panel["id"], errors="coerce")
+    panel = panel[panel["id"].notna()].copy()
+    panel["id"] = panel["id"].astype(int)
+    panel = panel.drop_duplicates(["timestamp", "id"], keep="last")
+    return panel.sort_values(["id", "timestamp"]).reset_index(drop=True)[["timestamp", "id", *columns]]
+
 # --- Lecture / conversions sûres ---
 def read_csv_safe(path: str | Path) -> pd.DataFrame:
     p = Path(path)
@@ -94,6 +241,60 @@ def to_float_safe(x):
     except Exception:
         return None
 
+def read_csv_tail(
+    path: str | Path,
+    time_col: str,
+    cutoff,
+    usecols=None,
+    block_bytes: int = 4 << 20,
+) -> pd.DataFrame:
+    """
+    Lit uniquement la fin d'un CSV append-only trié par `time_col` (ex: players_raw_history.csv).
+    - `cutoff(t_max) -> t_min` : borne basse de la fenêtre, calculée depuis le dernier horodatage
+    - Blocs lus depuis la fin jusqu'à dépasser t_min ; seules ces lignes sont parsées (usecols)
+    Mémoire et temps proportionnels à la fenêtre, pas à la taille du fichier.
+    Suppose une ligne CSV par enregistrement (pas de retour à la ligne dans les champs).
+    """
+    import csv, io
+    with open(path, "rb") as f:
+        header = f.readline()
+        names = [c.strip().lower() for c in next(csv.reader([header.decode("utf-8-sig")]))]
+        if time_col.lower() not in names:
+            raise KeyError(f"{time_col} absent de {Path(path).name}")
+        idx = names.index(time_col.lower())
+
+        def line_time(line: bytes):
+            row = next(csv.reader([line.decode("utf-8", errors="ignore")]), [])
+            return pd.to_datetime(row[idx], errors="coerce") if len(row) > idx else pd.NaT
+
+        data_start = f.tell()
+        pos = f.seek(0, 2)
+        buf, t_min = b"", None
+        while pos > data_start:
+            step = min(block_bytes, pos - data_start)
+            pos -= step
+            f.seek(pos)
+            buf = f.read(step) + buf
+            lines = buf.rstrip(b"\r\n").split(b"\n")
+            if t_min is None:
+                t_max = line_time(lines[-1])
+                if pd.isna(t_max):
+                    break
+                t_min = cutoff(t_max)
+            # première ligne complète du tampon (la 1re peut être tronquée si pos > début des données)
+            first = lines[0] if pos == data_start else (lines[1] if len(lines) > 1 else None)
+            if first is not None and line_time(first) < t_min:
+                break
+        if pos > data_start:
+            buf = buf[buf.find(b"\n") + 1:]
+
+    df = pd.read_csv(io.BytesIO(header + buf), usecols=usecols)
+    if t_min is None or df.empty:
+        return df.iloc[0:0]
+    tcol = next(c for c in df.columns if c.strip().lower() == time_col.lower())
+    t = pd.to_datetime(df[tcol], errors="coerce")
+    return df[t >= t_min].reset_index(drop=True)
+
 # --- write_gw_and_snapshot (robuste & compatible) ---
 import os
 from pathlib import Path